@@ -0,0 +1,301 @@
+"""
+Struct-of-arrays structure container used on the internal hot paths
+(supercells, rigid film shifts and interface stacking) so they do not have
+to allocate one PeriodicSite per atom for every intermediate structure.
+"""
+import typing as tp
+
+from pymatgen.core.structure import Structure
+from pymatgen.core.lattice import Lattice
+import numpy as np
+
+# Site property values that can be stored in a typed NumPy column and
+# converted back with tolist() without changing their python type
+_SCALAR_TYPES = (bool, int, float, str, np.bool_, np.integer, np.floating)
+
+
+def _to_column(values: tp.Sequence[tp.Any]) -> np.ndarray:
+    value_types = {type(v) for v in values}
+
+    if len(value_types) == 1 and issubclass(
+        next(iter(value_types)), _SCALAR_TYPES
+    ):
+        return np.array(values)
+
+    # Everything else (lists, None, mixed types) is kept as is
+    return _to_object_column(values)
+
+
+def _to_object_column(values: tp.Sequence[tp.Any]) -> np.ndarray:
+    # Filled one by one so NumPy does not try to unpack sequence-like values
+    column = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        column[i] = v
+
+    return column
+
+
+class ArrayStructure:
+    """Array backed periodic structure
+
+    Holds the lattice matrix, fractional coordinates, species and the site
+    properties as NumPy columns. Translations, site selections and
+    supercells are applied to the arrays directly, and the pymatgen
+    Structure is only built when the structure property is accessed. The
+    built Structure is cached until the arrays are modified through one of
+    the methods of this class.
+
+    Examples:
+        >>> arrays = ArrayStructure.from_structure(interface_structure)
+        >>> arrays.translate_sites(arrays.get_mask("is_film"), [0, 0, 1.0], frac_coords=False)
+        >>> shifted_structure = arrays.structure
+
+    Args:
+        lattice_matrix: (3, 3) lattice matrix (lattice vectors as rows)
+        species: Species of each site
+        frac_coords: (N, 3) array of fractional coordinates
+        site_properties: Per site properties
+        pbc: Periodic boundary conditions along each lattice vector
+        to_unit_cell: Determines if the periodic directions of the
+            coordinates are wrapped into the unit cell
+
+    Attributes:
+        lattice_matrix (np.ndarray): (3, 3) lattice matrix
+        species (np.ndarray): Object array with the species of each site
+        frac_coords (np.ndarray): (N, 3) array of fractional coordinates
+        site_properties (tp.Dict[str, np.ndarray]): Site property columns
+        pbc (tp.Tuple[bool, bool, bool]): Periodic boundary conditions
+    """
+
+    def __init__(
+        self,
+        lattice_matrix: np.ndarray,
+        species: tp.Sequence[tp.Any],
+        frac_coords: np.ndarray,
+        site_properties: tp.Optional[tp.Dict[str, tp.Sequence]] = None,
+        pbc: tp.Tuple[bool, bool, bool] = (True, True, True),
+        to_unit_cell: bool = False,
+    ) -> None:
+        self.lattice_matrix = np.array(lattice_matrix, dtype=float)
+        self.species = _to_object_column(species)
+        self.frac_coords = np.array(frac_coords, dtype=float).reshape(-1, 3)
+        self.pbc = tuple(bool(p) for p in pbc)
+
+        if site_properties is None:
+            site_properties = {}
+
+        self.site_properties = {
+            k: v if isinstance(v, np.ndarray) else _to_column(v)
+            for k, v in site_properties.items()
+        }
+
+        self._structure = None
+
+        if to_unit_cell:
+            self.wrap()
+
+    @classmethod
+    def from_structure(cls, structure: Structure) -> "ArrayStructure":
+        """
+        Creates the arrays from a pymatgen Structure
+
+        Args:
+            structure: Pymatgen Structure
+
+        Returns:
+            ArrayStructure of the structure
+        """
+        return cls(
+            lattice_matrix=structure.lattice.matrix,
+            species=structure.species,
+            frac_coords=structure.frac_coords,
+            site_properties=structure.site_properties,
+            pbc=structure.lattice.pbc,
+        )
+
+    def __len__(self) -> int:
+        return len(self.frac_coords)
+
+    @property
+    def lattice(self) -> Lattice:
+        return Lattice(matrix=self.lattice_matrix, pbc=self.pbc)
+
+    @property
+    def cart_coords(self) -> np.ndarray:
+        return self.frac_coords.dot(self.lattice_matrix)
+
+    @property
+    def atomic_numbers(self) -> np.ndarray:
+        return np.array([s.Z for s in self.species], dtype=int)
+
+    @property
+    def structure(self) -> Structure:
+        """
+        Pymatgen Structure of the arrays (built on the first access after the
+        arrays were changed)
+        """
+        if self._structure is None:
+            self._structure = Structure(
+                lattice=self.lattice,
+                species=self.species.tolist(),
+                coords=self.frac_coords,
+                coords_are_cartesian=False,
+                site_properties={
+                    k: v.tolist() for k, v in self.site_properties.items()
+                },
+            )
+
+        return self._structure
+
+    def get_mask(self, site_property: str) -> np.ndarray:
+        """
+        Boolean mask of a site property (i.e. "is_film")
+
+        Args:
+            site_property: Name of the site property
+
+        Returns:
+            Boolean array
+        """
+        return self.site_properties[site_property].astype(bool)
+
+    def copy(self) -> "ArrayStructure":
+        return ArrayStructure(
+            lattice_matrix=self.lattice_matrix,
+            species=self.species,
+            frac_coords=self.frac_coords,
+            site_properties={
+                k: v.copy() for k, v in self.site_properties.items()
+            },
+            pbc=self.pbc,
+        )
+
+    def set_species(self, index: int, species: tp.Any) -> None:
+        """
+        Replaces the species of a site in-place
+
+        Args:
+            index: Site index
+            species: New species of the site
+        """
+        self.species[index] = species
+        self._structure = None
+
+    def wrap(self) -> None:
+        """
+        Wraps the periodic directions of the fractional coordinates into the
+        unit cell (same as to_unit_cell=True in pymatgen)
+        """
+        pbc = np.array(self.pbc)
+        self.frac_coords[:, pbc] = np.mod(self.frac_coords[:, pbc], 1.0)
+        self._structure = None
+
+    def translate_sites(
+        self,
+        indices: tp.Union[np.ndarray, tp.Sequence[int]],
+        vector: tp.Iterable[float],
+        frac_coords: bool = True,
+        to_unit_cell: bool = True,
+    ) -> None:
+        """
+        Translates a set of sites in-place (same as
+        Structure.translate_sites)
+
+        Args:
+            indices: Site indices or boolean mask of the sites
+            vector: Translation vector
+            frac_coords: Determines if the vector is in fractional coordinates
+            to_unit_cell: Determines if the translated sites are wrapped
+                into the unit cell
+        """
+        vector = np.asarray(vector, dtype=float)
+
+        if frac_coords:
+            new_frac_coords = self.frac_coords[indices] + vector
+        else:
+            new_cart_coords = self.frac_coords[indices].dot(
+                self.lattice_matrix
+            )
+            new_frac_coords = (new_cart_coords + vector).dot(
+                np.linalg.inv(self.lattice_matrix)
+            )
+
+        if to_unit_cell:
+            pbc = np.array(self.pbc)
+            new_frac_coords[:, pbc] = np.mod(new_frac_coords[:, pbc], 1.0)
+
+        self.frac_coords[indices] = new_frac_coords
+        self._structure = None
+
+    def select(
+        self, indices: tp.Union[np.ndarray, tp.Sequence[int]]
+    ) -> "ArrayStructure":
+        """
+        New ArrayStructure with a subset of the sites
+
+        Args:
+            indices: Site indices or boolean mask of the sites
+
+        Returns:
+            ArrayStructure with the selected sites
+        """
+        return ArrayStructure(
+            lattice_matrix=self.lattice_matrix,
+            species=self.species[indices],
+            frac_coords=self.frac_coords[indices],
+            site_properties={
+                k: v[indices] for k, v in self.site_properties.items()
+            },
+            pbc=self.pbc,
+        )
+
+    def sort(self) -> np.ndarray:
+        """
+        Sorts the sites in-place in the same order as Structure.sort()
+        (electronegativity and then species string)
+
+        Returns:
+            Indices of the sites before sorting
+        """
+        unique_species = {}
+        for s in self.species:
+            if s not in unique_species:
+                unique_species[s] = (s.X, str(s))
+
+        electronegativities = np.array(
+            [unique_species[s][0] for s in self.species]
+        )
+        species_strings = np.array([unique_species[s][1] for s in self.species])
+
+        # np.lexsort is stable like the python sort used by pymatgen
+        sort_inds = np.lexsort((species_strings, electronegativities))
+
+        self.species = self.species[sort_inds]
+        self.frac_coords = self.frac_coords[sort_inds]
+        self.site_properties = {
+            k: v[sort_inds] for k, v in self.site_properties.items()
+        }
+        self._structure = None
+
+        return sort_inds
+
+    def set_lattice_matrix(
+        self,
+        lattice_matrix: np.ndarray,
+        to_unit_cell: bool = False,
+    ) -> None:
+        """
+        Changes the lattice while keeping the cartesian coordinates fixed
+
+        Args:
+            lattice_matrix: New (3, 3) lattice matrix
+            to_unit_cell: Determines if the coordinates are wrapped into the
+                new unit cell
+        """
+        cart_coords = self.cart_coords
+        self.lattice_matrix = np.array(lattice_matrix, dtype=float)
+        self.frac_coords = cart_coords.dot(np.linalg.inv(self.lattice_matrix))
+        self._structure = None
+
+        if to_unit_cell:
+            self.wrap()
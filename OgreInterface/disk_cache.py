@@ -0,0 +1,204 @@
+"""
+Content-addressed on-disk cache used to persist expensive intermediate
+results (i.e. oriented bulk structures) between runs.
+"""
+import typing as tp
+import os
+from os.path import join, isdir, getsize, getmtime
+import gzip
+import json
+import hashlib
+import tempfile
+
+from pymatgen.core.structure import Structure
+from monty.json import MontyEncoder, MontyDecoder
+import numpy as np
+
+# Version of the serialization format. Entries written with a different
+# version are treated as cache misses.
+CACHE_FORMAT_VERSION = 1
+
+# Site properties that are derived from the structure itself and therefore
+# should not change the hash of a structure
+_DERIVED_SITE_PROPERTIES = ("bulk_wyckoff", "bulk_equivalent")
+
+
+def get_structure_hash(structure: Structure, tol: int = 6) -> str:
+    """
+    Canonical hash of a structure. The lattice and fractional coordinates
+    are rounded to tol decimals and the fractional coordinates are wrapped
+    into the unit cell so numerically identical structures share a hash.
+    The site order is part of the hash because it determines the site order
+    of everything built from the structure.
+
+    Args:
+        structure: Pymatgen Structure to hash
+        tol: Number of decimals used to round the lattice and coordinates
+
+    Returns:
+        Hex digest of the sha256 hash
+    """
+    # Adding 0.0 removes negative zeros so -0.0 and 0.0 hash the same
+    matrix = np.round(structure.lattice.matrix, tol) + 0.0
+    frac_coords = np.mod(np.round(structure.frac_coords, tol), 1.0)
+    frac_coords = np.mod(np.round(frac_coords, tol), 1.0) + 0.0
+    atomic_numbers = np.array(structure.atomic_numbers).astype(np.int64)
+
+    site_properties = {
+        k: v
+        for k, v in structure.site_properties.items()
+        if k not in _DERIVED_SITE_PROPERTIES
+    }
+    site_properties_str = json.dumps(
+        site_properties,
+        cls=MontyEncoder,
+        sort_keys=True,
+    )
+
+    hasher = hashlib.sha256()
+    hasher.update(matrix.astype(np.float64).tobytes())
+    hasher.update(frac_coords.astype(np.float64).tobytes())
+    hasher.update(atomic_numbers.tobytes())
+    hasher.update(site_properties_str.encode())
+
+    return hasher.hexdigest()
+
+
+def get_hash(*parts: tp.Any) -> str:
+    """
+    Hash of an arbitrary set of json serializable (monty) objects.
+    """
+    parts_str = json.dumps(
+        [CACHE_FORMAT_VERSION, *parts],
+        cls=MontyEncoder,
+        sort_keys=True,
+    )
+
+    return hashlib.sha256(parts_str.encode()).hexdigest()
+
+
+class DiskCache:
+    """Size-bounded, content-addressed cache of json serializable objects.
+
+    Each entry is stored as a gzipped monty json file named by its key. The
+    modification time of a file is updated every time the entry is read so
+    the least recently used entries are evicted first when the total size of
+    the cache exceeds max_size. Writes are atomic so the same cache directory
+    can be shared between processes.
+
+    Examples:
+        >>> from OgreInterface.disk_cache import DiskCache, get_hash
+        >>> cache = DiskCache(cache_dir="./ogre_cache", max_size=512.0)
+        >>> key = get_hash("my_result", [1, 1, 1])
+        >>> cache.set(key, {"energy": 1.0})
+        >>> cache.get(key)
+        {'energy': 1.0}
+
+    Args:
+        cache_dir: Directory where the cache entries are stored
+        max_size: Maximum total size of the cache in MB
+
+    Attributes:
+        cache_dir (str): Directory where the cache entries are stored
+        max_size (float): Maximum total size of the cache in MB
+    """
+
+    _suffix = ".json.gz"
+
+    def __init__(self, cache_dir: str, max_size: float = 1024.0) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+        if not isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _get_path(self, key: str) -> str:
+        return join(self.cache_dir, f"{key}{self._suffix}")
+
+    def get(self, key: str) -> tp.Optional[tp.Any]:
+        """
+        Returns the cached object or None if the key is not in the cache
+        """
+        path = self._get_path(key)
+
+        try:
+            with gzip.open(path, "rt") as f:
+                data = json.load(f, cls=MontyDecoder)
+
+            # Mark the entry as recently used
+            os.utime(path)
+        except (OSError, EOFError, ValueError):
+            return None
+
+        if data.get("@version") != CACHE_FORMAT_VERSION:
+            return None
+
+        return data["value"]
+
+    def set(self, key: str, value: tp.Any) -> None:
+        """
+        Atomically writes an object to the cache and evicts the least
+        recently used entries if the cache is larger than max_size
+        """
+        data = {"@version": CACHE_FORMAT_VERSION, "value": value}
+        data_str = json.dumps(data, cls=MontyEncoder)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(data_str.encode()))
+
+            # mkstemp creates files that are only readable by the owner
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self._get_path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._evict()
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache
+        """
+        for path, _, _ in self._get_entries():
+            os.remove(path)
+
+    def _get_entries(self) -> tp.List[tp.Tuple[str, float, int]]:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self._suffix):
+                path = join(self.cache_dir, name)
+                try:
+                    entries.append((path, getmtime(path), getsize(path)))
+                except OSError:
+                    # Removed by another process
+                    continue
+
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._get_entries()
+        max_bytes = self.max_size * 1024**2
+        total_bytes = sum(e[2] for e in entries)
+
+        if total_bytes <= max_bytes:
+            return
+
+        for path, _, size in sorted(entries, key=lambda x: x[1]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+            total_bytes -= size
+
+            if total_bytes <= max_bytes:
+                break
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._get_path(key))
+
+    def __len__(self) -> int:
+        return len(self._get_entries())
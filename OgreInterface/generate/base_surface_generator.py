@@ -3,7 +3,7 @@ This module will be used to construct the surfaces and interfaces used in this p
 """
 from copy import deepcopy
 from typing import Union, List, TypeVar, Tuple, Dict, Optional
-from itertools import combinations, product, groupby
+from itertools import product, groupby
 from collections.abc import Sequence
 from abc import abstractmethod
 import math
@@ -17,8 +17,6 @@ from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 from pymatgen.core.operations import SymmOp
 from pymatgen.analysis.graphs import StructureGraph
 from pymatgen.analysis.local_env import JmolNN, CrystalNN
-from scipy.cluster.hierarchy import fcluster, linkage
-from scipy.spatial.distance import squareform
 from ase import Atoms
 from tqdm import tqdm
 import networkx as nx
@@ -27,7 +25,10 @@ import spglib
 
 
 from OgreInterface import utils
-from OgreInterface.surfaces.oriented_bulk import OrientedBulk
+from OgreInterface.surfaces.oriented_bulk import (
+    OrientedBulk,
+    get_oriented_bulk,
+)
 from OgreInterface.surfaces.surface import Surface
 from OgreInterface.surfaces.molecular_surface import MolecularSurface
 
@@ -128,7 +129,7 @@ class BaseSurfaceGenerator(Sequence):
         self.generate_all = generate_all
         self.lazy = lazy
 
-        self.obs = OrientedBulk(
+        self.obs = get_oriented_bulk(
             bulk=self.bulk_structure,
             miller_index=self.miller_index,
             make_planar=self._make_planar,
@@ -516,31 +517,20 @@ class BaseSurfaceGenerator(Sequence):
             shift = frac_coords[0] + 0.5
             return [shift - math.floor(shift)]
 
-        # We cluster the sites according to the c coordinates. But we need to
-        # take into account PBC. Let's compute a fractional c-coordinate
-        # distance matrix that accounts for PBC.
-        dist_matrix = np.zeros((n, n))
-
-        for i, j in combinations(list(range(n)), 2):
-            if i != j:
-                cdist = frac_coords[i] - frac_coords[j]
-                cdist = abs(cdist - round(cdist)) * h
-                dist_matrix[i, j] = cdist
-                dist_matrix[j, i] = cdist
-
-        condensed_m = squareform(dist_matrix)
-        z = linkage(condensed_m)
-        clusters = fcluster(
-            z,
-            self._layer_grouping_tolarence,
-            criterion="distance",
+        # We cluster the sites according to the c coordinates taking PBC into
+        # account. Sorting the coordinates and splitting on the gaps gives the
+        # same layers as single-linkage clustering without the n x n matrix.
+        clusters = utils.get_periodic_layer_clusters(
+            frac_coords=frac_coords,
+            height=h,
+            tol=self._layer_grouping_tolarence,
         )
 
-        # Generate dict of cluster to c val - doesn't matter what the c is.
-        c_loc = {c: frac_coords[i] for i, c in enumerate(clusters)}
-
-        # Put all c into the unit cell.
-        possible_c = [c - math.floor(c) for c in sorted(c_loc.values())]
+        # One c value per cluster - doesn't matter what the c is.
+        possible_c = utils.get_cluster_c_values(
+            frac_coords=frac_coords,
+            clusters=clusters,
+        )
 
         # Calculate the shifts
         nshifts = len(possible_c)
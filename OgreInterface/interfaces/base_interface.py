@@ -21,6 +21,7 @@ import numpy as np
 from ase import Atoms
 
 from OgreInterface import utils
+from OgreInterface.array_structure import ArrayStructure
 from OgreInterface.surfaces import OrientedBulk, Surface, BaseSurface
 from OgreInterface.lattice_match import OgreMatch
 from OgreInterface.plotting_tools import plot_match
@@ -37,6 +38,20 @@ warnings.filterwarnings("ignore", module=r"pymatgen.analysis.local_env")
 SelfBaseInterface = tp.TypeVar("SelfBaseInterface", bound="BaseInterface")
 
 
+def _array_structure_property(arrays_name: str) -> property:
+    # Exposes the ArrayStructure stored in arrays_name as a pymatgen
+    # Structure that is only built when it is accessed (and then cached by the
+    # ArrayStructure until the next shift). Setting the property replaces the
+    # arrays with the given Structure.
+    def getter(self) -> Structure:
+        return getattr(self, arrays_name).structure
+
+    def setter(self, structure: Structure) -> None:
+        setattr(self, arrays_name, ArrayStructure.from_structure(structure))
+
+    return property(getter, setter)
+
+
 class BaseInterface(ABC):
     """Container of Interfaces generated using the InterfaceGenerator
 
@@ -129,16 +144,36 @@ class BaseInterface(ABC):
             self._film_strain_matrix,
         ) = self._prepare_film()
 
+        # The interface structures are stored as arrays and only converted
+        # to pymatgen Structures when they are accessed (see
+        # _array_structure_property)
         (
             self._M_matrix,
-            self._non_orthogonal_structure,
-            self._non_orthogonal_substrate_structure,
-            self._non_orthogonal_film_structure,
-            self._orthogonal_structure,
-            self._orthogonal_substrate_structure,
-            self._orthogonal_film_structure,
+            self._non_orthogonal_arrays,
+            self._non_orthogonal_substrate_arrays,
+            self._non_orthogonal_film_arrays,
+            self._orthogonal_arrays,
+            self._orthogonal_substrate_arrays,
+            self._orthogonal_film_arrays,
         ) = self._stack_interface()
 
+    _non_orthogonal_structure = _array_structure_property(
+        "_non_orthogonal_arrays"
+    )
+    _non_orthogonal_substrate_structure = _array_structure_property(
+        "_non_orthogonal_substrate_arrays"
+    )
+    _non_orthogonal_film_structure = _array_structure_property(
+        "_non_orthogonal_film_arrays"
+    )
+    _orthogonal_structure = _array_structure_property("_orthogonal_arrays")
+    _orthogonal_substrate_structure = _array_structure_property(
+        "_orthogonal_substrate_arrays"
+    )
+    _orthogonal_film_structure = _array_structure_property(
+        "_orthogonal_film_arrays"
+    )
+
     def _get_average_inplane_lattice(self):
         film_lattice = self._film_supercell.lattice.matrix[:2]
         substrate_lattice = self._substrate_supercell.lattice.matrix[:2]
@@ -634,25 +669,27 @@ class BaseInterface(ABC):
 
     def _shift_film(
         self,
-        interface: Structure,
         shift: tp.Iterable,
         fractional: bool,
-    ) -> tp.Tuple[Structure, Structure]:
-        shifted_interface_structure = utils.shift_film(
-            interface=interface,
-            shift=shift,
-            fractional=fractional,
-        )
-
-        (
-            shifted_film_structure,
-            _,
-        ) = self._get_film_and_substrate_parts(shifted_interface_structure)
-
-        return (
-            shifted_interface_structure,
-            shifted_film_structure,
-        )
+    ) -> None:
+        # Only the film coordinates are updated in-place, the Structures are
+        # rebuilt from the arrays the next time they are accessed
+        for interface_arrays, film_arrays in [
+            (self._orthogonal_arrays, self._orthogonal_film_arrays),
+            (self._non_orthogonal_arrays, self._non_orthogonal_film_arrays),
+        ]:
+            interface_arrays.translate_sites(
+                indices=interface_arrays.get_mask("is_film"),
+                vector=shift,
+                frac_coords=fractional,
+                to_unit_cell=True,
+            )
+            film_arrays.translate_sites(
+                indices=slice(None),
+                vector=shift,
+                frac_coords=fractional,
+                to_unit_cell=True,
+            )
 
     def set_interfacial_distance(self, interfacial_distance: float) -> None:
         """
@@ -668,22 +705,7 @@ class BaseInterface(ABC):
             [0.0, 0.0, interfacial_distance - self.interfacial_distance]
         )
         self.interfacial_distance = interfacial_distance
-        (
-            self._orthogonal_structure,
-            self._orthogonal_film_structure,
-        ) = self._shift_film(
-            interface=self._orthogonal_structure,
-            shift=shift,
-            fractional=False,
-        )
-        (
-            self._non_orthogonal_structure,
-            self._non_orthogonal_film_structure,
-        ) = self._shift_film(
-            interface=self._non_orthogonal_structure,
-            shift=shift,
-            fractional=False,
-        )
+        self._shift_film(shift=shift, fractional=False)
 
     def shift_film_inplane(
         self,
@@ -711,31 +733,14 @@ class BaseInterface(ABC):
         if fractional:
             frac_shift = shift_array
         else:
-            frac_shift = (
-                self._orthogonal_structure.lattice.get_fractional_coords(
-                    shift_array
-                )
+            frac_shift = shift_array.dot(
+                np.linalg.inv(self._orthogonal_arrays.lattice_matrix)
             )
 
         self._a_shift += shift_array[0]
         self._b_shift += shift_array[1]
 
-        (
-            self._orthogonal_structure,
-            self._orthogonal_film_structure,
-        ) = self._shift_film(
-            interface=self._orthogonal_structure,
-            shift=frac_shift,
-            fractional=True,
-        )
-        (
-            self._non_orthogonal_structure,
-            self._non_orthogonal_film_structure,
-        ) = self._shift_film(
-            interface=self._non_orthogonal_structure,
-            shift=frac_shift,
-            fractional=True,
-        )
+        self._shift_film(shift=frac_shift, fractional=True)
 
     def _create_supercell(
         self, substrate: bool = True
@@ -912,12 +917,12 @@ class BaseInterface(ABC):
         self,
     ) -> tp.Tuple[
         np.ndarray,
-        Structure,
-        Structure,
-        Structure,
-        Structure,
-        Structure,
-        Structure,
+        ArrayStructure,
+        ArrayStructure,
+        ArrayStructure,
+        ArrayStructure,
+        ArrayStructure,
+        ArrayStructure,
     ]:
         # Get the strained substrate and film
         strained_sub = self._strained_sub
@@ -1034,24 +1039,24 @@ class BaseInterface(ABC):
         )
 
         # Create the non-orthogonalized interface structure
-        non_ortho_interface_struc = Structure(
-            lattice=interface_lattice,
+        non_ortho_interface_arrays = ArrayStructure(
+            lattice_matrix=interface_lattice.matrix,
             species=interface_species,
-            coords=interface_coords,
-            to_unit_cell=True,
-            coords_are_cartesian=False,
+            frac_coords=interface_coords,
             site_properties=interface_site_properties,
+            pbc=interface_lattice.pbc,
+            to_unit_cell=True,
         )
-        non_ortho_interface_struc.sort()
+        non_ortho_interface_arrays.sort()
 
-        non_ortho_interface_struc.add_site_property(
-            "interface_equivalent", list(range(len(non_ortho_interface_struc)))
-        )
+        non_ortho_interface_arrays.site_properties[
+            "interface_equivalent"
+        ] = np.arange(len(non_ortho_interface_arrays))
 
         if self.center:
             # Get the new vacuum length, needed for shifting
             c_coords = np.mod(
-                np.round(non_ortho_interface_struc.frac_coords[:, -1], 6), 1.0
+                np.round(non_ortho_interface_arrays.frac_coords[:, -1], 6), 1.0
             )
             min_c = c_coords.min()
             max_c = c_coords.max()
@@ -1066,34 +1071,34 @@ class BaseInterface(ABC):
             # center_shift *= oriented_bulk_c / interface_c_len
 
             # Center the structure in the vacuum
-            non_ortho_interface_struc.translate_sites(
-                indices=range(len(non_ortho_interface_struc)),
+            non_ortho_interface_arrays.translate_sites(
+                indices=np.arange(len(non_ortho_interface_arrays)),
                 vector=[0.0, 0.0, center_shift],
                 frac_coords=True,
                 to_unit_cell=True,
             )
 
         # Get the frac coords of the non-orthogonalized interface
-        frac_coords = non_ortho_interface_struc.frac_coords
+        frac_coords = non_ortho_interface_arrays.frac_coords
 
         # Find the max c-coord of the substrate
         # This is used to shift the x-y positions of the interface structure so the top atom of the substrate
         # is located at x=0, y=0. This will have no effect of the properties of the interface since all the
         # atoms are shifted, it is more of a visual thing to make the interfaces look nice.
-        is_sub = np.array(non_ortho_interface_struc.site_properties["is_sub"])
+        is_sub = non_ortho_interface_arrays.get_mask("is_sub")
         sub_frac_coords = frac_coords[is_sub]
         max_c = np.max(sub_frac_coords[:, -1])
 
         # Find the xy-shift in cartesian coordinates
         cart_shift = np.array([0.0, 0.0, max_c]).dot(
-            non_ortho_interface_struc.lattice.matrix
+            non_ortho_interface_arrays.lattice_matrix
         )
         cart_shift[-1] = 0.0
 
         # Get the projection of the non-orthogonal c-vector onto the surface normal
         proj_c = np.dot(
             self.substrate.surface_normal,
-            non_ortho_interface_struc.lattice.matrix[-1],
+            non_ortho_interface_arrays.lattice_matrix[-1],
         )
 
         # Get the orthogonalized c-vector of the interface (this conserves the vacuum, but breaks symmetries)
@@ -1102,24 +1107,21 @@ class BaseInterface(ABC):
         # Create the orthogonalized lattice vectors
         new_matrix = np.vstack(
             [
-                non_ortho_interface_struc.lattice.matrix[:2],
+                non_ortho_interface_arrays.lattice_matrix[:2],
                 ortho_c,
             ]
         )
 
         # Create the orthogonalized structure
-        ortho_interface_struc = Structure(
-            lattice=Lattice(new_matrix),
-            species=non_ortho_interface_struc.species,
-            coords=non_ortho_interface_struc.cart_coords,
-            site_properties=non_ortho_interface_struc.site_properties,
+        ortho_interface_arrays = non_ortho_interface_arrays.copy()
+        ortho_interface_arrays.set_lattice_matrix(
+            lattice_matrix=new_matrix,
             to_unit_cell=True,
-            coords_are_cartesian=True,
         )
 
         # Shift the structure so the top substrate atom's x and y postions are zero, similar to the non-orthogonalized structure
-        ortho_interface_struc.translate_sites(
-            indices=range(len(ortho_interface_struc)),
+        ortho_interface_arrays.translate_sites(
+            indices=np.arange(len(ortho_interface_arrays)),
             vector=-cart_shift,
             frac_coords=False,
             to_unit_cell=True,
@@ -1128,38 +1130,47 @@ class BaseInterface(ABC):
         # The next step is used extract on the film and substrate portions of the interface
         # These can be used for charge transfer calculation
         (
-            ortho_film_structure,
-            ortho_sub_structure,
-        ) = self._get_film_and_substrate_parts(ortho_interface_struc)
+            ortho_film_arrays,
+            ortho_sub_arrays,
+        ) = self._split_film_and_substrate(ortho_interface_arrays)
         (
-            non_ortho_film_structure,
-            non_ortho_sub_structure,
-        ) = self._get_film_and_substrate_parts(non_ortho_interface_struc)
+            non_ortho_film_arrays,
+            non_ortho_sub_arrays,
+        ) = self._split_film_and_substrate(non_ortho_interface_arrays)
 
         return (
             interface_M,
-            non_ortho_interface_struc,
-            non_ortho_sub_structure,
-            non_ortho_film_structure,
-            ortho_interface_struc,
-            ortho_sub_structure,
-            ortho_film_structure,
+            non_ortho_interface_arrays,
+            non_ortho_sub_arrays,
+            non_ortho_film_arrays,
+            ortho_interface_arrays,
+            ortho_sub_arrays,
+            ortho_film_arrays,
         )
 
+    def _split_film_and_substrate(
+        self,
+        interface_arrays: ArrayStructure,
+    ) -> tp.Tuple[ArrayStructure, ArrayStructure]:
+        film_arrays = interface_arrays.select(
+            ~interface_arrays.get_mask("is_sub")
+        )
+        sub_arrays = interface_arrays.select(
+            ~interface_arrays.get_mask("is_film")
+        )
+
+        return film_arrays, sub_arrays
+
     def _get_film_and_substrate_parts(
         self,
-        interface: Structure,
+        interface: tp.Union[Structure, ArrayStructure],
     ) -> tp.Tuple[Structure, Structure]:
-        film_inds = np.where(interface.site_properties["is_film"])[0]
-        sub_inds = np.where(interface.site_properties["is_sub"])[0]
-
-        film_structure = interface.copy()
-        film_structure.remove_sites(sub_inds)
+        if isinstance(interface, Structure):
+            interface = ArrayStructure.from_structure(interface)
 
-        sub_structure = interface.copy()
-        sub_structure.remove_sites(film_inds)
+        film_arrays, sub_arrays = self._split_film_and_substrate(interface)
 
-        return film_structure, sub_structure
+        return film_arrays.structure, sub_arrays.structure
 
     @property
     def _metallic_elements(self):
@@ -1,5 +1,4 @@
 import typing as tp
-import itertools
 
 from pymatgen.core.structure import Structure
 from pymatgen.core.periodic_table import Element
@@ -52,45 +51,37 @@ class Interface(BaseInterface):
                 For example if you wanted to replace InAs with ZnTe then the species mapping would
                 be as shown in the example above.
         """
-        species_str = self._orthogonal_structure[site_index].species_string
+        species_str = str(self._orthogonal_arrays.species[site_index])
 
         if species_str in species_mapping:
-            is_sub = self._non_orthogonal_structure[site_index].properties[
-                "is_sub"
-            ]
-            self._non_orthogonal_structure[site_index].species = Element(
-                species_mapping[species_str]
-            )
-            self._orthogonal_structure[site_index].species = Element(
-                species_mapping[species_str]
-            )
+            new_species = Element(species_mapping[species_str])
+            is_sub = self._non_orthogonal_arrays.get_mask("is_sub")[site_index]
 
             if is_sub:
-                sub_iface_equiv = np.array(
-                    self._orthogonal_substrate_structure.site_properties[
-                        "interface_equivalent"
-                    ]
-                )
-                sub_site_ind = np.where(sub_iface_equiv == site_index)[0][0]
-                self._non_orthogonal_substrate_structure[
-                    sub_site_ind
-                ].species = Element(species_mapping[species_str])
-                self._orthogonal_substrate_structure[
-                    sub_site_ind
-                ].species = Element(species_mapping[species_str])
+                part_arrays = [
+                    self._non_orthogonal_substrate_arrays,
+                    self._orthogonal_substrate_arrays,
+                ]
             else:
-                film_iface_equiv = np.array(
-                    self._orthogonal_film_structure.site_properties[
-                        "interface_equivalent"
-                    ]
-                )
-                film_site_ind = np.where(film_iface_equiv == site_index)[0][0]
-                self._non_orthogonal_film_structure[
-                    film_site_ind
-                ].species = Element(species_mapping[species_str])
-                self._orthogonal_film_structure[
-                    film_site_ind
-                ].species = Element(species_mapping[species_str])
+                part_arrays = [
+                    self._non_orthogonal_film_arrays,
+                    self._orthogonal_film_arrays,
+                ]
+
+            iface_equiv = part_arrays[-1].site_properties[
+                "interface_equivalent"
+            ]
+            part_site_ind = np.where(iface_equiv == site_index)[0][0]
+
+            # The species are changed in the arrays so they are kept when the
+            # structures are rebuilt after a shift of the film
+            for arrays, ind in [
+                (self._non_orthogonal_arrays, site_index),
+                (self._orthogonal_arrays, site_index),
+                (part_arrays[0], part_site_ind),
+                (part_arrays[1], part_site_ind),
+            ]:
+                arrays.set_species(ind, new_species)
         else:
             raise ValueError(
                 f"Species: {species_str} is not is species mapping"
@@ -496,40 +487,11 @@ class Interface(BaseInterface):
             poscar_str = poscar.get_str()
 
         else:
-            syms = [site.specie.symbol for site in slab]
-
-            syms = []
-            for site in slab:
-                if site.specie.symbol == "H":
-                    if hasattr(site.specie, "oxi_state"):
-                        oxi = site.specie.oxi_state
-
-                        if oxi < 1.0 and oxi != 0.5:
-                            H_str = "H" + f"{oxi:.2f}"[1:]
-                        elif oxi == 0.5:
-                            H_str = "H.5"
-                        elif oxi > 1.0 and oxi != 1.5:
-                            H_str = "H" + f"{oxi:.2f}"
-                        elif oxi == 1.5:
-                            H_str = "H1.5"
-                        else:
-                            H_str = "H"
-
-                        syms.append(H_str)
-                else:
-                    syms.append(site.specie.symbol)
-
-            comp_list = [
-                (a[0], len(list(a[1]))) for a in itertools.groupby(syms)
-            ]
-            atom_types, n_atoms = zip(*comp_list)
-
-            new_atom_types = []
-            for atom in atom_types:
-                if "H" == atom[0] and atom not in ["Hf", "Hs", "Hg", "He"]:
-                    new_atom_types.append("H")
-                else:
-                    new_atom_types.append(atom)
+            (
+                atom_types,
+                new_atom_types,
+                n_atoms,
+            ) = utils.get_passivated_poscar_species(slab.species)
 
             comment += "|potcar=" + " ".join(atom_types)
 
@@ -2,6 +2,15 @@ import numpy as np
 from typing import List, Tuple, Iterable, Union, Optional
 from dataclasses import dataclass
 
+# Approximate number of bytes held per candidate (film, substrate) pair while
+# a block is being screened (descriptor differences, masks, indices and the
+# 2x2 strain matrices of the survivors)
+_BYTES_PER_PAIR = 128
+
+# Number of |a|-sorted film supercells swept against the substrate index at
+# once. Small blocks keep the queried substrate |a| window narrow.
+_FILM_BLOCK_SIZE = 64
+
 
 @dataclass
 class OgreMatch:
@@ -64,6 +73,50 @@ class OgreMatch:
         return total_distortion
 
 
+@dataclass
+class SupercellIndex:
+    """
+    Reduced supercell vectors of a single supercell area sorted by |a|, |b|
+    and the a-b angle. The a-vectors of the aligned vectors all point along
+    the x-direction, so the feasible partners of a vector with length |a|
+    are found with a range query on the sorted |a| values.
+
+    Attributes:
+        transforms: (N, 2, 2) Zur and McGill supercell transformations
+        reduced_vectors: (N, 2, 3) Reduced supercell vectors
+        reduction_matrices: (N, 2, 2) Reduction matrices of the supercells
+        a_to_i_transforms: (N, 3, 3) Rotations aligning a with [1, 0, 0]
+        aligned_vectors: (N, 2, 3) Reduced vectors after the a to i rotation
+        order: (N,) Indices that sort the supercells by |a|, |b| and angle
+        a_norm: (N,) Sorted lengths of the a-vectors
+        b_norm: (N,) Lengths of the b-vectors in sorted order
+        ab_angle: (N,) Angles between the a- and b-vectors in sorted order
+    """
+
+    transforms: np.ndarray
+    reduced_vectors: np.ndarray
+    reduction_matrices: np.ndarray
+    a_to_i_transforms: np.ndarray
+    aligned_vectors: np.ndarray
+    order: np.ndarray
+    a_norm: np.ndarray
+    b_norm: np.ndarray
+    ab_angle: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def query(self, a_min: float, a_max: float) -> Tuple[int, int]:
+        """
+        Returns the (start, stop) positions in the sorted index of all
+        supercells with a_min <= |a| <= a_max
+        """
+        start = np.searchsorted(self.a_norm, a_min, side="left")
+        stop = np.searchsorted(self.a_norm, a_max, side="right")
+
+        return start, stop
+
+
 class ZurMcGill:
     def __init__(
         self,
@@ -75,6 +128,7 @@ class ZurMcGill:
         max_strain: float = 0.01,
         max_area_mismatch: Optional[float] = None,
         max_area_scale_factor: float = 4.1,
+        max_pair_memory: float = 256.0,
     ) -> None:
         self.film_vectors = film_vectors
         self.film_basis = film_basis
@@ -100,6 +154,23 @@ class ZurMcGill:
         self.area_ratio = self.film_area / self.substrate_area
         self.film_rs, self.substrate_rs = self._get_rs()
 
+        # Max number of (film, substrate) pairs screened at once so the peak
+        # memory of _is_same stays below max_pair_memory (in MB)
+        self.max_pair_memory = max_pair_memory
+        self._max_pairs_per_block = max(
+            int(max_pair_memory * 1024**2) // _BYTES_PER_PAIR, 1
+        )
+
+        # Relative tolerance used to prune the a and b vectors before any
+        # strain matrix is built. The 1e-5 accounts for the strain being
+        # rounded to 5 decimals in _is_same
+        self._prune_tol = np.sqrt(2) * (self.max_strain + 1e-5)
+
+        # Supercell indices are shared between all area pairs with the same
+        # film or substrate area multiple
+        self._film_indices = {}
+        self._substrate_indices = {}
+
     def _get_area(self, vectors: np.ndarray) -> float:
         return np.linalg.norm(np.cross(vectors[0], vectors[1]))
 
@@ -113,24 +184,39 @@ class ZurMcGill:
 
         return film_rs, substrate_rs
 
-    def run(self, return_all: bool = True) -> List[OgreMatch]:
+    def run(
+        self,
+        return_all: bool = True,
+        min_area_only: bool = False,
+    ) -> List[OgreMatch]:
+        """
+        Find all lattice matches between the film and substrate
+
+        Args:
+            return_all: Determines if all supercell pairs are checked or if the
+                search stops after the first supercell pair with a match.
+            min_area_only: If True, the supercell pairs are walked in ascending
+                order of the interface area and the search stops after the
+                smallest area with any match. OgreMatch objects are only built
+                for the matches with that area.
+
+        Returns:
+            List of OgreMatch objects sorted by area and strain
+        """
         matches = []
-        for transforms in self._get_transformation_matrices():
-            film_transforms = transforms[0]
-            sub_transforms = transforms[1]
-
-            film_sl_vectors, sub_sl_vectors = self._get_unreduced_vectors(
-                film_transforms=film_transforms, sub_transforms=sub_transforms
-            )
-
-            (
-                reduced_film_sl_vectors,
-                film_reduction_matrices,
-                reduced_sub_sl_vectors,
-                sub_reduction_matrices,
-            ) = self._get_reduced_vectors(
-                film_sl_vectors=film_sl_vectors, sub_sl_vectors=sub_sl_vectors
-            )
+        min_area_n = None
+        for sub_n, film_index, sub_index in self._get_supercell_indices(
+            sort_by_area=min_area_only
+        ):
+            if min_area_n is not None and sub_n > min_area_n:
+                break
+
+            film_transforms = film_index.transforms
+            sub_transforms = sub_index.transforms
+            reduced_film_sl_vectors = film_index.reduced_vectors
+            reduced_sub_sl_vectors = sub_index.reduced_vectors
+            film_reduction_matrices = film_index.reduction_matrices
+            sub_reduction_matrices = sub_index.reduction_matrices
 
             (
                 eq_strains,
@@ -140,8 +226,8 @@ class ZurMcGill:
                 eq_film_align_transforms,
                 eq_strain_transforms,
             ) = self._is_same(
-                film_vectors=reduced_film_sl_vectors,
-                sub_vectors=reduced_sub_sl_vectors,
+                film_index=film_index,
+                sub_index=sub_index,
             )
             n_matches = len(eq_film_inds)
 
@@ -232,6 +318,9 @@ class ZurMcGill:
 
                 matches.extend(same_area_matches)
 
+                if min_area_only:
+                    min_area_n = sub_n
+
                 if not return_all:
                     break
 
@@ -295,60 +384,187 @@ class ZurMcGill:
 
         return transformations
 
-    def _is_same(
-        self, film_vectors: np.ndarray, sub_vectors: np.ndarray
-    ) -> Iterable[np.ndarray]:
-        film_a_norm = self._vec_norm(film_vectors[:, 0])
-        sub_a_norm = self._vec_norm(sub_vectors[:, 0])
+    def _get_supercell_index(
+        self,
+        transforms: np.ndarray,
+        vectors: np.ndarray,
+    ) -> SupercellIndex:
+        sl_vectors = np.einsum("...ij,jk", transforms, vectors)
+        reduced_vectors, reduction_matrices = reduce_vectors_zur_and_mcgill(
+            sl_vectors
+        )
 
-        film_a_to_i_transform = self._build_a_to_i(
-            vectors=film_vectors,
-            a_norms=film_a_norm,
+        a_norm = self._vec_norm(reduced_vectors[:, 0])
+        a_to_i_transforms = self._build_a_to_i(
+            vectors=reduced_vectors,
+            a_norms=a_norm,
         )
-        sub_a_to_i_transform = self._build_a_to_i(
-            vectors=sub_vectors,
-            a_norms=sub_a_norm,
+        aligned_vectors = self._apply_a_to_i_rotation(
+            vectors=reduced_vectors,
+            a_to_i_transforms=a_to_i_transforms,
         )
 
-        aligned_film_vectors = self._apply_a_to_i_rotation(
-            vectors=film_vectors,
-            a_to_i_transforms=film_a_to_i_transform,
+        b_norm = self._vec_norm(aligned_vectors[:, 1])
+        ab_angle = self._vec_angle(
+            aligned_vectors[:, 0],
+            aligned_vectors[:, 1],
         )
-
-        aligned_sub_vectors = self._apply_a_to_i_rotation(
-            vectors=sub_vectors,
-            a_to_i_transforms=sub_a_to_i_transform,
+        order = np.lexsort((ab_angle, b_norm, a_norm))
+
+        return SupercellIndex(
+            transforms=transforms,
+            reduced_vectors=reduced_vectors,
+            reduction_matrices=reduction_matrices,
+            a_to_i_transforms=a_to_i_transforms,
+            aligned_vectors=aligned_vectors,
+            order=order,
+            a_norm=a_norm[order],
+            b_norm=b_norm[order],
+            ab_angle=ab_angle[order],
         )
 
-        X, Y = np.meshgrid(range(len(film_a_norm)), range(len(sub_a_norm)))
-        product_inds = np.c_[X.ravel(), Y.ravel()]
+    def _get_supercell_indices(
+        self,
+        sort_by_area: bool = False,
+    ) -> Iterable[Tuple[int, SupercellIndex, SupercellIndex]]:
+        matching_areas = self._get_matching_areas()
+
+        if sort_by_area:
+            # The area of a match is the area of the substrate supercell so the
+            # substrate multiple orders the supercell pairs by area
+            sort_inds = np.argsort(matching_areas[:, 1], kind="stable")
+            matching_areas = matching_areas[sort_inds]
+
+        for film_n, sub_n in matching_areas:
+            if film_n not in self._film_indices:
+                self._film_indices[film_n] = self._get_supercell_index(
+                    transforms=self._get_factors(film_n),
+                    vectors=self.film_vectors,
+                )
+
+            if sub_n not in self._substrate_indices:
+                self._substrate_indices[sub_n] = self._get_supercell_index(
+                    transforms=self._get_factors(sub_n),
+                    vectors=self.substrate_vectors,
+                )
+
+            yield (
+                sub_n,
+                self._film_indices[film_n],
+                self._substrate_indices[sub_n],
+            )
 
-        film_inds = product_inds[:, 0]
-        sub_inds = product_inds[:, 1]
+    def _get_candidate_pairs(
+        self,
+        film_index: SupercellIndex,
+        sub_index: SupercellIndex,
+    ) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Streams blocks of (film, substrate) index pairs that can possibly be
+        strained into each other within max_strain. Since the strain matrix
+        T maps the aligned film vectors onto the aligned substrate vectors,
+        |v_sub - v_film| <= |v_film| * ||I - T|| = sqrt(2) * strain * |v_film|
+        for both the a and b vectors. The |a| condition is a range query on
+        the sorted substrate index and the |b| and a-b angle conditions are
+        checked before any strain matrix is built.
+        """
+        n_film = len(film_index)
+        film_block = min(_FILM_BLOCK_SIZE, self._max_pairs_per_block)
+        sub_block = max(self._max_pairs_per_block // film_block, 1)
+
+        for i in range(0, n_film, film_block):
+            f_a = film_index.a_norm[i : i + film_block, None]
+            f_b = film_index.b_norm[i : i + film_block, None]
+            f_angle = film_index.ab_angle[i : i + film_block, None]
+
+            # The film index is sorted by |a| so the block's substrate
+            # partners are in one contiguous window of the substrate index
+            start, stop = sub_index.query(
+                a_min=f_a[0, 0] * (1 - self._prune_tol),
+                a_max=f_a[-1, 0] * (1 + self._prune_tol),
+            )
+
+            for j in range(start, stop, sub_block):
+                s_a = sub_index.a_norm[None, j : min(j + sub_block, stop)]
+                s_b = sub_index.b_norm[None, j : min(j + sub_block, stop)]
+                s_angle = sub_index.ab_angle[None, j : min(j + sub_block, stop)]
+
+                # Both a-vectors point along x so |a_sub - a_film| is just
+                # the difference of their lengths
+                is_close = np.abs(s_a - f_a) <= self._prune_tol * f_a
+
+                # Length difference of the b-vectors
+                is_close &= np.abs(s_b - f_b) <= self._prune_tol * f_b
+
+                # Full |b_sub - b_film| from the lengths and a-b angles
+                b_diff_sq = (
+                    (f_b**2)
+                    + (s_b**2)
+                    - (2 * f_b * s_b * np.cos(s_angle - f_angle))
+                )
+                is_close &= b_diff_sq <= (self._prune_tol * f_b) ** 2
+
+                block_film_inds, block_sub_inds = np.nonzero(is_close)
+
+                if len(block_film_inds) > 0:
+                    yield (
+                        film_index.order[block_film_inds + i],
+                        sub_index.order[block_sub_inds + j],
+                    )
+
+    def _is_same(
+        self, film_index: SupercellIndex, sub_index: SupercellIndex
+    ) -> Iterable[np.ndarray]:
+        aligned_film_vectors = film_index.aligned_vectors
+        aligned_sub_vectors = sub_index.aligned_vectors
 
         film_inverse_2d_vectors = self._2d_inv(vectors=aligned_film_vectors)
 
-        strain_transformations = self._get_strain_transformation(
-            film_inverse_vectors=film_inverse_2d_vectors[film_inds],
-            substrate_vectors=aligned_sub_vectors[sub_inds][:, :, :2],
-        )
+        eq_strain = []
+        eq_film_inds = []
+        eq_sub_inds = []
+        eq_strain_transform = []
+
+        for film_inds, sub_inds in self._get_candidate_pairs(
+            film_index=film_index,
+            sub_index=sub_index,
+        ):
+            strain_transformations = self._get_strain_transformation(
+                film_inverse_vectors=film_inverse_2d_vectors[film_inds],
+                substrate_vectors=aligned_sub_vectors[sub_inds][:, :, :2],
+            )
 
-        identities = np.repeat(
-            np.eye(2).reshape(-1, 2, 2), repeats=len(film_inds), axis=0
-        )
+            strain = (1 / np.sqrt(2)) * self._matrix_norm(
+                matrices=(np.eye(2) - strain_transformations)
+            )
 
-        strain = (1 / np.sqrt(2)) * self._matrix_norm(
-            matrices=(identities - strain_transformations)
-        )
+            is_equal = np.round(strain, 5) <= self.max_strain
 
-        is_equal = np.round(strain, 5) <= self.max_strain
+            eq_strain.append(strain[is_equal])
+            eq_film_inds.append(film_inds[is_equal])
+            eq_sub_inds.append(sub_inds[is_equal])
+            eq_strain_transform.append(strain_transformations[is_equal])
 
-        eq_strain = strain[is_equal]
-        eq_film_inds = film_inds[is_equal]
-        eq_sub_inds = sub_inds[is_equal]
-        eq_sub_align_transform = sub_a_to_i_transform[eq_sub_inds]
-        eq_film_align_transform = film_a_to_i_transform[eq_film_inds]
-        eq_strain_transform = strain_transformations[is_equal]
+        if len(eq_strain) > 0:
+            eq_strain = np.concatenate(eq_strain)
+            eq_film_inds = np.concatenate(eq_film_inds)
+            eq_sub_inds = np.concatenate(eq_sub_inds)
+            eq_strain_transform = np.concatenate(eq_strain_transform)
+        else:
+            eq_strain = np.zeros(0)
+            eq_film_inds = np.zeros(0, dtype=int)
+            eq_sub_inds = np.zeros(0, dtype=int)
+            eq_strain_transform = np.zeros((0, 2, 2))
+
+        # Keep the substrate-major ordering of the full Cartesian product
+        sort_inds = np.lexsort((eq_film_inds, eq_sub_inds))
+        eq_strain = eq_strain[sort_inds]
+        eq_film_inds = eq_film_inds[sort_inds]
+        eq_sub_inds = eq_sub_inds[sort_inds]
+        eq_strain_transform = eq_strain_transform[sort_inds]
+
+        eq_sub_align_transform = sub_index.a_to_i_transforms[eq_sub_inds]
+        eq_film_align_transform = film_index.a_to_i_transforms[eq_film_inds]
 
         return (
             eq_strain,
@@ -400,25 +616,6 @@ class ZurMcGill:
 
         return matching_areas
 
-    def _get_transformation_matrices(self) -> Iterable[np.ndarray]:
-        matching_areas = self._get_matching_areas()
-        factor_dict = {
-            n: self._get_factors(n) for n in np.unique(matching_areas)
-        }
-
-        for ns in matching_areas:
-            yield (factor_dict[ns[0]], factor_dict[ns[1]])
-
-    def _get_unreduced_vectors(self, film_transforms, sub_transforms):
-        film_sl_vectors = np.einsum(
-            "...ij,jk", film_transforms, self.film_vectors
-        )
-        sub_sl_vectors = np.einsum(
-            "...ij,jk", sub_transforms, self.substrate_vectors
-        )
-
-        return film_sl_vectors, sub_sl_vectors
-
     def _get_sl_basis(self, film_transforms, sub_transforms):
         film_sl_basis = np.einsum(
             "...ij,jk", film_transforms, self.film_basis[:2]
@@ -438,25 +635,6 @@ class ZurMcGill:
             sub_sl_scale_factors,
         )
 
-    def _get_reduced_vectors(
-        self, film_sl_vectors: np.ndarray, sub_sl_vectors: np.ndarray
-    ) -> Iterable[np.ndarray]:
-        (
-            reduced_film_sl_vectors,
-            film_reduction_matrix,
-        ) = reduce_vectors_zur_and_mcgill(film_sl_vectors)
-        (
-            reduced_sub_sl_vectors,
-            sub_reduction_matrix,
-        ) = reduce_vectors_zur_and_mcgill(sub_sl_vectors)
-
-        return (
-            reduced_film_sl_vectors,
-            film_reduction_matrix,
-            reduced_sub_sl_vectors,
-            sub_reduction_matrix,
-        )
-
     def _get_factors(self, n: int) -> np.ndarray:
         factors = []
         upper_right = []
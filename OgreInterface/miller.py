@@ -1,5 +1,7 @@
 from itertools import product
-from typing import Union, Optional, List
+from multiprocessing import Pool
+from contextlib import nullcontext
+from typing import Union, Optional, List, Tuple, Dict
 
 from pymatgen.core.structure import Structure
 from pymatgen.io.ase import AseAtomsAdaptor
@@ -13,11 +15,51 @@ from matplotlib.colors import Normalize
 from mpl_toolkits.axes_grid1.axes_divider import make_axes_locatable
 
 from OgreInterface.generate import SurfaceGenerator
-from OgreInterface.surfaces import OrientedBulk
+from OgreInterface.surfaces import get_oriented_bulk
 from OgreInterface.lattice_match import ZurMcGill
 from OgreInterface import utils
 
 
+def _get_oriented_bulk_data(
+    inputs: Tuple[Structure, List[int]]
+) -> List[np.ndarray]:
+    # Worker of MillerSearch.run_scan (module level so only the inputs are
+    # sent to the worker processes)
+    bulk, miller_index = inputs
+    obs = get_oriented_bulk(
+        bulk=bulk,
+        miller_index=miller_index,
+        make_planar=True,
+    )
+
+    return [obs.inplane_vectors, obs.area, obs.crystallographic_basis]
+
+
+def _get_min_area_match(
+    inputs: Tuple[int, int, List[np.ndarray], List[np.ndarray], Dict]
+) -> Tuple[int, int, float, float]:
+    # Worker of MillerSearch.run_scan, substrate and film are the outputs of
+    # _get_oriented_bulk_data and match_settings are the ZurMcGill settings
+    i, j, substrate, film, match_settings = inputs
+    zm = ZurMcGill(
+        film_vectors=film[0],
+        substrate_vectors=substrate[0],
+        film_basis=film[2],
+        substrate_basis=substrate[2],
+        **match_settings,
+    )
+    matches = zm.run(min_area_only=True)
+
+    if len(matches) > 0:
+        min_area_match = matches[0]
+        area = min_area_match.area
+        strain = min_area_match.strain
+
+        return i, j, strain, area / np.sqrt(substrate[1] * film[1])
+    else:
+        return i, j, np.nan, np.nan
+
+
 class MillerSearch(object):
     """Class to perform a miller index scan to find all domain matched interfaces of various surfaces.
 
@@ -36,10 +78,13 @@ class MillerSearch(object):
         max_angle_strain: Angle strain tolerance for the InterfaceGenerator
         max_linear_strain: Lattice vectors length mismatch tolerance for the InterfaceGenerator
         max_area: Maximum area of the matched supercells
+        max_pair_memory: Memory budget (in MB) used by ZurMcGill when screening blocks of film/substrate supercell pairs
         refine_structure: Determines if the structure is first refined to it's standard settings according to it's spacegroup.
             This is done using spglib.standardize_cell(cell, to_primitive=False, no_idealize=False). Mainly this is usefull if
             users want to input a primitive cell of a structure instead of generating a conventional cell because most DFT people
             work exclusively with the primitive structure so we always have it on hand.
+        n_workers: Number of processes used to build the oriented bulk structures and run the lattice matching.
+            If n_workers=1 the scan is run serially.
 
     Attributes:
         substrate (Structure): Pymatgen Structure of the substrate
@@ -50,10 +95,12 @@ class MillerSearch(object):
         max_angle_strain (float): Angle strain tolerance for the InterfaceGenerator
         max_linear_strain (float): Lattice vectors length mismatch tolerance for the InterfaceGenerator
         max_area (float): Maximum area of the matched supercells
+        max_pair_memory (float): Memory budget (in MB) used by ZurMcGill when screening blocks of film/substrate supercell pairs
         refine_structure: Determines if the structure is first refined to it's standard settings according to it's spacegroup.
             This is done using spglib.standardize_cell(cell, to_primitive=False, no_idealize=False). Mainly this is usefull if
             users want to input a primitive cell of a structure instead of generating a conventional cell because most DFT people
             work exclusively with the primitive structure so we always have it on hand.
+        n_workers (int): Number of processes used to build the oriented bulk structures and run the lattice matching.
         substrate_inds (list): List of unique substrate surface miller indices
         film_inds (list): List of unique film surface miller indices
     """
@@ -68,12 +115,15 @@ class MillerSearch(object):
         max_area_mismatch: Optional[float] = None,
         max_area: Optional[float] = None,
         max_area_scale_factor: float = 4.1,
+        max_pair_memory: float = 256.0,
         refine_structure: bool = True,
         suppress_warnings: bool = False,
         custom_film_miller_indices: Optional[List[List[int]]] = None,
         custom_substrate_miller_indices: Optional[List[List[int]]] = None,
+        n_workers: int = 1,
     ) -> None:
         self.refine_structure = refine_structure
+        self.n_workers = n_workers
         self._suppress_warnings = suppress_warnings
 
         if type(substrate) is str:
@@ -112,6 +162,7 @@ class MillerSearch(object):
         self.max_strain = max_strain
         self.max_area = max_area
         self.max_area_scale_factor = max_area_scale_factor
+        self.max_pair_memory = max_pair_memory
 
         if custom_substrate_miller_indices is not None:
             self.substrate_inds = custom_substrate_miller_indices
@@ -135,58 +186,57 @@ class MillerSearch(object):
     def run_scan(self) -> None:
         """
         Run the miller index scan by looping through all combinations of unique surface miller indices
-        for the substrate and film.
+        for the substrate and film. If n_workers > 1 the oriented bulk structures and the lattice matches
+        are distributed over a single process pool.
         """
-        substrates = []
-        films = []
-
-        for inds in self.substrate_inds:
-            sub_obs = OrientedBulk(
-                bulk=self.substrate,
-                miller_index=inds,
-                make_planar=True,
-            )
-            sub_inplane_vectors = sub_obs.inplane_vectors
-            sub_area = sub_obs.area
-            sub_basis = sub_obs.crystallographic_basis
-
-            substrates.append([sub_inplane_vectors, sub_area, sub_basis])
-
-        for inds in self.film_inds:
-            film_obs = OrientedBulk(
-                bulk=self.film,
-                miller_index=inds,
-                make_planar=True,
-            )
-            film_inplane_vectors = film_obs.inplane_vectors
-            film_area = film_obs.area
-            film_basis = film_obs.crystallographic_basis
-
-            films.append([film_inplane_vectors, film_area, film_basis])
-
-        misfits = np.ones((len(substrates), len(films))) * np.nan
-        areas = np.ones((len(substrates), len(films))) * np.nan
-
-        for i, substrate in enumerate(substrates):
-            for j, film in enumerate(films):
-                zm = ZurMcGill(
-                    film_vectors=film[0],
-                    substrate_vectors=substrate[0],
-                    film_basis=film[2],
-                    substrate_basis=substrate[2],
-                    max_area=self.max_area,
-                    max_strain=self.max_strain,
-                    max_area_mismatch=self.max_area_mismatch,
-                    max_area_scale_factor=self.max_area_scale_factor,
+        obs_inputs = [(self.substrate, inds) for inds in self.substrate_inds]
+        obs_inputs += [(self.film, inds) for inds in self.film_inds]
+        n_substrates = len(self.substrate_inds)
+
+        match_settings = {
+            "max_area": self.max_area,
+            "max_strain": self.max_strain,
+            "max_area_mismatch": self.max_area_mismatch,
+            "max_area_scale_factor": self.max_area_scale_factor,
+            "max_pair_memory": self.max_pair_memory,
+        }
+
+        if self.n_workers > 1:
+            pool_context = Pool(self.n_workers)
+        else:
+            pool_context = nullcontext()
+
+        with pool_context as p:
+            if p is None:
+                obs_data = list(map(_get_oriented_bulk_data, obs_inputs))
+            else:
+                obs_data = p.map(_get_oriented_bulk_data, obs_inputs)
+
+            substrates = obs_data[:n_substrates]
+            films = obs_data[n_substrates:]
+
+            misfits = np.ones((len(substrates), len(films))) * np.nan
+            areas = np.ones((len(substrates), len(films))) * np.nan
+
+            match_inputs = [
+                (i, j, substrate, film, match_settings)
+                for i, substrate in enumerate(substrates)
+                for j, film in enumerate(films)
+            ]
+
+            if p is None:
+                match_results = map(_get_min_area_match, match_inputs)
+            else:
+                # Results are written to their (i, j) cell as soon as they
+                # finish so the completion order does not change the output
+                match_results = p.imap_unordered(
+                    _get_min_area_match,
+                    match_inputs,
                 )
-                matches = zm.run()
-
-                if len(matches) > 0:
-                    min_area_match = matches[0]
-                    area = min_area_match.area
-                    strain = min_area_match.strain
-                    misfits[i, j] = strain
-                    areas[i, j] = area / np.sqrt(substrate[1] * film[1])
+
+            for i, j, strain, area in match_results:
+                misfits[i, j] = strain
+                areas[i, j] = area
 
         self.misfits = np.round(misfits.T, 8)
         self.areas = areas.T
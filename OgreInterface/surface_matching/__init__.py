@@ -1,5 +1,10 @@
 from OgreInterface.surface_matching.base_surface_energy import (
     BaseSurfaceEnergy,
+    set_surface_energy_cache,
+    clear_surface_energy_memo,
+    get_cleavage_energy,
+    get_surface_energy,
+    cache_cleavage_energy,
 )
 from OgreInterface.surface_matching.chgnet_surface_matcher.chgnet_surface_energy import (
     CHGNetSurfaceEnergy,
@@ -8,6 +13,12 @@ from OgreInterface.surface_matching.ionic_surface_matcher.ionic_surface_energy i
     IonicSurfaceEnergy,
 )
 
+from OgreInterface.surface_matching.pes_archive import (
+    write_shifted_film_archive,
+    read_archive_frame,
+    get_archive_index_path,
+)
+
 from OgreInterface.surface_matching.base_surface_matcher import (
     BaseSurfaceMatcher,
 )
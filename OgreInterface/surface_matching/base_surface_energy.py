@@ -1,5 +1,6 @@
 import typing as tp
 from abc import ABC, ABCMeta, abstractmethod
+import collections
 
 from pymatgen.core.structure import Structure
 import numpy as np
@@ -7,6 +8,17 @@ from scipy.interpolate import CubicSpline
 
 from OgreInterface.surfaces import BaseSurface
 from OgreInterface import utils
+from OgreInterface.disk_cache import DiskCache, get_hash, get_structure_hash
+
+# Max number of surface energies kept in the in-process memo
+_SURFACE_ENERGY_MEMO_SIZE = 4096
+
+# In-process LRU memo of cleavage/surface energies keyed by surface identity
+_surface_energy_memo: collections.OrderedDict = collections.OrderedDict()
+
+# Optional on-disk layer of the surface energy memo
+# (see set_surface_energy_cache)
+_surface_energy_disk_cache: tp.Optional[DiskCache] = None
 
 
 # class PostInitCaller(type):
@@ -34,6 +46,10 @@ class BaseSurfaceEnergy(ABC):
         surface: The Surface object generated using the SurfaceGenerator
     """
 
+    # Keyword arguments that do not change the calculated energies
+    # (i.e. number of threads) and are left out of the surface energy cache key
+    cache_ignored_kwargs: tp.Tuple[str, ...] = ()
+
     def __init__(
         self,
         surface: BaseSurface,
@@ -87,6 +103,22 @@ class BaseSurfaceEnergy(ABC):
 
         self._default_distance = bot_film - top_sub
 
+        # Number of double slab energy evaluations used by the last
+        # cleavage energy calculation
+        self.n_energy_evaluations = 0
+
+    @classmethod
+    def preload(cls, **kwargs) -> None:
+        """
+        Loads anything that is shared between instances of this class
+        (i.e. ML models) before the first instance is created. The interface
+        search calls this in the initializer of its worker processes.
+
+        Args:
+            **kwargs: Keyword arguments the class will be created with
+        """
+        pass
+
     @abstractmethod
     def generate_constant_inputs(
         self,
@@ -106,44 +138,68 @@ class BaseSurfaceEnergy(ABC):
     def calculate(self, inputs):
         pass
 
-    def get_cleavage_energy(self):
-        """This function calculates the negated adhesion energy of an interface as a function of the interfacial distance
+    def get_cleavage_energy(
+        self,
+        adaptive: bool = False,
+        tol: float = 1e-2,
+        n_probes: int = 5,
+    ):
+        """This function calculates the cleavage energy of the surface from the minimum of the double slab energy as a function of the interfacial distance
 
         Args:
-            interfacial_distances: numpy array of the interfacial distances that should be calculated
-            figsize: Size of the figure in inches (x_size, y_size)
-            fontsize: Fontsize of all the plot labels
-            output: Output file name
-            dpi: Resolution of the figure (dots per inch)
-            save_raw_data_file: If you put a valid file path (i.e. anything ending with .npz) then the
-                raw data will be saved there. It can be loaded in via data = np.load(save_raw_data_file)
-                and the data is: interfacial_distances = data["interfacial_distances"], energies = data["energies"]
+            adaptive: Determines if the minimum is found with a bracketed search
+                (see utils.bracketed_minimize_1d) instead of a dense 21 point scan
+                of the interfacial distance. This needs fewer energy evaluations
+                which is important for expensive energy modules. The adaptive mode finds
+                the minimum to within tol instead of reading it off a spline of the 21
+                point scan, so the cleavage energies differ slightly (up to ~0.3%) from
+                the default mode.
+            tol: Tolerance (in Angstroms) of the optimal interfacial distance in the adaptive mode
+            n_probes: Number of interfacial distances used to bracket the minimum in the adaptive mode
 
         Returns:
-            The optimal value of the negated adhesion energy (smaller is better, negative = stable, positive = unstable)
+            Cleavage energy of the surface
         """
         default_distance = self._default_distance
 
+        slab_inputs = self.generate_constant_inputs(structure=self.slab)
+        slab_energy = self.calculate(inputs=slab_inputs)[0]
+
+        def _cleavage_energy(interfacial_distances: np.ndarray) -> np.ndarray:
+            zeros = np.zeros(len(interfacial_distances))
+            shifts = np.c_[
+                zeros, zeros, interfacial_distances - default_distance
+            ]
+
+            double_slab_inputs = self.generate_interface_inputs(
+                shifts=shifts,
+            )
+            double_slab_energies = self.calculate(inputs=double_slab_inputs)
+
+            # Keep track of the number of double slabs that are calculated
+            self.n_energy_evaluations += len(shifts)
+
+            return (double_slab_energies - (2 * slab_energy)) / (2 * self.area)
+
+        self.n_energy_evaluations = 0
+
+        if adaptive:
+            _, min_cleavage_energy, _, _ = utils.bracketed_minimize_1d(
+                func=_cleavage_energy,
+                bounds=(0.5 * default_distance, 2.0 * default_distance),
+                n_probes=n_probes,
+                tol=tol,
+            )
+
+            return -min_cleavage_energy
+
         interfacial_distances = np.linspace(
             0.5 * default_distance,
             2.0 * default_distance,
             21,
         )
 
-        zeros = np.zeros(len(interfacial_distances))
-        shifts = np.c_[zeros, zeros, interfacial_distances - default_distance]
-
-        double_slab_inputs = self.generate_interface_inputs(
-            shifts=shifts,
-        )
-        double_slab_energies = self.calculate(inputs=double_slab_inputs)
-
-        slab_inputs = self.generate_constant_inputs(structure=self.slab)
-        slab_energy = self.calculate(inputs=slab_inputs)[0]
-
-        cleavage_energy = (double_slab_energies - (2 * slab_energy)) / (
-            2 * self.area
-        )
+        cleavage_energy = _cleavage_energy(interfacial_distances)
 
         cs = CubicSpline(interfacial_distances, cleavage_energy)
 
@@ -177,3 +233,276 @@ class BaseSurfaceEnergy(ABC):
         )
 
         return surface_energy
+
+
+def set_surface_energy_cache(
+    cache_dir: tp.Optional[str],
+    max_size: float = 64.0,
+) -> None:
+    """
+    Adds an on-disk layer to the memo used by get_cleavage_energy and
+    get_surface_energy so the energies are shared between worker processes
+    and persist between runs.
+
+    Args:
+        cache_dir: Directory of the cache. If None only the in-process memo is used.
+        max_size: Maximum size of the cache in MB.
+    """
+    global _surface_energy_disk_cache
+
+    if cache_dir is None:
+        _surface_energy_disk_cache = None
+    else:
+        _surface_energy_disk_cache = DiskCache(
+            cache_dir=cache_dir,
+            max_size=max_size,
+        )
+
+
+def clear_surface_energy_memo() -> None:
+    """
+    Clears the in-process memo of surface energies
+    """
+    _surface_energy_memo.clear()
+
+
+def get_surface_energy_key(
+    surface: BaseSurface,
+    surface_energy_module: tp.Type[BaseSurfaceEnergy],
+    surface_energy_kwargs: tp.Optional[tp.Dict[str, tp.Any]] = None,
+    energy_type: str = "cleavage",
+    cleavage_energy_kwargs: tp.Optional[tp.Dict[str, tp.Any]] = None,
+) -> str:
+    """
+    Cache key of the surface energy of a surface. The key contains the hash
+    of the bulk structure, the miller index, termination index, layers and
+    vacuum of the surface, the hash of the geometry of the (possibly
+    strained) oriented bulk structure, the name and keyword arguments of
+    the surface energy module, and the settings of the adaptive cleavage
+    energy search.
+
+    Args:
+        surface: Surface the energy is calculated for
+        surface_energy_module: Surface energy class (i.e. IonicSurfaceEnergy)
+        surface_energy_kwargs: Keyword arguments of the surface energy class
+        energy_type: "cleavage" or "surface"
+        cleavage_energy_kwargs: Keyword arguments of
+            BaseSurfaceEnergy.get_cleavage_energy (adaptive, tol, n_probes)
+
+    Returns:
+        Hex digest of the key
+    """
+    if surface_energy_kwargs is None:
+        surface_energy_kwargs = {}
+
+    if cleavage_energy_kwargs is None:
+        cleavage_energy_kwargs = {}
+
+    # Only the geometry and species of the oriented bulk structure are used
+    # because the surface energy modules add their own site properties to it
+    obs = surface.oriented_bulk_structure
+    obs_geometry = Structure(
+        lattice=obs.lattice,
+        species=obs.species,
+        coords=obs.frac_coords,
+    )
+
+    # repr is used so non-json objects (i.e. model paths) can be part of the key
+    kwargs = sorted(
+        (k, repr(v))
+        for k, v in surface_energy_kwargs.items()
+        if k not in surface_energy_module.cache_ignored_kwargs
+    )
+
+    # The dense scan does not depend on tol and n_probes, so only the
+    # adaptive mode changes the key (the keys of the dense scan are the same
+    # as before the adaptive mode was added)
+    key_parts = []
+    if energy_type == "cleavage" and cleavage_energy_kwargs.get(
+        "adaptive", False
+    ):
+        key_parts.append(
+            sorted((k, repr(v)) for k, v in cleavage_energy_kwargs.items())
+        )
+
+    return get_hash(
+        f"{energy_type}_energy",
+        get_structure_hash(surface.bulk_structure),
+        get_structure_hash(obs_geometry),
+        [int(i) for i in surface.miller_index],
+        int(surface.termination_index),
+        int(surface.layers),
+        round(float(surface.vacuum), 6),
+        bool(surface._passivated),
+        surface_energy_module.__module__,
+        surface_energy_module.__qualname__,
+        kwargs,
+        *key_parts,
+    )
+
+
+def get_cleavage_energy(
+    surface: BaseSurface,
+    surface_energy_module: tp.Type[BaseSurfaceEnergy],
+    surface_energy_kwargs: tp.Optional[tp.Dict[str, tp.Any]] = None,
+    adaptive: bool = False,
+    tol: float = 1e-2,
+    n_probes: int = 5,
+) -> float:
+    """
+    Memoized cleavage energy of a surface (see get_surface_energy_key for the
+    cache key). The memo is kept per process and can be shared between
+    processes and runs with set_surface_energy_cache.
+
+    Args:
+        surface: Surface the energy is calculated for
+        surface_energy_module: Surface energy class (i.e. IonicSurfaceEnergy)
+        surface_energy_kwargs: Keyword arguments of the surface energy class
+        adaptive: Determines if the minimum of the double slab energy is found
+            with a bracketed search instead of the dense scan
+            (see BaseSurfaceEnergy.get_cleavage_energy)
+        tol: Tolerance (in Angstroms) of the optimal interfacial distance in the adaptive mode
+        n_probes: Number of interfacial distances used to bracket the minimum in the adaptive mode
+
+    Returns:
+        Cleavage energy of the surface
+    """
+    return _get_memoized_surface_energy(
+        surface=surface,
+        surface_energy_module=surface_energy_module,
+        surface_energy_kwargs=surface_energy_kwargs,
+        energy_type="cleavage",
+        cleavage_energy_kwargs={
+            "adaptive": adaptive,
+            "tol": tol,
+            "n_probes": n_probes,
+        },
+    )
+
+
+def get_surface_energy(
+    surface: BaseSurface,
+    surface_energy_module: tp.Type[BaseSurfaceEnergy],
+    surface_energy_kwargs: tp.Optional[tp.Dict[str, tp.Any]] = None,
+) -> float:
+    """
+    Memoized surface energy of a surface (see get_cleavage_energy)
+
+    Args:
+        surface: Surface the energy is calculated for
+        surface_energy_module: Surface energy class (i.e. IonicSurfaceEnergy)
+        surface_energy_kwargs: Keyword arguments of the surface energy class
+
+    Returns:
+        Surface energy of the surface
+    """
+    return _get_memoized_surface_energy(
+        surface=surface,
+        surface_energy_module=surface_energy_module,
+        surface_energy_kwargs=surface_energy_kwargs,
+        energy_type="surface",
+    )
+
+
+def cache_cleavage_energy(
+    surface: BaseSurface,
+    surface_energy_module: tp.Type[BaseSurfaceEnergy],
+    cleavage_energy: float,
+    surface_energy_kwargs: tp.Optional[tp.Dict[str, tp.Any]] = None,
+    adaptive: bool = False,
+    tol: float = 1e-2,
+    n_probes: int = 5,
+) -> None:
+    """
+    Adds a cleavage energy that was calculated somewhere else (i.e. in a
+    worker process) to the memo.
+
+    Args:
+        surface: Surface the energy was calculated for
+        surface_energy_module: Surface energy class (i.e. IonicSurfaceEnergy)
+        cleavage_energy: Cleavage energy of the surface
+        surface_energy_kwargs: Keyword arguments of the surface energy class
+        adaptive: Adaptive mode the energy was calculated with (see get_cleavage_energy)
+        tol: Tolerance of the adaptive mode
+        n_probes: Number of probes of the adaptive mode
+    """
+    key = get_surface_energy_key(
+        surface=surface,
+        surface_energy_module=surface_energy_module,
+        surface_energy_kwargs=surface_energy_kwargs,
+        energy_type="cleavage",
+        cleavage_energy_kwargs={
+            "adaptive": adaptive,
+            "tol": tol,
+            "n_probes": n_probes,
+        },
+    )
+    _set_surface_energy_memo(key, float(cleavage_energy))
+
+
+def _get_memoized_surface_energy(
+    surface: BaseSurface,
+    surface_energy_module: tp.Type[BaseSurfaceEnergy],
+    surface_energy_kwargs: tp.Optional[tp.Dict[str, tp.Any]],
+    energy_type: str,
+    cleavage_energy_kwargs: tp.Optional[tp.Dict[str, tp.Any]] = None,
+) -> float:
+    if surface_energy_kwargs is None:
+        surface_energy_kwargs = {}
+
+    if cleavage_energy_kwargs is None:
+        cleavage_energy_kwargs = {}
+
+    key = get_surface_energy_key(
+        surface=surface,
+        surface_energy_module=surface_energy_module,
+        surface_energy_kwargs=surface_energy_kwargs,
+        energy_type=energy_type,
+        cleavage_energy_kwargs=cleavage_energy_kwargs,
+    )
+    energy = _get_surface_energy_memo(key)
+
+    if energy is None:
+        surfE = surface_energy_module(surface, **surface_energy_kwargs)
+
+        if energy_type == "cleavage":
+            energy = float(
+                surfE.get_cleavage_energy(**cleavage_energy_kwargs)
+            )
+        else:
+            energy = float(surfE.get_surface_energy())
+
+        _set_surface_energy_memo(key, energy)
+
+    return energy
+
+
+def _get_surface_energy_memo(key: str) -> tp.Optional[float]:
+    if key in _surface_energy_memo:
+        _surface_energy_memo.move_to_end(key)
+        return _surface_energy_memo[key]
+
+    if _surface_energy_disk_cache is not None:
+        value = _surface_energy_disk_cache.get(key)
+
+        if value is not None:
+            _set_surface_energy_memo(key, value, write_to_disk=False)
+
+        return value
+
+    return None
+
+
+def _set_surface_energy_memo(
+    key: str,
+    value: float,
+    write_to_disk: bool = True,
+) -> None:
+    _surface_energy_memo[key] = value
+    _surface_energy_memo.move_to_end(key)
+
+    if len(_surface_energy_memo) > _SURFACE_ENERGY_MEMO_SIZE:
+        _surface_energy_memo.popitem(last=False)
+
+    if write_to_disk and _surface_energy_disk_cache is not None:
+        _surface_energy_disk_cache.set(key, value)
@@ -5,11 +5,20 @@ from abc import ABC, ABCMeta, abstractmethod, abstractproperty
 import itertools
 
 from pymatgen.core.structure import Structure
+from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 from matplotlib.colors import Normalize, ListedColormap
 from matplotlib.cm import ScalarMappable
 import matplotlib.pyplot as plt
 from mpl_toolkits.axes_grid1 import make_axes_locatable
-from scipy.interpolate import RectBivariateSpline, CubicSpline
+from scipy.interpolate import (
+    RectBivariateSpline,
+    CubicSpline,
+    PchipInterpolator,
+)
+from scipy.sparse import coo_matrix
+from scipy.optimize import minimize
+from scipy.ndimage import minimum_filter
+from scipy.sparse.csgraph import connected_components
 import numpy as np
 from sko.PSO import PSO
 from sko.tools import set_run_mode
@@ -20,6 +29,10 @@ from OgreInterface.interfaces import BaseInterface
 from OgreInterface.surfaces import BaseSurface
 from OgreInterface.surface_matching.base_surface_energy import (
     BaseSurfaceEnergy,
+    get_cleavage_energy,
+)
+from OgreInterface.surface_matching.pes_archive import (
+    write_shifted_film_archive,
 )
 from OgreInterface import utils
 
@@ -84,6 +97,9 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
     Args:
         interface: The Interface object generated using the InterfaceGenerator
         grid_density: The sampling density of the 2D potential energy surface plot (points/Angstrom)
+        adaptive_cleavage_energy: Determines if the cleavage energies of the film and substrate
+            are calculated with the adaptive mode of BaseSurfaceEnergy.get_cleavage_energy
+            instead of the dense 21 point scan
     """
 
     def __init__(
@@ -91,9 +107,13 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         interface: BaseInterface,
         grid_density: float = 2.5,
         verbose: bool = True,
+        adaptive_cleavage_energy: bool = False,
     ):
         self._verbose = verbose
 
+        # Determines if the cleavage energies use the bracketed search
+        self._adaptive_cleavage_energy = adaptive_cleavage_energy
+
         if self._verbose:
             PSO.run = _tqdm_run
 
@@ -173,6 +193,9 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         # Placeholder for surface energy kwargs
         self.surface_energy_kwargs = {}
 
+        # Number of energy evaluations used by the last optimization
+        self.n_energy_evaluations = 0
+
     def __post_init__(self):
         (
             self.film_supercell_energy,
@@ -215,6 +238,42 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         """
         pass
 
+    def calculate_with_gradients(
+        self,
+        inputs,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+        This method can be overridden to calculate the total energy of the
+        interface together with the gradient of the total energy with
+        respect to the cartesian film shifts (shape (N, 3)). The inputs are
+        generated with generate_interface_inputs.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not calculate gradients"
+        )
+
+    @property
+    def has_gradients(self) -> bool:
+        """
+        Determines if calculate_with_gradients is implemented
+        """
+        return (
+            type(self).calculate_with_gradients
+            is not BaseSurfaceMatcher.calculate_with_gradients
+        )
+
+    @classmethod
+    def preload(cls, **kwargs) -> None:
+        """
+        Loads anything that is shared between instances of this class
+        (i.e. ML models) before the first instance is created. The interface
+        search calls this in the initializer of its worker processes.
+
+        Args:
+            **kwargs: Keyword arguments the class will be created with
+        """
+        pass
+
     @property
     @abstractmethod
     def surface_energy_module(self) -> BaseSurfaceEnergy:
@@ -291,10 +350,13 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         self,
         surface: BaseSurface,
     ) -> float:
-        surfE = self.surface_energy_module(
-            surface, **self.surface_energy_kwargs
+        # Memoized across matchers (see set_surface_energy_cache)
+        cleavage_energy = get_cleavage_energy(
+            surface=surface,
+            surface_energy_module=self.surface_energy_module,
+            surface_energy_kwargs=self.surface_energy_kwargs,
+            adaptive=self._adaptive_cleavage_energy,
         )
-        cleavage_energy = surfE.get_cleavage_energy()
 
         return cleavage_energy
 
@@ -387,6 +449,168 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
 
         return prim_cart_shifts.reshape(X.shape + (-1,))
 
+    def _get_inplane_symmetry_operations(
+        self,
+        structure: Structure,
+    ) -> tp.List[tp.Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get the symmetry operations of a slab that keep the z-coordinates
+        unchanged as (M, t) pairs that act on cartesian in-plane row vectors
+        (x' = x @ M + t)
+        """
+        sg = SpacegroupAnalyzer(structure)
+        operations = sg.get_symmetry_operations(cartesian=False)
+
+        xy_matrix = structure.lattice.matrix[:2, :2]
+        inv_xy_matrix = np.linalg.inv(xy_matrix)
+
+        inplane_operations = []
+        for op in operations:
+            W = np.round(op.rotation_matrix).astype(int)
+            t = op.translation_vector
+
+            keeps_z = (
+                (W[2] == np.array([0, 0, 1])).all()
+                and (W[:2, 2] == 0).all()
+                and np.isclose(np.mod(t[2] + 0.5, 1.0), 0.5, atol=1e-3)
+            )
+
+            if keeps_z:
+                M = inv_xy_matrix.dot(W[:2, :2].T).dot(xy_matrix)
+                inplane_operations.append((M, t[:2].dot(xy_matrix)))
+
+        return inplane_operations
+
+    def _get_pes_symmetry_operations(
+        self,
+    ) -> tp.List[tp.Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get the symmetry operations of the rigid shift PES from the in-plane
+        symmetry operations of the substrate and film. If (M, t_s) is a
+        symmetry of the substrate and (M, t_f) is a symmetry of the film then
+        E(s) = E(s @ M + t_s - t_f) for any film shift s.
+        """
+        is_film = np.array(self.iface.site_properties["is_film"]).astype(bool)
+
+        sub = self.iface.copy()
+        sub.remove_sites(np.where(is_film)[0])
+
+        film = self.iface.copy()
+        film.remove_sites(np.where(~is_film)[0])
+
+        sub_operations = self._get_inplane_symmetry_operations(sub)
+        film_operations = self._get_inplane_symmetry_operations(film)
+
+        pes_operations = []
+        for sub_M, sub_t in sub_operations:
+            for film_M, film_t in film_operations:
+                if np.allclose(sub_M, film_M, atol=1e-3):
+                    pes_operations.append((sub_M, sub_t - film_t))
+
+        return pes_operations
+
+    def _get_grid_symmetry_map(
+        self,
+        grid_shifts: np.ndarray,
+        M: np.ndarray,
+        t: np.ndarray,
+    ) -> tp.Optional[np.ndarray]:
+        """
+        Maps the points of the periodic PES grid (grid_shifts) with the
+        operation s' = s @ M + t. Returns the flat grid index of each mapped
+        point or None if the operation does not map the grid onto itself.
+        """
+        n_x = self.grid_density_x - 1
+        n_y = self.grid_density_y - 1
+        inv_shift_xy_matrix = np.linalg.inv(self.shift_matrix[:2, :2])
+
+        new_frac_shifts = (grid_shifts.dot(M) + t).dot(inv_shift_xy_matrix)
+        new_grid_shifts = new_frac_shifts * np.array([n_x, n_y])
+        rounded_grid_shifts = np.round(new_grid_shifts)
+
+        if not np.allclose(new_grid_shifts, rounded_grid_shifts, atol=1e-2):
+            return None
+
+        new_x_inds = np.mod(rounded_grid_shifts[:, 0], n_x).astype(int)
+        new_y_inds = np.mod(rounded_grid_shifts[:, 1], n_y).astype(int)
+
+        return (new_y_inds * n_x) + new_x_inds
+
+    def _get_irreducible_shifts(
+        self,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+        Reduces the PES grid (self.shifts) to the symmetrically unique shifts.
+        Only the PES symmetry operations that map the grid onto itself are
+        used, so the irreducible shifts are points of self.shifts and the
+        energies can be unfolded onto the same grid that is used by
+        get_structures_for_DFT().
+
+        Returns:
+            The (N, 3) array of irreducible cartesian shifts and an array with
+            the shape of the PES grid that maps each grid point to the index of
+            its irreducible shift
+        """
+        # The last row and column of the grid are periodic images of the
+        # first row and column
+        n_x = self.grid_density_x - 1
+        n_y = self.grid_density_y - 1
+
+        y_inds, x_inds = np.meshgrid(
+            np.arange(n_y),
+            np.arange(n_x),
+            indexing="ij",
+        )
+        x_inds = x_inds.ravel()
+        y_inds = y_inds.ravel()
+        point_inds = (y_inds * n_x) + x_inds
+
+        frac_shifts = np.c_[x_inds / n_x, y_inds / n_y]
+
+        shift_xy_matrix = self.shift_matrix[:2, :2]
+        grid_shifts = frac_shifts.dot(shift_xy_matrix)
+
+        operations = self._get_pes_symmetry_operations()
+
+        grid_maps = []
+        for M, t in operations:
+            grid_map = self._get_grid_symmetry_map(
+                grid_shifts=grid_shifts,
+                M=M,
+                t=t,
+            )
+
+            if grid_map is not None:
+                grid_maps.append(grid_map)
+
+        rows = np.concatenate([point_inds] * (len(grid_maps) + 1))
+        cols = np.concatenate([point_inds] + grid_maps)
+        graph = coo_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(n_x * n_y, n_x * n_y),
+        )
+
+        _, labels = connected_components(graph, directed=False)
+
+        # Use the first grid point of each group as the irreducible shift
+        _, irreducible_inds, irreducible_labels = np.unique(
+            labels,
+            return_index=True,
+            return_inverse=True,
+        )
+
+        # Taken from self.shifts so the shifts are exactly the grid points
+        irreducible_shifts = self.shifts[:-1, :-1].reshape(-1, 3)[
+            irreducible_inds
+        ]
+
+        # Map the full grid (including the periodic last row and column)
+        irreducible_map = irreducible_labels.reshape(n_y, n_x)
+        irreducible_map = np.c_[irreducible_map, irreducible_map[:, :1]]
+        irreducible_map = np.r_[irreducible_map, irreducible_map[:1]]
+
+        return irreducible_shifts, irreducible_map
+
     def get_structures_for_DFT(self, output_folder="PES"):
         if not os.path.isdir(output_folder):
             os.mkdir(output_folder)
@@ -410,6 +634,75 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
                 fractional=True,
             )
 
+    def write_PES_archive(
+        self,
+        archive: str = "PES.extxyz.gz",
+        orthogonal: bool = True,
+        poscar_folder: tp.Optional[str] = None,
+        n_writers: int = 1,
+        compresslevel: int = 6,
+    ) -> tp.Dict[str, tp.Any]:
+        """
+        Writes the interface structures of all the shifts of the 2D PES
+        (same order as get_structures_for_DFT()) to a single compressed
+        extxyz archive with a JSON index, instead of one POSCAR per shift.
+
+        Examples:
+            >>> surface_matcher.write_PES_archive(archive="PES.extxyz.gz")
+            >>> structure = read_archive_frame("PES.extxyz.gz", frame=42)
+
+        Args:
+            archive: File path of the archive
+            orthogonal: Determines if the orthogonal structure is written
+            poscar_folder: If given, the POSCAR_XXXX files are also written
+                to this folder by a background pool of writers
+            n_writers: Number of background POSCAR writers
+            compresslevel: gzip compression level of the frames
+
+        Returns:
+            Index of the archive
+        """
+        all_shifts = self.shifts
+        unique_shifts = all_shifts[:-1, :-1]
+        shifts = unique_shifts.reshape(-1, 3).dot(self.inv_matrix)
+
+        if orthogonal:
+            structure = self.interface._orthogonal_structure
+        else:
+            structure = self.interface._non_orthogonal_structure
+
+        base_comment = self.interface._get_base_poscar_comment_str(
+            orthogonal=orthogonal
+        )
+        comments = [
+            base_comment
+            + "|"
+            + "|".join(
+                [
+                    f"a={self.interface._a_shift + shift[0]:.4f}",
+                    f"b={self.interface._b_shift + shift[1]:.4f}",
+                ]
+            )
+            for shift in shifts
+        ]
+
+        return write_shifted_film_archive(
+            structure=utils.return_structure(
+                structure=structure,
+                convert_to_atoms=False,
+            ),
+            frac_shifts=shifts,
+            archive=archive,
+            comments=comments,
+            poscar_folder=poscar_folder,
+            n_writers=n_writers,
+            compresslevel=compresslevel,
+            passivated=(
+                self.interface.substrate._passivated
+                or self.interface.film._passivated
+            ),
+        )
+
     def get_structures_for_DFT_z_shift(
         self,
         interfacial_distances: np.ndarray,
@@ -826,6 +1119,7 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         show_opt_shift: bool = True,
         scale_data: bool = False,
         save_raw_data_file=None,
+        use_symmetry: bool = True,
     ) -> float:
         """This function calculates the 2D potential energy surface (PES)
 
@@ -838,11 +1132,32 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
             save_raw_data_file: If you put a valid file path (i.e. anything ending with .npz) then the
                 raw data will be saved there. It can be loaded in via data = np.load(save_raw_data_file)
                 and the data is: x_shifts = data["x_shifts"], y_shifts = data["y_shifts"], energies = data["energies"]
+            use_symmetry: Determines if only the symmetrically unique shifts (based on the in-plane
+                symmetry operations shared by the substrate and film) are calculated. The energies
+                are then mapped back onto the full grid, which is the same grid that is used by
+                get_structures_for_DFT(). Symmetry operations that do not map this grid onto itself
+                are not used.
 
         Returns:
             The optimal value of the negated adhesion energy (smaller is better, negative = stable, positive = unstable)
         """
-        shifts = self.shifts
+        if use_symmetry:
+            (
+                irreducible_shifts,
+                irreducible_map,
+            ) = self._get_irreducible_shifts()
+
+            if self._verbose:
+                print(
+                    f"Calculating {len(irreducible_shifts)} symmetrically unique shifts "
+                    + f"of the {irreducible_map.size} point PES grid"
+                )
+
+            # Keep the batch size the same as a row of the full grid
+            n_batches = max(len(irreducible_shifts) // self.X_shape[1], 1)
+            shifts = np.array_split(irreducible_shifts, n_batches, axis=0)
+        else:
+            shifts = self.shifts
 
         total_energies = []
 
@@ -853,7 +1168,10 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
             batch_total_energies = self.calculate(inputs=batch_inputs)
             total_energies.append(batch_total_energies)
 
-        total_energies = np.vstack(total_energies)
+        if use_symmetry:
+            total_energies = np.concatenate(total_energies)[irreducible_map]
+        else:
+            total_energies = np.vstack(total_energies)
 
         x_grid = np.linspace(0, 1, self.grid_density_x)
         y_grid = np.linspace(0, 1, self.grid_density_y)
@@ -925,6 +1243,10 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         dpi: int = 400,
         save_raw_data_file: tp.Optional[str] = None,
         zoom_to_minimum: bool = False,
+        adaptive: bool = False,
+        tol: float = 1e-2,
+        n_probes: int = 7,
+        keep_dense_scan: bool = False,
     ):
         """This function calculates the negated adhesion energy of an interface as a function of the interfacial distance
 
@@ -937,27 +1259,77 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
             save_raw_data_file: If you put a valid file path (i.e. anything ending with .npz) then the
                 raw data will be saved there. It can be loaded in via data = np.load(save_raw_data_file)
                 and the data is: interfacial_distances = data["interfacial_distances"], energies = data["energies"]
+            zoom_to_minimum: Determines if the plot only shows the region around the minimum
+            adaptive: Determines if the minimum is found with a bracketed search
+                (see utils.bracketed_minimize_1d) between the smallest and largest of the
+                interfacial_distances instead of calculating all of them. The plot then shows
+                the distances that were evaluated by the search with a shape preserving
+                (PCHIP) interpolation between them.
+            tol: Tolerance (in Angstroms) of the optimal interfacial distance in the adaptive mode
+            n_probes: Number of interfacial distances used to bracket the minimum in the adaptive mode
+            keep_dense_scan: Determines if all the interfacial_distances are still calculated
+                for the plot in the adaptive mode. The minimum is then bracketed by the dense
+                scan and only refined with Brent's method.
 
         Returns:
             The optimal value of the negated adhesion energy (smaller is better, negative = stable, positive = unstable)
         """
-        zeros = np.zeros(len(interfacial_distances))
-        shifts = np.c_[zeros, zeros, interfacial_distances - self.d_interface]
-        batch_shifts = np.array_split(shifts, len(shifts) // 10, axis=0)
+        self.n_energy_evaluations = 0
 
-        total_energies = []
-        for batch_shift in batch_shifts:
-            batch_inputs = self.generate_interface_inputs(
-                shifts=batch_shift,
-            )
-            batch_total_energies = self.calculate(inputs=batch_inputs)
-            total_energies.append(batch_total_energies)
+        if adaptive:
+            n_dense = len(interfacial_distances)
 
-        total_energies = np.concatenate(total_energies)
+            if keep_dense_scan:
+                # The dense scan brackets the minimum so only the refinement
+                # steps are added on top of it
+                adhesion_energies = self._z_shift_adhesion_energies(
+                    interfacial_distances
+                )
+                probe_distances = interfacial_distances
+                probe_energies = adhesion_energies
+            else:
+                probe_distances = None
+                probe_energies = None
+
+            opt_d, opt_E, eval_distances, eval_energies = (
+                utils.bracketed_minimize_1d(
+                    func=self._z_shift_adhesion_energies,
+                    bounds=(
+                        interfacial_distances.min(),
+                        interfacial_distances.max(),
+                    ),
+                    n_probes=n_probes,
+                    tol=tol,
+                    probe_x=probe_distances,
+                    probe_f=probe_energies,
+                )
+            )
 
-        adhesion_energies = self.get_adhesion_energy(
-            total_energies=total_energies
-        )
+            if not keep_dense_scan:
+                # Brent's method can evaluate (almost) the same point twice
+                interfacial_distances, unique_inds = np.unique(
+                    np.round(eval_distances, 8),
+                    return_index=True,
+                )
+                adhesion_energies = eval_energies[unique_inds]
+
+            # Printed after all the evaluations are done
+            if self._verbose:
+                if keep_dense_scan:
+                    print(
+                        f"Adaptive z-shift used {self.n_energy_evaluations} energy evaluations "
+                        + f"({self.n_energy_evaluations - n_dense} on top of the {n_dense} point dense scan)"
+                    )
+                else:
+                    print(
+                        f"Adaptive z-shift used {self.n_energy_evaluations} of "
+                        + f"{n_dense} energy evaluations "
+                        + f"({n_dense - self.n_energy_evaluations} saved)"
+                    )
+        else:
+            adhesion_energies = self._z_shift_adhesion_energies(
+                interfacial_distances
+            )
 
         if save_raw_data_file is not None:
             if save_raw_data_file.split(".")[-1] != "npz":
@@ -976,7 +1348,15 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
             dpi=dpi,
         )
 
-        cs = CubicSpline(interfacial_distances, adhesion_energies)
+        # The points of Brent's method are clustered around the minimum and
+        # sparse on the repulsive wall, so a cubic spline through them rings.
+        # The shape preserving interpolant never goes below the evaluated
+        # energies.
+        if adaptive and not keep_dense_scan:
+            cs = PchipInterpolator(interfacial_distances, adhesion_energies)
+        else:
+            cs = CubicSpline(interfacial_distances, adhesion_energies)
+
         interp_x = np.linspace(
             interfacial_distances.min(),
             interfacial_distances.max(),
@@ -984,8 +1364,9 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         )
         interp_y = cs(interp_x)
 
-        opt_d = interp_x[np.argmin(interp_y)]
-        opt_E = np.min(interp_y)
+        if not adaptive:
+            opt_d = interp_x[np.argmin(interp_y)]
+            opt_E = np.min(interp_y)
 
         self.opt_d_interface = opt_d
 
@@ -1015,6 +1396,19 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
             color="black",
             linewidth=1,
         )
+        if adaptive and not keep_dense_scan:
+            if zoom_to_minimum:
+                eval_mask = np.abs(adhesion_energies) <= abs(min_show)
+            else:
+                eval_mask = np.ones(len(adhesion_energies), dtype=bool)
+
+            axs.scatter(
+                interfacial_distances[eval_mask],
+                adhesion_energies[eval_mask],
+                color="black",
+                s=10,
+            )
+
         axs.scatter(
             [opt_d],
             [opt_E],
@@ -1034,6 +1428,37 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
 
         return opt_E
 
+    def _z_shift_adhesion_energies(
+        self,
+        interfacial_distances: np.ndarray,
+    ) -> np.ndarray:
+        # Keep track of the number of structures that are calculated
+        self.n_energy_evaluations += len(interfacial_distances)
+
+        zeros = np.zeros(len(interfacial_distances))
+        shifts = np.c_[zeros, zeros, interfacial_distances - self.d_interface]
+        batch_shifts = np.array_split(
+            shifts,
+            max(len(shifts) // 10, 1),
+            axis=0,
+        )
+
+        total_energies = []
+        for batch_shift in batch_shifts:
+            batch_inputs = self.generate_interface_inputs(
+                shifts=batch_shift,
+            )
+            batch_total_energies = self.calculate(inputs=batch_inputs)
+            total_energies.append(batch_total_energies)
+
+        total_energies = np.concatenate(total_energies)
+
+        adhesion_energies = self.get_adhesion_energy(
+            total_energies=total_energies
+        )
+
+        return adhesion_energies
+
     def get_current_energy(
         self,
     ):
@@ -1061,6 +1486,9 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
     """
 
     def _PSO_function(self, particle_positions: np.ndarray) -> np.ndarray:
+        # Keep track of the number of structures that are calculated
+        self.n_energy_evaluations += len(particle_positions)
+
         # Get the cartesian xy shift from the fractional coords
         # of the smallest surface unit cell
         cart_xy = self.get_cart_xy_shifts(particle_positions[:, :2])
@@ -1085,6 +1513,40 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
 
         return interface_energies
 
+    def _PSO_function_with_gradients(
+        self,
+        particle_positions: np.ndarray,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        self.n_energy_evaluations += len(particle_positions)
+
+        cart_xy = self.get_cart_xy_shifts(particle_positions[:, :2])
+        z_shift = particle_positions[:, -1] - self.d_interface
+        shifts = np.c_[cart_xy, z_shift]
+
+        inputs = self.generate_interface_inputs(shifts=shifts)
+
+        total_energies, cart_gradients = self.calculate_with_gradients(
+            inputs=inputs
+        )
+
+        adhesion_energies = self.get_adhesion_energy(
+            total_energies=total_energies
+        )
+
+        interface_energies = self.get_interface_energy(
+            adhesion_energies=adhesion_energies
+        )
+
+        # Chain rule from the cartesian shifts to the fractional in-plane
+        # shifts and the interfacial distance
+        gradients = np.c_[
+            cart_gradients[:, :2].dot(self.shift_matrix[:2, :2].T),
+            cart_gradients[:, -1],
+        ]
+        gradients /= self.interface.area
+
+        return interface_energies, gradients
+
     def optimizePSO(
         self,
         z_bounds: tp.Optional[tp.List[float]] = None,
@@ -1104,6 +1566,8 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         """
         set_run_mode(self._PSO_function, mode="vectorization")
 
+        self.n_energy_evaluations = 0
+
         if z_bounds is None:
             max_z = self._get_max_z()
             z_bounds = [0.5, max(3.5, 1.2 * max_z)]
@@ -1137,3 +1601,123 @@ class BaseSurfaceMatcher(ABC, metaclass=CombinedPostInitCaller):
         self.opt_d_interface = opt_position[-1]
 
         return opt_score
+
+    def optimize_local(
+        self,
+        z_bounds: tp.Optional[tp.List[float]] = None,
+        grid_size: tp.Tuple[int, int, int] = (8, 8, 8),
+        n_starts: int = 4,
+        max_iters: int = 50,
+        gradient_step: float = 1e-2,
+        use_gradients: bool = True,
+    ) -> float:
+        """
+        This function will optimize the interface structure in 3D using a grid seeded multi-start local optimization.
+        A coarse grid of in-plane shifts and interfacial distances is calculated first and the lowest local minima
+        of the grid are then refined with a bounded quasi-Newton (L-BFGS-B) search. If the surface matcher implements
+        calculate_with_gradients the analytic gradients are used, otherwise the gradients are calculated with central
+        finite differences so every step of the local search is calculated as a single batch of 7 structures.
+        The number of energy evaluations is stored in self.n_energy_evaluations.
+
+        Args:
+            z_bounds: A list defining the maximum and minumum interfacial distance [min, max]
+            grid_size: Number of grid points along the a and b directions of the smallest surface unit cell
+                and along the interfacial distance
+            n_starts: Maximum number of grid minima that are refined with the local search
+            max_iters: Maximum number of iterations of each local search
+            gradient_step: Step size (in Angstroms) used for the finite difference gradients
+            use_gradients: Determines if the analytic gradients are used when they are available
+
+        Returns:
+            The optimal value of the negated adhesion energy (smaller is better, negative = stable, positive = unstable)
+        """
+        self.n_energy_evaluations = 0
+
+        if z_bounds is None:
+            max_z = self._get_max_z()
+            z_bounds = [0.5, max(3.5, 1.2 * max_z)]
+
+        if self._verbose:
+            print(
+                "Running 3D Surface Matching with a Multi-Start Local Optimization:"
+            )
+
+        n_a, n_b, n_z = grid_size
+        a_grid = np.linspace(0.0, 1.0, n_a, endpoint=False)
+        b_grid = np.linspace(0.0, 1.0, n_b, endpoint=False)
+        z_grid = np.linspace(z_bounds[0], z_bounds[1], n_z)
+        A, B, Z = np.meshgrid(a_grid, b_grid, z_grid, indexing="ij")
+        grid_positions = np.c_[A.ravel(), B.ravel(), Z.ravel()]
+
+        # Calculate the grid in batches of n_a * n_b structures
+        grid_energies = np.concatenate(
+            [
+                self._PSO_function(positions)
+                for positions in np.array_split(grid_positions, n_z, axis=0)
+            ]
+        )
+
+        # Local minima of the grid (the in-plane directions are periodic)
+        is_minimum = grid_energies.reshape(grid_size) == minimum_filter(
+            grid_energies.reshape(grid_size),
+            size=3,
+            mode=["wrap", "wrap", "nearest"],
+        )
+        min_inds = np.where(is_minimum.ravel())[0]
+        min_inds = min_inds[np.argsort(grid_energies[min_inds])][:n_starts]
+
+        # Finite difference steps in fractional a, b and cartesian z
+        steps = np.array(
+            [
+                gradient_step / np.linalg.norm(self.shift_matrix[0]),
+                gradient_step / np.linalg.norm(self.shift_matrix[1]),
+                gradient_step,
+            ]
+        )
+        fd_offsets = np.vstack([np.zeros(3), np.diag(steps), -np.diag(steps)])
+
+        def _objective(position: np.ndarray) -> tp.Tuple[float, np.ndarray]:
+            if use_gradients and self.has_gradients:
+                energies, gradients = self._PSO_function_with_gradients(
+                    position[None, :]
+                )
+
+                return float(energies[0]), gradients[0]
+
+            energies = self._PSO_function(position[None, :] + fd_offsets)
+            gradient = (energies[1:4] - energies[4:]) / (2 * steps)
+
+            return float(energies[0]), gradient
+
+        opt_score = grid_energies[min_inds[0]]
+        opt_position = grid_positions[min_inds[0]]
+
+        for start in grid_positions[min_inds]:
+            result = minimize(
+                _objective,
+                x0=start,
+                jac=True,
+                method="L-BFGS-B",
+                bounds=[(None, None), (None, None), tuple(z_bounds)],
+                options={"maxiter": max_iters},
+            )
+
+            if result.fun < opt_score:
+                opt_score = result.fun
+                opt_position = result.x
+
+        if self._verbose:
+            print(
+                f"Best fit: {opt_score} at {opt_position} "
+                + f"({self.n_energy_evaluations} energy evaluations)"
+            )
+
+        opt_ab = np.mod(opt_position[:2], 1.0).reshape(1, -1)
+        opt_cart_xy = self.get_cart_xy_shifts(opt_ab)
+        opt_cart_xy = np.c_[opt_cart_xy, np.zeros(1)]
+        opt_frac_xy = opt_cart_xy.dot(self.inv_matrix)[0]
+
+        self.opt_xy_shift = opt_frac_xy[:2]
+        self.opt_d_interface = opt_position[-1]
+
+        return opt_score
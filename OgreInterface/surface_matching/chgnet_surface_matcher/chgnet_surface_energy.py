@@ -7,71 +7,76 @@ from OgreInterface.surface_matching import (
     BaseSurfaceEnergy,
 )
 from OgreInterface.surfaces import Surface
-from OgreInterface import utils
+from OgreInterface.surface_matching.chgnet_surface_matcher.rigid_shift_graph import (
+    RigidShiftGraphConverter,
+)
+from OgreInterface.surface_matching.chgnet_surface_matcher.model_registry import (
+    get_chgnet_model,
+)
 
 
 class CHGNetSurfaceEnergy(BaseSurfaceEnergy):
+    cache_ignored_kwargs = ("batch_size",)
+
     def __init__(
         self,
         surface: Surface,
         chgnet_model: tp.Optional[str] = None,
+        batch_size: int = 16,
     ):
-        try:
-            from chgnet.model.model import CHGNet
-        except ImportError:
-            raise "You need to install `chgnet` in order to use ChgNetSurfaceEnergy"
-
         super().__init__(surface=surface)
 
-        # TODO: Implement chgnet
         self.chgnet_model = chgnet_model
 
-        if self.chgnet_model is None:
-            self.model = CHGNet.load()
-        else:
-            self.model = CHGNet.from_file(self.chgnet_model)
+        # Shared with every other module that uses the same model file
+        self.model = get_chgnet_model(self.chgnet_model)
+
+        # Number of crystal graphs passed to the model at once
+        self._batch_size = batch_size
+
+        # The intra-slab edges of the double slab graph are only found once
+        self._graph_converter = RigidShiftGraphConverter(
+            structure=self.double_slab,
+            graph_converter=self.model.graph_converter,
+        )
+
+    @classmethod
+    def preload(cls, **kwargs) -> None:
+        get_chgnet_model(kwargs.get("chgnet_model", None))
 
     def generate_constant_inputs(
         self,
         structure: Structure,
-    ) -> tp.List[Structure]:
+    ) -> tp.List:
         """
         This method is used to generate the inputs of the calculate function
         for the structures that will stay constant throughout the surface
         matching process (i.e. OBS, supercells)
         """
-        return [structure]
+        return [self.model.graph_converter(structure)]
 
     def generate_interface_inputs(
         self,
         shifts: np.ndarray,
-    ) -> tp.List[Structure]:
+    ) -> tp.List:
         """
         This method is used to generate the inputs of the calculate function
         for the interface given various shifts
         """
-        shifted_ifaces = []
-        for shift in shifts:
-            shifted_iface = utils.shift_film(
-                interface=self.double_slab,
-                shift=shift,
-                fractional=False,
-            )
-            shifted_ifaces.append(shifted_iface)
-
-        return shifted_ifaces
-
-    def calculate(self, inputs: tp.List[Structure]) -> np.array:
+        return self._graph_converter.get_graphs(shifts=shifts)
+
+    def calculate(self, inputs: tp.List) -> np.array:
         """
         This method is used to calculate the total energy of the structure with
         the given method of calculating the energy (i.e. DFT, ML-potential)
         """
-        model_outputs = self.model.predict_structure(
-            structure=inputs,
+        model_outputs = self.model.predict_graph(
+            inputs,
             task="e",
+            batch_size=self._batch_size,
         )
 
-        n_atoms = np.array([len(s) for s in inputs])
+        n_atoms = np.array([len(g.atomic_number) for g in inputs])
 
         if type(model_outputs) is dict:
             energies = np.array([model_outputs["e"]])
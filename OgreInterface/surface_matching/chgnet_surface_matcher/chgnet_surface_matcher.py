@@ -9,7 +9,12 @@ from OgreInterface.surface_matching import (
 )
 
 from OgreInterface.interfaces import Interface
-from OgreInterface import utils
+from OgreInterface.surface_matching.chgnet_surface_matcher.rigid_shift_graph import (
+    RigidShiftGraphConverter,
+)
+from OgreInterface.surface_matching.chgnet_surface_matcher.model_registry import (
+    get_chgnet_model,
+)
 
 
 class CHGNetSurfaceMatcher(BaseSurfaceMatcher):
@@ -18,65 +23,79 @@ class CHGNetSurfaceMatcher(BaseSurfaceMatcher):
         interface: Interface,
         chgnet_model: tp.Optional[str] = None,
         grid_density: float = 2.5,
+        batch_size: int = 16,
+        adaptive_cleavage_energy: bool = False,
     ):
-        try:
-            from chgnet.model.model import CHGNet
-        except ImportError:
-            raise "You need to install `chgnet` in order to use the ChgNetSurfaceMatcher"
-
-        super().__init__(interface=interface, grid_density=grid_density)
+        super().__init__(
+            interface=interface,
+            grid_density=grid_density,
+            adaptive_cleavage_energy=adaptive_cleavage_energy,
+        )
 
-        # TODO: Implement chgnet
         self.chgnet_model = chgnet_model
 
-        if self.chgnet_model is None:
-            self.model = CHGNet.load()
-        else:
-            self.model = CHGNet.from_file(self.chgnet_model)
+        # Shared with every other module that uses the same model file
+        self.model = get_chgnet_model(self.chgnet_model)
+
+        # Number of crystal graphs passed to the model at once
+        self._batch_size = batch_size
+
+        self.surface_energy_kwargs = {
+            "chgnet_model": self.chgnet_model,
+            "batch_size": self._batch_size,
+        }
+
+        # Built from self.iface on the first call of generate_interface_inputs
+        self._graph_converter = None
 
-        self.surface_energy_kwargs = {"chgnet_model": self.chgnet_model}
+    @classmethod
+    def preload(cls, **kwargs) -> None:
+        get_chgnet_model(kwargs.get("chgnet_model", None))
 
     def generate_constant_inputs(
         self,
         structure: Structure,
-    ) -> tp.List[Structure]:
+    ) -> tp.List:
         """
         This method is used to generate the inputs of the calculate function
         for the structures that will stay constant throughout the surface
         matching process (i.e. OBS, supercells)
         """
-        return [structure]
+        return [self.model.graph_converter(structure)]
 
     def generate_interface_inputs(
         self,
         shifts: np.ndarray,
-    ) -> tp.List[Structure]:
+    ) -> tp.List:
         """
         This method is used to generate the inputs of the calculate function
         for the interface given various shifts
         """
-        shifted_ifaces = []
-        for shift in shifts:
-            shifted_iface = utils.shift_film(
-                interface=self.iface,
-                shift=shift,
-                fractional=False,
+        # self.iface is replaced after get_optimized_structure so the
+        # intra-film and intra-substrate edges have to be found again
+        if (
+            self._graph_converter is None
+            or self._graph_converter.structure is not self.iface
+        ):
+            self._graph_converter = RigidShiftGraphConverter(
+                structure=self.iface,
+                graph_converter=self.model.graph_converter,
             )
-            shifted_ifaces.append(shifted_iface)
 
-        return shifted_ifaces
+        return self._graph_converter.get_graphs(shifts=shifts)
 
-    def calculate(self, inputs: tp.List[Structure]) -> np.array:
+    def calculate(self, inputs: tp.List) -> np.array:
         """
         This method is used to calculate the total energy of the structure with
         the given method of calculating the energy (i.e. DFT, ML-potential)
         """
-        model_outputs = self.model.predict_structure(
-            structure=inputs,
+        model_outputs = self.model.predict_graph(
+            inputs,
             task="e",
+            batch_size=self._batch_size,
         )
 
-        n_atoms = np.array([len(s) for s in inputs])
+        n_atoms = np.array([len(g.atomic_number) for g in inputs])
 
         if type(model_outputs) is dict:
             energies = np.array([model_outputs["e"]])
@@ -0,0 +1,42 @@
+import typing as tp
+from os.path import abspath
+
+# CHGNet models loaded in this process keyed by model file (None = pretrained)
+_chgnet_models: tp.Dict[tp.Optional[str], tp.Any] = {}
+
+
+def get_chgnet_model(chgnet_model: tp.Optional[str] = None) -> tp.Any:
+    """
+    Loads a CHGNet model once per process and returns the same instance to
+    every surface matcher and surface energy module that asks for it.
+
+    Args:
+        chgnet_model: Path to a CHGNet model file, if None the pretrained
+            model from CHGNet.load() is used
+
+    Returns:
+        CHGNet model
+    """
+    key = None if chgnet_model is None else abspath(chgnet_model)
+
+    if key not in _chgnet_models:
+        try:
+            from chgnet.model.model import CHGNet
+        except ImportError:
+            raise ImportError(
+                "You need to install `chgnet` in order to use the CHGNet surface matching modules"
+            )
+
+        if key is None:
+            _chgnet_models[key] = CHGNet.load()
+        else:
+            _chgnet_models[key] = CHGNet.from_file(key)
+
+    return _chgnet_models[key]
+
+
+def clear_chgnet_models() -> None:
+    """
+    Removes all CHGNet models from the registry of this process
+    """
+    _chgnet_models.clear()
@@ -0,0 +1,222 @@
+import typing as tp
+
+from pymatgen.core.structure import Structure
+from pymatgen.optimization.neighbors import find_points_in_spheres
+import numpy as np
+
+
+class _NeighborListStructure(Structure):
+    """Structure that hands a precomputed neighbor list to the CHGNet graph
+    converter instead of searching for the neighbors again"""
+
+    def set_neighbor_list(
+        self,
+        neighbor_list: tp.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+        cutoff: float,
+    ) -> None:
+        self._neighbor_list = neighbor_list
+        self._neighbor_list_cutoff = cutoff
+
+    def get_neighbor_list(
+        self,
+        r: float,
+        sites: tp.Optional[tp.List] = None,
+        numerical_tol: float = 1e-8,
+        exclude_self: bool = True,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        all_sites = sites is None or len(sites) == len(self)
+        neighbor_list = getattr(self, "_neighbor_list", None)
+
+        if (
+            neighbor_list is None
+            or not all_sites
+            or not exclude_self
+            or r > self._neighbor_list_cutoff
+        ):
+            return super().get_neighbor_list(
+                r=r,
+                sites=sites,
+                numerical_tol=numerical_tol,
+                exclude_self=exclude_self,
+            )
+
+        center_indices, points_indices, images, distances = neighbor_list
+        mask = distances <= r + numerical_tol
+
+        return (
+            center_indices[mask],
+            points_indices[mask],
+            images[mask],
+            distances[mask],
+        )
+
+
+class RigidShiftGraphConverter:
+    """CHGNet crystal graph builder for an interface with a rigidly shifted film
+
+    A rigid shift of the film does not change any of the film-film or
+    substrate-substrate edges of the crystal graph (as long as the film is
+    not wrapped back into the unit cell), so these are found once from the
+    unshifted structure. For each shift only the film-substrate edges are
+    searched for and the combined neighbor list is handed to the CHGNet graph
+    converter, which builds the atom and bond graphs from it.
+
+    Examples:
+        >>> converter = RigidShiftGraphConverter(
+        ...     structure=iface,
+        ...     graph_converter=model.graph_converter,
+        ... )
+        >>> graphs = converter.get_graphs(shifts=shifts)
+        >>> outputs = model.predict_graph(graphs, task="e", batch_size=16)
+
+    Args:
+        structure: Interface structure with an is_film site property
+        graph_converter: CHGNet crystal graph converter (i.e. CHGNet.graph_converter)
+
+    Attributes:
+        structure (Structure): Interface structure with an is_film site property
+        graph_converter (CrystalGraphConverter): CHGNet crystal graph converter
+        cutoff (float): Cutoff of the atom graph
+    """
+
+    def __init__(
+        self,
+        structure: Structure,
+        graph_converter: tp.Callable,
+    ) -> None:
+        self.structure = structure
+        self.graph_converter = graph_converter
+        self.cutoff = float(graph_converter.atom_graph_cutoff)
+
+        self._is_film = np.array(structure.site_properties["is_film"]).astype(
+            bool
+        )
+        self._film_inds = np.where(self._is_film)[0]
+        self._sub_inds = np.where(~self._is_film)[0]
+
+        self._lattice_matrix = np.ascontiguousarray(
+            structure.lattice.matrix,
+            dtype=float,
+        )
+        self._pbc = np.ascontiguousarray(structure.lattice.pbc, dtype=int)
+        self._cart_coords = np.ascontiguousarray(
+            structure.cart_coords,
+            dtype=float,
+        )
+        self._species = structure.species
+
+        (
+            center_indices,
+            points_indices,
+            images,
+            distances,
+        ) = structure.get_neighbor_list(r=self.cutoff, numerical_tol=1e-8)
+
+        # Film-film and substrate-substrate edges are shift invariant
+        intra_mask = self._is_film[center_indices] == self._is_film[points_indices]
+
+        self._intra_neighbor_list = (
+            center_indices[intra_mask],
+            points_indices[intra_mask],
+            images[intra_mask],
+            distances[intra_mask],
+        )
+
+    def _get_shifted_cart_coords(self, shift: np.ndarray) -> np.ndarray:
+        cart_coords = self._cart_coords.copy()
+        cart_coords[self._film_inds] += shift
+
+        return cart_coords
+
+    def get_neighbor_list(
+        self,
+        shift: np.ndarray,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Neighbor list of the interface with the film shifted by shift in the
+        format of Structure.get_neighbor_list
+
+        Args:
+            shift: Cartesian shift of the film
+
+        Returns:
+            center_indices, points_indices, images, distances
+        """
+        cart_coords = self._get_shifted_cart_coords(shift=shift)
+
+        sub_centers, film_points, images, distances = find_points_in_spheres(
+            np.ascontiguousarray(cart_coords[self._film_inds]),
+            np.ascontiguousarray(cart_coords[self._sub_inds]),
+            r=self.cutoff,
+            pbc=self._pbc,
+            lattice=self._lattice_matrix,
+            tol=1e-8,
+        )
+
+        sub_centers = self._sub_inds[sub_centers]
+        film_points = self._film_inds[film_points]
+
+        # Every substrate -> film edge has a film -> substrate partner
+        # pointing to the opposite image
+        intra_centers, intra_points, intra_images, intra_distances = (
+            self._intra_neighbor_list
+        )
+        center_indices = np.concatenate(
+            [intra_centers, sub_centers, film_points]
+        )
+        points_indices = np.concatenate(
+            [intra_points, film_points, sub_centers]
+        )
+        images = np.concatenate([intra_images, images, -images])
+        distances = np.concatenate([intra_distances, distances, distances])
+
+        # Same ordering as Structure.get_neighbor_list
+        sort_inds = np.argsort(center_indices, kind="stable")
+
+        return (
+            center_indices[sort_inds].astype(int),
+            points_indices[sort_inds].astype(int),
+            images[sort_inds].astype(float),
+            distances[sort_inds],
+        )
+
+    def get_structure(self, shift: np.ndarray) -> Structure:
+        """
+        Interface structure with the film shifted by shift that carries the
+        neighbor list from get_neighbor_list
+
+        Args:
+            shift: Cartesian shift of the film
+
+        Returns:
+            Shifted interface structure
+        """
+        structure = _NeighborListStructure(
+            lattice=self.structure.lattice,
+            species=self._species,
+            coords=self._get_shifted_cart_coords(shift=shift),
+            coords_are_cartesian=True,
+        )
+        structure.set_neighbor_list(
+            neighbor_list=self.get_neighbor_list(shift=shift),
+            cutoff=self.cutoff,
+        )
+
+        return structure
+
+    def get_graphs(self, shifts: np.ndarray) -> tp.List:
+        """
+        CHGNet crystal graphs of the interface for each film shift
+
+        Args:
+            shifts: (N, 3) array of cartesian film shifts
+
+        Returns:
+            List of CrystalGraph objects
+        """
+        shifts = np.asarray(shifts, dtype=float).reshape(-1, 3)
+
+        return [
+            self.graph_converter(self.get_structure(shift=shift))
+            for shift in shifts
+        ]
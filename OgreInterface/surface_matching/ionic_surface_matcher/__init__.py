@@ -1,10 +1,20 @@
 from OgreInterface.surface_matching.ionic_surface_matcher.input_generator import (
     generate_input_dict,
     create_batch,
+    create_shared_batch,
 )
 from OgreInterface.surface_matching.ionic_surface_matcher.ionic_shifted_force_potential import (
     IonicShiftedForcePotential,
 )
+from OgreInterface.surface_matching.ionic_surface_matcher.neighbor_search import (
+    get_neighbor_list,
+)
+from OgreInterface.surface_matching.ionic_surface_matcher.neighbor_list import (
+    RigidShiftNeighborList,
+)
+from OgreInterface.surface_matching.ionic_surface_matcher.potential_field import (
+    SubstratePotentialField,
+)
 from OgreInterface.surface_matching.ionic_surface_matcher.scatter_add import (
     scatter_add_bin,
 )
@@ -2,9 +2,12 @@ from typing import Dict, List, Optional
 from copy import deepcopy
 
 from pymatgen.core.structure import Structure
-from pymatgen.io.ase import AseAtomsAdaptor
+from pymatgen.core.periodic_table import Element
 import numpy as np
-from matscipy.neighbours import neighbour_list
+
+from OgreInterface.surface_matching.ionic_surface_matcher.neighbor_search import (
+    get_neighbor_list,
+)
 
 
 def create_batch(
@@ -40,6 +43,36 @@ def create_batch(
     return batch_inputs
 
 
+def create_shared_batch(
+    inputs: Dict[str, np.ndarray],
+    shifts: np.ndarray,
+    pair_parameters: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Create a batch of structures that all share the same topology and only
+    differ by a rigid shift of the film atoms. Unlike create_batch, the per
+    atom and per pair arrays are stored once (without copying) and the shifts
+    are stored as a (batch_size, 3) array that is broadcast over the pairs by
+    the potential.
+
+    Args:
+        inputs: Input dictionary generated by generate_input_dict
+        shifts: (batch_size, 3) array of cartesian shifts of the film atoms
+        pair_parameters: Optional pair parameters of the inputs that were
+            precomputed with IonicShiftedForcePotential.get_pair_parameters
+
+    Returns:
+        Batch input dictionary with an additional "shifts" key
+    """
+    batch_inputs = dict(inputs)
+    batch_inputs["shifts"] = np.asarray(shifts).reshape(-1, 3)
+
+    if pair_parameters is not None:
+        batch_inputs["pair_parameters"] = pair_parameters
+
+    return batch_inputs
+
+
 def generate_input_dict(
     structure: Structure,
     cutoff: float,
@@ -48,23 +81,24 @@ def generate_input_dict(
 
     R = structure.cart_coords
     cell = deepcopy(structure.lattice.matrix)
-
-    e_negs = np.array([s.specie.X for s in structure])
-
-    atoms = AseAtomsAdaptor().get_atoms(structure)
     pbc = np.array(structure.lattice.pbc)
-    atoms.set_pbc(pbc)
+    Z = np.array(structure.atomic_numbers).astype(int)
+
+    # Electronegativities are looked up once per element
+    unique_Z, inverse_Z = np.unique(Z, return_inverse=True)
+    e_negs = np.array([Element.from_Z(z).X for z in unique_Z])[inverse_Z]
 
-    idx_i, idx_j, frac_offsets = neighbour_list(
-        "ijS",
-        atoms=atoms,
+    idx_i, idx_j, images = get_neighbor_list(
+        lattice_matrix=cell,
+        cart_coords=R,
+        pbc=pbc,
         cutoff=cutoff,
     )
-    offsets = frac_offsets.dot(atoms.cell)
+    offsets = images.astype(float).dot(cell)
 
     input_dict = {
         "n_atoms": np.array([len(structure)]),
-        "Z": np.array(structure.atomic_numbers).astype(int),
+        "Z": Z,
         "R": R,
         "cell": cell.reshape(-1, 3, 3),
         "pbc": pbc.reshape(-1, 3),
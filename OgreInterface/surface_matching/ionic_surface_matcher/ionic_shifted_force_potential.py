@@ -1,4 +1,6 @@
 import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import numpy as np
 from scipy.special import erfc
@@ -6,6 +8,11 @@ from scipy.special import erfc
 from OgreInterface.surface_matching.ionic_surface_matcher.scatter_add import (
     scatter_add_bin,
 )
+from OgreInterface.surface_matching.ionic_surface_matcher.pair_kernels import (
+    HAS_NUMBA,
+    fused_pair_energies,
+    fused_shared_pair_energies,
+)
 
 
 class IonicPotentialError(Exception):
@@ -20,39 +27,154 @@ class IonicShiftedForcePotential:
         alpha (float): Ewald alpha.
         k_max (int): Number of lattice vectors.
         charges_key (str): Key of partial charges in the input batch.
+        backend (str): "numba" to use the compiled pair kernels, "numpy" to use
+            NumPy, or "auto" to use numba when it is installed.
+        n_threads (int): Number of threads used to evaluate the chunks of the
+            pair list.
+        chunk_size (int): Maximum number of pair distances (batch_size x pairs)
+            that are evaluated at once, which bounds the temporary memory.
     """
 
     def __init__(
         self,
         cutoff: tp.Optional[float] = None,
+        backend: str = "auto",
+        n_threads: int = 1,
+        chunk_size: int = 2**18,
     ):
         # Get the appropriate Coulomb constant
         self.ke = np.array(14.3996, dtype=np.float32)
         self.cutoff = np.array(cutoff, dtype=np.float32)
 
+        # The numba backend fuses the distances, cutoff mask, DSF and Born
+        # energies and the per structure sums into one pass over the pairs
+        if backend == "auto":
+            backend = "numba" if HAS_NUMBA else "numpy"
+
+        if backend not in ["numba", "numpy"]:
+            raise IonicPotentialError(
+                f"backend must be 'auto', 'numba' or 'numpy', not '{backend}'"
+            )
+
+        if backend == "numba" and not HAS_NUMBA:
+            raise IonicPotentialError(
+                "The numba backend requires numba (pip install numba)"
+            )
+
+        self.backend = backend
+        self.n_threads = n_threads
+        self.chunk_size = chunk_size
+
+        # Step (Angstroms) of the finite difference gradients of a
+        # SubstratePotentialField
+        self._field_gradient_step = 1e-3
+
     def forward(
         self,
         inputs: tp.Dict[str, np.ndarray],
         constant_coulomb_contribution: tp.Optional[np.ndarray] = None,
         constant_born_contribution: tp.Optional[np.ndarray] = None,
     ) -> tp.Dict[str, np.ndarray]:
+        if "potential_field" in inputs:
+            return self._forward_potential_field(
+                inputs=inputs,
+                constant_coulomb_contribution=constant_coulomb_contribution,
+                constant_born_contribution=constant_born_contribution,
+            )
+
+        if "shifts" in inputs:
+            return self._forward_shared(
+                inputs=inputs,
+                constant_coulomb_contribution=constant_coulomb_contribution,
+                constant_born_contribution=constant_born_contribution,
+            )
+
         q = inputs["partial_charges"]
         idx_m = inputs["idx_m"]
 
-        n_atoms = q.shape[0]
         n_molecules = int(idx_m[-1]) + 1
-        z = inputs["Z"]
-        ns = inputs["born_ns"]
-        r0s = inputs["r0s"]
+
+        if self.backend == "numba":
+            chunk_energies = partial(fused_pair_energies, inputs, self.cutoff)
+        else:
+            chunk_energies = partial(self._pair_energies, inputs)
+
+        y_dsf = np.zeros(n_molecules)
+        y_born = np.zeros(n_molecules)
+
+        for chunk_dsf, chunk_born in self._map_pair_chunks(
+            func=chunk_energies,
+            n_pairs=len(inputs["idx_i"]),
+            chunk_size=self.chunk_size,
+        ):
+            y_dsf += chunk_dsf
+            y_born += chunk_born
+
+        _, y_dsf_self = self._damped_shifted_force(
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+            q,
+        )
+
+        if constant_coulomb_contribution is not None:
+            y_dsf += np.tile(constant_coulomb_contribution, n_molecules)
+
+        y_dsf_self = scatter_add_bin(y_dsf_self, idx_m, dim_size=n_molecules)
+        y_coulomb = 0.5 * self.ke * (y_dsf - y_dsf_self).reshape(-1)
+
+        if constant_born_contribution is not None:
+            y_born += np.tile(constant_born_contribution, n_molecules) / (
+                0.5 * self.ke
+            )
+
+        y_born = 0.5 * self.ke * y_born.reshape(-1)
+
+        y_energy = y_coulomb + y_born
+
+        return (
+            y_energy.astype(np.float32),
+            y_coulomb.astype(np.float32),
+            y_born.astype(np.float32),
+            y_dsf.astype(np.float32),
+        )
+
+    def _map_pair_chunks(
+        self,
+        func: tp.Callable[[slice], tp.Any],
+        n_pairs: int,
+        chunk_size: int,
+    ) -> tp.List[tp.Any]:
+        """
+        Applies func to consecutive slices of at most chunk_size pairs. The
+        chunks are evaluated on a thread pool if n_threads > 1 which works
+        because NumPy (and the numba kernels) release the GIL.
+        """
+        chunk_size = max(int(chunk_size), 1)
+        pair_slices = [
+            slice(start, min(start + chunk_size, n_pairs))
+            for start in range(0, n_pairs, chunk_size)
+        ]
+
+        if self.n_threads > 1 and len(pair_slices) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+                return list(executor.map(func, pair_slices))
+
+        return [func(pair_slice) for pair_slice in pair_slices]
+
+    def _pair_energies(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+        pair_slice: slice = slice(None),
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
         idx_m = inputs["idx_m"]
-        e_negs = inputs["e_negs"]
+        n_molecules = int(idx_m[-1]) + 1
 
-        idx_i_all = inputs["idx_i"]
-        idx_j_all = inputs["idx_j"]
+        idx_i_all = inputs["idx_i"][pair_slice]
+        idx_j_all = inputs["idx_j"][pair_slice]
 
         R = inputs["R"]
 
-        r_ij_all = R[idx_j_all] - R[idx_i_all] + inputs["offsets"]
+        r_ij_all = R[idx_j_all] - R[idx_i_all] + inputs["offsets"][pair_slice]
 
         distances = np.sqrt(np.einsum("ij,ij->i", r_ij_all, r_ij_all))
 
@@ -61,42 +183,232 @@ class IonicShiftedForcePotential:
         idx_j = idx_j_all[in_cutoff]
         d_ij = distances[in_cutoff]
 
-        # If the neural atom has a larger electronegativity than a negatively charged ion then it should be attractive
+        n_ij, q_ij, B_ij = self._calc_pair_parameters(
+            inputs=inputs,
+            idx_i=idx_i,
+            idx_j=idx_j,
+        )
 
-        r0_ij = r0s[idx_i] + r0s[idx_j]
-        n_ij = (ns[idx_i] + ns[idx_j]) / 2
-        q_ij = (q[idx_i] * q[idx_j]).astype(np.float32)
-        e_diff_ij = 0.5 + (np.abs(e_negs[idx_i] - e_negs[idx_j]) / (2 * 3.19))
-        zero_charge_mask = q_ij == 0
-        q_ij[zero_charge_mask] -= e_diff_ij[zero_charge_mask]
+        # The self energy is calculated once in forward so no charges are
+        # passed here
+        y_dsf, _ = self._damped_shifted_force(
+            d_ij,
+            q_ij,
+            np.zeros(0, dtype=np.float32),
+        )
+        y_dsf = scatter_add_bin(y_dsf, idx_m[idx_i], dim_size=n_molecules)
 
-        B_ij = -self._calc_B(r0_ij=r0_ij, n_ij=n_ij, q_ij=q_ij)
+        y_born = self._born(d_ij, n_ij, B_ij)
+        y_born = scatter_add_bin(y_born, idx_m[idx_i], dim_size=n_molecules)
 
-        n_atoms = z.shape[0]
-        n_molecules = int(idx_m[-1]) + 1
+        return y_dsf, y_born
+
+    def forward_with_forces(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+        constant_coulomb_contribution: tp.Optional[np.ndarray] = None,
+        constant_born_contribution: tp.Optional[np.ndarray] = None,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same as forward but also returns the gradient of the total energy
+        with respect to the rigid shift of the film atoms. Only the film
+        substrate pairs depend on the shift, so the gradient is the sum of
+        the analytic DSF and Born pair derivatives over those pairs. For
+        inputs that use a SubstratePotentialField the gradient is the central
+        finite difference of the interpolated field.
+
+        Args:
+            inputs: Batch inputs with a "shifts" key (see create_shared_batch)
+            constant_coulomb_contribution: Constant DSF energy of the interface
+            constant_born_contribution: Constant Born energy of the interface
+
+        Returns:
+            The total, Coulomb, Born and DSF energies of forward and a
+            (batch_size, 3) array of the gradients (eV/Angstrom) of the total
+            energies with respect to the cartesian film shifts
+        """
+        if "shifts" not in inputs:
+            raise IonicPotentialError(
+                "Gradients can only be calculated for a batch of rigid film "
+                "shifts (see create_shared_batch)"
+            )
 
-        y_dsf, y_dsf_self = self._damped_shifted_force(d_ij, q_ij, q)
+        if "potential_field" in inputs:
+            return self._forward_potential_field(
+                inputs=inputs,
+                constant_coulomb_contribution=constant_coulomb_contribution,
+                constant_born_contribution=constant_born_contribution,
+                return_gradients=True,
+            )
 
-        y_dsf = scatter_add_bin(y_dsf, idx_i, dim_size=n_atoms)
-        y_dsf = scatter_add_bin(y_dsf, idx_m, dim_size=n_molecules)
+        return self._forward_shared(
+            inputs=inputs,
+            constant_coulomb_contribution=constant_coulomb_contribution,
+            constant_born_contribution=constant_born_contribution,
+            return_gradients=True,
+        )
 
-        if constant_coulomb_contribution is not None:
-            y_dsf += np.tile(constant_coulomb_contribution, n_molecules)
+    def _forward_shared(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+        constant_coulomb_contribution: tp.Optional[np.ndarray] = None,
+        constant_born_contribution: tp.Optional[np.ndarray] = None,
+        return_gradients: bool = False,
+    ) -> tp.Tuple[np.ndarray, ...]:
+        """
+        Energies of a batch of structures that share the same pair list and
+        per atom parameters and only differ by a rigid shift of the film
+        atoms (see create_shared_batch). The pair parameters are taken from
+        inputs["pair_parameters"] if they were precomputed with
+        get_pair_parameters, otherwise they are calculated once per call and
+        broadcast over the batch. The pairs are evaluated in chunks of
+        chunk_size (batch_size x pairs) distances.
+        """
+        if "pair_parameters" in inputs:
+            pair_parameters = inputs["pair_parameters"]
+        else:
+            pair_parameters = self.get_pair_parameters(inputs=inputs)
+
+        shifts = inputs["shifts"].astype(np.float64)
+        n_molecules = len(shifts)
+
+        if self.backend == "numba" and not return_gradients:
+            chunk_energies = partial(
+                fused_shared_pair_energies,
+                pair_parameters,
+                shifts,
+                self.cutoff,
+            )
+        else:
+            chunk_energies = partial(
+                self._shared_pair_energies,
+                pair_parameters,
+                shifts,
+                return_gradients,
+            )
 
-        y_dsf_self = scatter_add_bin(y_dsf_self, idx_m, dim_size=n_molecules)
-        y_coulomb = 0.5 * self.ke * (y_dsf - y_dsf_self).reshape(-1)
+        y_dsf = np.zeros(n_molecules)
+        y_born = np.zeros(n_molecules)
+        gradients = np.zeros((n_molecules, 3))
+
+        for chunk in self._map_pair_chunks(
+            func=chunk_energies,
+            n_pairs=len(pair_parameters["r_ij"]),
+            chunk_size=self.chunk_size // n_molecules,
+        ):
+            y_dsf += chunk[0]
+            y_born += chunk[1]
+
+            if return_gradients:
+                gradients += chunk[2]
+
+        energies = self._shared_energies(
+            y_dsf=y_dsf,
+            y_born=y_born,
+            dsf_self=pair_parameters["dsf_self"],
+            constant_coulomb_contribution=constant_coulomb_contribution,
+            constant_born_contribution=constant_born_contribution,
+        )
 
-        y_born = self._born(d_ij, n_ij, B_ij)
+        if not return_gradients:
+            return energies
+
+        return energies + (gradients,)
 
-        y_born = scatter_add_bin(y_born, idx_i, dim_size=n_atoms)
+    def _shared_pair_energies(
+        self,
+        pair_parameters: tp.Dict[str, np.ndarray],
+        shifts: np.ndarray,
+        return_gradients: bool,
+        pair_slice: slice = slice(None),
+    ) -> tp.Tuple[np.ndarray, ...]:
+        n_molecules = len(shifts)
+
+        r_ij_all = pair_parameters["r_ij"][pair_slice]
+        shift_sign = pair_parameters["shift_sign"][pair_slice]
+        q_ij = pair_parameters["q_ij"][pair_slice]
+        n_ij = pair_parameters["n_ij"][pair_slice]
+        B_ij = pair_parameters["B_ij"][pair_slice]
+
+        # |r_ij + s * shift|^2 = |r_ij|^2 + 2s(r_ij . shift) + s^2 |shift|^2
+        # which avoids storing a (batch_size, n_pairs, 3) array
+        distances_sq = pair_parameters["d_ij_sq"][pair_slice][None, :] + (
+            2 * shift_sign[None, :] * shifts.dot(r_ij_all.T)
+        )
+        distances_sq += (
+            np.abs(shift_sign)[None, :]
+            * np.einsum("ij,ij->i", shifts, shifts)[:, None]
+        )
+
+        distances = np.sqrt(np.maximum(distances_sq, 0.0)).astype(np.float32)
+
+        idx_m, pair_idx = np.nonzero(distances <= self.cutoff)
+        d_ij = distances[idx_m, pair_idx]
+
+        # The self energy is precomputed so no charges are passed here
+        y_dsf, _ = self._damped_shifted_force(
+            d_ij,
+            q_ij[pair_idx],
+            np.zeros(0, dtype=np.float32),
+        )
+        y_dsf = scatter_add_bin(y_dsf, idx_m, dim_size=n_molecules)
+
+        y_born = self._born(d_ij, n_ij[pair_idx], B_ij[pair_idx])
         y_born = scatter_add_bin(y_born, idx_m, dim_size=n_molecules)
 
+        if not return_gradients:
+            return y_dsf, y_born
+
+        # Only the film-substrate pairs depend on the shift
+        is_variable = shift_sign[pair_idx] != 0
+        idx_m = idx_m[is_variable]
+        pair_idx = pair_idx[is_variable]
+        s_ij = shift_sign[pair_idx]
+
+        r_ij = r_ij_all[pair_idx] + (s_ij[:, None] * shifts[idx_m])
+        d_ij = np.sqrt(np.einsum("ij,ij->i", r_ij, r_ij))
+
+        dE_dd = q_ij[pair_idx] * self._damped_shifted_force_derivative(d_ij)
+        dE_dd += self._born_derivative(d_ij, n_ij[pair_idx], B_ij[pair_idx])
+
+        # d(d_ij)/d(shift) = s * r_ij / d_ij
+        pair_gradients = (0.5 * self.ke * s_ij * dE_dd / d_ij)[:, None]
+        pair_gradients = pair_gradients * r_ij
+
+        gradients = np.stack(
+            [
+                scatter_add_bin(
+                    pair_gradients[:, k],
+                    idx_m,
+                    dim_size=n_molecules,
+                )
+                for k in range(3)
+            ],
+            axis=1,
+        )
+
+        return y_dsf, y_born, gradients
+
+    def _shared_energies(
+        self,
+        y_dsf: np.ndarray,
+        y_born: np.ndarray,
+        dsf_self: float,
+        constant_coulomb_contribution: tp.Optional[np.ndarray] = None,
+        constant_born_contribution: tp.Optional[np.ndarray] = None,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        n_molecules = len(y_dsf)
+
+        if constant_coulomb_contribution is not None:
+            y_dsf += constant_coulomb_contribution
+
+        y_dsf_self = np.full(n_molecules, dsf_self)
+        y_coulomb = 0.5 * self.ke * (y_dsf - y_dsf_self)
+
         if constant_born_contribution is not None:
-            y_born += np.tile(constant_born_contribution, n_molecules) / (
-                0.5 * self.ke
-            )
+            y_born += constant_born_contribution / (0.5 * self.ke)
 
-        y_born = 0.5 * self.ke * y_born.reshape(-1)
+        y_born = 0.5 * self.ke * y_born
 
         y_energy = y_coulomb + y_born
 
@@ -107,6 +419,139 @@ class IonicShiftedForcePotential:
             y_dsf.astype(np.float32),
         )
 
+    def _forward_potential_field(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+        constant_coulomb_contribution: tp.Optional[np.ndarray] = None,
+        constant_born_contribution: tp.Optional[np.ndarray] = None,
+        return_gradients: bool = False,
+    ) -> tp.Tuple[np.ndarray, ...]:
+        """
+        Energies of a batch of rigid film shifts where the film-substrate
+        terms are interpolated from a SubstratePotentialField
+        """
+        potential_field = inputs["potential_field"]
+        shifts = np.asarray(inputs["shifts"], dtype=np.float64).reshape(-1, 3)
+        n_molecules = len(shifts)
+
+        if return_gradients:
+            # The field is a smooth spline so the gradient is taken from
+            # central differences that are interpolated in the same call
+            h = self._field_gradient_step
+            fd_shifts = np.concatenate(
+                [shifts]
+                + [shifts + (h * e) for e in np.eye(3)]
+                + [shifts - (h * e) for e in np.eye(3)]
+            )
+            dsf_energies, born_energies = potential_field.interpolate(
+                shifts=fd_shifts
+            )
+            # Shift dependent part of the total energy (each film-substrate
+            # pair appears twice in the neighbor list)
+            fd_energies = self.ke * (dsf_energies + born_energies)
+            fd_energies = fd_energies.reshape(7, n_molecules)
+            gradients = (fd_energies[1:4] - fd_energies[4:]).T / (2 * h)
+            dsf_energies = dsf_energies[:n_molecules]
+            born_energies = born_energies[:n_molecules]
+        else:
+            dsf_energies, born_energies = potential_field.interpolate(
+                shifts=shifts
+            )
+
+        # Each film-substrate pair appears twice in the neighbor list
+        energies = self._shared_energies(
+            y_dsf=2 * dsf_energies,
+            y_born=2 * born_energies,
+            dsf_self=potential_field.dsf_self,
+            constant_coulomb_contribution=constant_coulomb_contribution,
+            constant_born_contribution=constant_born_contribution,
+        )
+
+        if not return_gradients:
+            return energies
+
+        return energies + (gradients,)
+
+    def get_pair_parameters(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+    ) -> tp.Dict[str, np.ndarray]:
+        """
+        Calculates everything in the shared batch energy that only depends on
+        the atom identities and the unshifted positions so it can be cached
+        for a given interface and reused for every set of shifts.
+
+        Args:
+            inputs: Input dictionary generated by generate_input_dict
+
+        Returns:
+            Dictionary of the unshifted pair vectors (r_ij) and squared
+            distances (d_ij_sq), the sign of the film shift in each pair vector
+            (shift_sign), the pair parameters (n_ij, q_ij, B_ij) and the total
+            DSF self energy (dsf_self)
+        """
+        idx_i = inputs["idx_i"]
+        idx_j = inputs["idx_j"]
+        R = inputs["R"]
+
+        r_ij = (R[idx_j] - R[idx_i] + inputs["offsets"]).astype(np.float64)
+
+        # The shift is added to the film atoms so the pair vector changes by
+        # (is_film[j] - is_film[i]) * shift
+        if "is_film" in inputs:
+            is_film = inputs["is_film"].astype(np.float64)
+            shift_sign = is_film[idx_j] - is_film[idx_i]
+        else:
+            shift_sign = np.zeros(len(idx_i))
+
+        n_ij, q_ij, B_ij = self._calc_pair_parameters(
+            inputs=inputs,
+            idx_i=idx_i,
+            idx_j=idx_j,
+        )
+
+        _, dsf_self = self._damped_shifted_force(
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+            inputs["partial_charges"],
+        )
+
+        pair_parameters = {
+            "r_ij": r_ij,
+            "d_ij_sq": np.einsum("ij,ij->i", r_ij, r_ij),
+            "shift_sign": shift_sign,
+            "n_ij": n_ij,
+            "q_ij": q_ij,
+            "B_ij": B_ij,
+            "dsf_self": dsf_self.sum(),
+        }
+
+        return pair_parameters
+
+    def _calc_pair_parameters(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+        idx_i: np.ndarray,
+        idx_j: np.ndarray,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        q = inputs["partial_charges"]
+        ns = inputs["born_ns"]
+        r0s = inputs["r0s"]
+        e_negs = inputs["e_negs"]
+
+        # If the neural atom has a larger electronegativity than a negatively charged ion then it should be attractive
+
+        r0_ij = r0s[idx_i] + r0s[idx_j]
+        n_ij = (ns[idx_i] + ns[idx_j]) / 2
+        q_ij = (q[idx_i] * q[idx_j]).astype(np.float32)
+        e_diff_ij = 0.5 + (np.abs(e_negs[idx_i] - e_negs[idx_j]) / (2 * 3.19))
+        zero_charge_mask = q_ij == 0
+        q_ij[zero_charge_mask] -= e_diff_ij[zero_charge_mask]
+
+        B_ij = -self._calc_B(r0_ij=r0_ij, n_ij=n_ij, q_ij=q_ij)
+
+        return n_ij, q_ij, B_ij
+
     def _calc_B(self, r0_ij, n_ij, q_ij):
         alpha = np.array(0.2, dtype=np.float32)
         pi = np.array(np.pi, dtype=np.float32)
@@ -128,6 +573,11 @@ class IonicShiftedForcePotential:
     def _born(self, d_ij: np.ndarray, n_ij: np.ndarray, B_ij: np.ndarray):
         return B_ij * ((1 / (d_ij**n_ij)) - (1 / (self.cutoff**n_ij)))
 
+    def _born_derivative(
+        self, d_ij: np.ndarray, n_ij: np.ndarray, B_ij: np.ndarray
+    ):
+        return -n_ij * B_ij / (d_ij ** (n_ij + 1))
+
     def _damped_shifted_force(
         self, d_ij: np.ndarray, q_ij: np.ndarray, q: np.ndarray
     ):
@@ -158,6 +608,27 @@ class IonicShiftedForcePotential:
 
         return energies.astype(np.float32), self_energy.astype(np.float32)
 
+    def _damped_shifted_force_derivative(self, d_ij: np.ndarray):
+        # Derivative of the DSF pair energy divided by q_ij
+        alpha = 0.2
+        cutoff = float(self.cutoff)
+
+        force_shift = (erfc(alpha * cutoff) / cutoff**2) + (
+            (2 * alpha / np.sqrt(np.pi))
+            * (np.exp(-(alpha**2) * (cutoff**2)) / cutoff)
+        )
+
+        derivatives = (
+            -(erfc(alpha * d_ij) / d_ij**2)
+            - (
+                (2 * alpha / np.sqrt(np.pi))
+                * (np.exp(-(alpha**2) * (d_ij**2)) / d_ij)
+            )
+            + force_shift
+        )
+
+        return derivatives
+
 
 if __name__ == "__main__":
     pass
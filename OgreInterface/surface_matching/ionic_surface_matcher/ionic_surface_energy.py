@@ -11,6 +11,7 @@ from OgreInterface.surface_matching import (
 from OgreInterface.surface_matching.ionic_surface_matcher import (
     generate_input_dict,
     create_batch,
+    create_shared_batch,
     IonicShiftedForcePotential,
     ionic_utils,
 )
@@ -18,15 +19,21 @@ from OgreInterface.surfaces import Surface
 
 
 class IonicSurfaceEnergy(BaseSurfaceEnergy):
+    cache_ignored_kwargs = ("n_threads",)
+
     def __init__(
         self,
         surface: Surface,
         auto_determine_born_n: bool = False,
         born_n: float = 12.0,
+        n_threads: int = 1,
     ):
         # Cutoff for neighbor finding
         self._cutoff = 18.0
 
+        # Number of threads used to evaluate the pair lists
+        self._n_threads = n_threads
+
         super().__init__(surface=surface)
 
         # Set PBC for the surfaces so the z-direction is False
@@ -78,6 +85,12 @@ class IonicSurfaceEnergy(BaseSurfaceEnergy):
             inputs=all_double_slab_inputs
         )
 
+        # Precompute the film-sub pair parameters that are reused for every
+        # set of shifts
+        self.double_slab_pair_parameters = self._get_pair_parameters(
+            inputs=self.double_slab_inputs
+        )
+
         (
             self.const_born_energy,
             self.const_coulomb_energy,
@@ -105,14 +118,10 @@ class IonicSurfaceEnergy(BaseSurfaceEnergy):
         self,
         shifts: np.ndarray,
     ) -> tp.Dict[str, np.ndarray]:
-        batch_inputs = create_batch(
+        batch_inputs = create_shared_batch(
             inputs=self.double_slab_inputs,
-            batch_size=len(shifts),
-        )
-
-        ionic_utils.add_shifts_to_batch(
-            batch_inputs=batch_inputs,
             shifts=shifts,
+            pair_parameters=self.double_slab_pair_parameters,
         )
 
         batch_inputs["is_interface"] = True
@@ -125,6 +134,7 @@ class IonicSurfaceEnergy(BaseSurfaceEnergy):
     ) -> np.ndarray:
         ionic_potential = IonicShiftedForcePotential(
             cutoff=self._cutoff,
+            n_threads=self._n_threads,
         )
 
         if inputs["is_interface"]:
@@ -204,9 +214,21 @@ class IonicSurfaceEnergy(BaseSurfaceEnergy):
 
         return const_inputs, variable_inputs
 
+    def _get_pair_parameters(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+    ) -> tp.Dict[str, np.ndarray]:
+        ionic_potential = IonicShiftedForcePotential(
+            cutoff=self._cutoff,
+            n_threads=self._n_threads,
+        )
+
+        return ionic_potential.get_pair_parameters(inputs=inputs)
+
     def _get_constant_interface_terms(self):
         ionic_potential = IonicShiftedForcePotential(
             cutoff=self._cutoff,
+            n_threads=self._n_threads,
         )
 
         const_iface_inputs = create_batch(
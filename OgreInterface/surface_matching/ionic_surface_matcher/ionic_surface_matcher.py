@@ -1,5 +1,6 @@
 import typing as tp
 import itertools
+import warnings
 
 from pymatgen.core.periodic_table import Element
 from pymatgen.core.structure import Structure
@@ -9,7 +10,10 @@ import numpy as np
 from OgreInterface.surface_matching.ionic_surface_matcher import (
     generate_input_dict,
     create_batch,
+    create_shared_batch,
     IonicShiftedForcePotential,
+    RigidShiftNeighborList,
+    SubstratePotentialField,
     ionic_utils,
 )
 
@@ -43,8 +47,21 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
     Args:
         interface: The Interface object generated using the InterfaceGenerator
         grid_density: The sampling density of the 2D potential energy surface plot (points/Angstrom)
+        neighbor_skin: Skin distance (Angstrom) added to the cutoff of the film-substrate neighbor
+            list. The list is rebuilt when the film is shifted further than the skin.
+        n_threads: Number of threads used to evaluate the chunks of the pair lists in the ionic potential
+        adaptive_cleavage_energy: Determines if the cleavage energies of the film and substrate
+            are calculated with the adaptive mode of BaseSurfaceEnergy.get_cleavage_energy
     """
 
+    # Grid spacings (Angstroms) of the tabulated substrate potential that
+    # are tried from coarse to fine until the error check passes (see
+    # build_potential_field). Each step halves the volume per grid point.
+    _refined_grid_spacings = [0.5, 0.35, 0.25, 0.18, 0.125, 0.09]
+
+    # Grid spacing used when the error of the grid is not checked
+    _default_grid_spacing = 0.25
+
     def __init__(
         self,
         interface: Interface,
@@ -52,14 +69,24 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
         verbose: bool = True,
         auto_determine_born_n: bool = False,
         born_n: float = 12.0,
+        neighbor_skin: float = 2.0,
+        n_threads: int = 1,
+        adaptive_cleavage_energy: bool = False,
     ):
         # Cutoff for neighbor finding
         self._cutoff = 18.0
 
+        # Number of threads used to evaluate the pair lists
+        self._n_threads = n_threads
+
+        # Skin of the film-substrate neighbor list
+        self._neighbor_skin = neighbor_skin
+
         super().__init__(
             interface=interface,
             grid_density=grid_density,
             verbose=verbose,
+            adaptive_cleavage_energy=adaptive_cleavage_energy,
         )
 
         # Set PBC for the surfaces so the z-direction is False
@@ -97,10 +124,11 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
         self._set_r0s(self.sub_supercell)
         self._set_r0s(self.film_supercell)
 
-        # Generate the base inputs for the interface
-        all_iface_inputs = ionic_utils.generate_base_inputs(
+        # Generate the neighbor list for the interface
+        self.iface_neighbor_list = RigidShiftNeighborList(
             structure=self.iface,
-            cutoff=self._cutoff + 5.0,
+            cutoff=self._cutoff,
+            skin=self._neighbor_skin,
         )
 
         # Split the interface inputs into
@@ -109,7 +137,13 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
             self.const_iface_inputs,
             self.iface_inputs,
         ) = self._get_constant_and_variable_iface_inputs(
-            inputs=all_iface_inputs
+            inputs=self.iface_neighbor_list.inputs
+        )
+
+        # Precompute the film-sub pair parameters that are reused for every
+        # set of shifts
+        self.iface_pair_parameters = self._get_pair_parameters(
+            inputs=self.iface_inputs
         )
 
         (
@@ -120,8 +154,13 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
         self.surface_energy_kwargs = {
             "auto_determine_born_n": self._auto_determine_born_n,
             "born_n": self._born_n,
+            "n_threads": self._n_threads,
         }
 
+        # Tabulated substrate potential (see build_potential_field)
+        self.potential_field = None
+        self.potential_field_error = None
+
     @property
     def surface_energy_module(self) -> IonicSurfaceEnergy:
         return IonicSurfaceEnergy
@@ -148,20 +187,162 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
         self,
         shifts: np.ndarray,
     ) -> tp.Dict[str, np.ndarray]:
-        batch_inputs = create_batch(
-            inputs=self.iface_inputs,
-            batch_size=len(shifts),
-        )
+        # Use the tabulated substrate potential if it covers the shifts
+        if self.potential_field is not None and self.potential_field.contains(
+            shifts=shifts
+        ):
+            return self._get_potential_field_inputs(
+                potential_field=self.potential_field,
+                shifts=shifts,
+            )
+
+        # Wrap the in-plane shifts and rebuild the film-sub pairs if the
+        # shifts moved further than the skin of the neighbor list
+        shifts = self.iface_neighbor_list.wrap_shifts(shifts=shifts)
+
+        if self.iface_neighbor_list.update(shifts=shifts):
+            (
+                _,
+                self.iface_inputs,
+            ) = self._get_constant_and_variable_iface_inputs(
+                inputs=self.iface_neighbor_list.inputs
+            )
+            self.iface_pair_parameters = self._get_pair_parameters(
+                inputs=self.iface_inputs
+            )
 
-        ionic_utils.add_shifts_to_batch(
-            batch_inputs=batch_inputs,
+        batch_inputs = create_shared_batch(
+            inputs=self.iface_inputs,
             shifts=shifts,
+            pair_parameters=self.iface_pair_parameters,
         )
 
         batch_inputs["is_interface"] = True
 
         return batch_inputs
 
+    def build_potential_field(
+        self,
+        z_bounds: tp.Optional[tp.List[float]] = None,
+        grid_spacing: tp.Optional[float] = None,
+        n_check_shifts: int = 20,
+        max_error: float = 1e-3,
+    ) -> tp.Optional[float]:
+        """
+        Tabulates the DSF Coulomb and Born potential of the substrate on a 3D
+        grid (see SubstratePotentialField) so the energy of a rigid shift of
+        the film only costs one interpolation per film atom. Once built, all
+        shifts with an interfacial distance inside z_bounds (i.e. in
+        optimizePSO and run_surface_matching) use the tabulated potential,
+        shifts outside of z_bounds still use the exact pair sum.
+
+        The accuracy of the grid is checked against the exact
+        IonicShiftedForcePotential for random shifts inside z_bounds. The
+        adhesion energies are capped at 1 eV/Angstrom^2 for the error check
+        since only the ordering of strongly repulsive configurations (i.e.
+        film atoms sitting on top of substrate atoms) matters to the
+        optimizer. If grid_spacing is None, the grid starts coarse and is
+        only refined while the error is larger than max_error, since the
+        cost of the grid grows with the inverse cube of the spacing. A
+        warning is raised if the error of the final grid is larger than
+        max_error.
+
+        Args:
+            z_bounds: A list defining the minimum and maximum interfacial distance [min, max]
+                that should be covered by the grid (defaults to the z_bounds of optimizePSO)
+            grid_spacing: Spacing of the grid points in Angstroms. If None the spacing is
+                chosen from max_error (or set to 0.25 if n_check_shifts is zero)
+            n_check_shifts: Number of random shifts used to check the error of the grid
+            max_error: Maximum allowed error in the adhesion energy (eV/Angstrom^2)
+
+        Returns:
+            The maximum error in the adhesion energy (eV/Angstrom^2) of the random shifts or
+            None if n_check_shifts is zero
+        """
+        if z_bounds is None:
+            max_z = self._get_max_z()
+            z_bounds = [0.5, max(3.5, 1.2 * max_z)]
+
+        z_shift_range = np.array(z_bounds) - self.d_interface
+
+        # Make sure the exact potential is used for the error check
+        self.potential_field = None
+        self.potential_field_error = None
+
+        ionic_potential = IonicShiftedForcePotential(
+            cutoff=self._cutoff,
+            n_threads=self._n_threads,
+        )
+
+        if grid_spacing is not None:
+            grid_spacings = [grid_spacing]
+        elif n_check_shifts > 0:
+            grid_spacings = self._refined_grid_spacings
+        else:
+            grid_spacings = [self._default_grid_spacing]
+
+        # The exact energies of the check are calculated once and reused for
+        # every grid spacing
+        if n_check_shifts > 0:
+            rng = np.random.default_rng(seed=0)
+            cart_xy = self.get_cart_xy_shifts(rng.random((n_check_shifts, 2)))
+            z_shifts = rng.uniform(*z_shift_range, size=n_check_shifts)
+            shifts = np.c_[cart_xy, z_shifts]
+
+            exact_energies = self.calculate(
+                inputs=self.generate_interface_inputs(shifts=shifts)
+            )
+            exact_adhesion = np.minimum(
+                self.get_adhesion_energy(total_energies=exact_energies),
+                1.0,
+            )
+
+        for spacing in grid_spacings:
+            potential_field = SubstratePotentialField(
+                inputs=self.iface_inputs,
+                potential=ionic_potential,
+                z_shift_range=z_shift_range,
+                grid_spacing=spacing,
+            )
+
+            error = None
+
+            if n_check_shifts == 0:
+                break
+
+            field_energies = self.calculate(
+                inputs=self._get_potential_field_inputs(
+                    potential_field=potential_field,
+                    shifts=shifts,
+                )
+            )
+            field_adhesion = np.minimum(
+                self.get_adhesion_energy(total_energies=field_energies),
+                1.0,
+            )
+
+            error = float(np.abs(field_adhesion - exact_adhesion).max())
+
+            if error <= max_error:
+                break
+
+        if error is not None and error > max_error:
+            warnings.warn(
+                f"The maximum error of the tabulated substrate potential ({error:.2e} eV/A^2) "
+                + f"is larger than max_error ({max_error:.2e} eV/A^2), consider using a smaller grid_spacing"
+            )
+
+        if self._verbose:
+            print(
+                f"Tabulated substrate potential grid: {potential_field.grid_shape} "
+                + f"(grid_spacing = {potential_field.grid_spacing:.3f} A)"
+            )
+
+        self.potential_field = potential_field
+        self.potential_field_error = error
+
+        return error
+
     def get_optimized_structure(self):
         # Shift the interface to the optimal inplane positon
         self.interface.shift_film_inplane(
@@ -188,10 +369,11 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
         # Add the r0s to the iface structure
         self._set_r0s(self.iface)
 
-        # Generate the base inputs for the interface
-        all_iface_inputs = ionic_utils.generate_base_inputs(
+        # Regenerate the neighbor list for the interface
+        self.iface_neighbor_list = RigidShiftNeighborList(
             structure=self.iface,
-            cutoff=self._cutoff + 5.0,
+            cutoff=self._cutoff,
+            skin=self._neighbor_skin,
         )
 
         # Recalculate the variable iface inputs
@@ -199,9 +381,18 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
             _,
             self.iface_inputs,
         ) = self._get_constant_and_variable_iface_inputs(
-            inputs=all_iface_inputs
+            inputs=self.iface_neighbor_list.inputs
+        )
+
+        # Recalculate the film-sub pair parameters
+        self.iface_pair_parameters = self._get_pair_parameters(
+            inputs=self.iface_inputs
         )
 
+        # The tabulated substrate potential is no longer valid
+        self.potential_field = None
+        self.potential_field_error = None
+
         # Reset optimal shift values
         self.opt_xy_shift[:2] = 0.0
         self.d_interface = self.opt_d_interface
@@ -212,6 +403,7 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
     ) -> np.ndarray:
         ionic_potential = IonicShiftedForcePotential(
             cutoff=self._cutoff,
+            n_threads=self._n_threads,
         )
 
         if inputs["is_interface"]:
@@ -235,6 +427,29 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
 
         return energy
 
+    def calculate_with_gradients(
+        self,
+        inputs: tp.Dict[str, tp.Union[np.ndarray, bool]],
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        ionic_potential = IonicShiftedForcePotential(
+            cutoff=self._cutoff,
+            n_threads=self._n_threads,
+        )
+
+        (
+            energy,
+            _,
+            _,
+            _,
+            gradients,
+        ) = ionic_potential.forward_with_forces(
+            inputs=inputs,
+            constant_coulomb_contribution=self.const_coulomb_energy,
+            constant_born_contribution=self.const_born_energy,
+        )
+
+        return energy, gradients
+
     def _get_charges(self):
         sub = self.interface.substrate.bulk_structure
         film = self.interface.film.bulk_structure
@@ -372,9 +587,34 @@ class IonicSurfaceMatcher(BaseSurfaceMatcher):
         ns = [n_vals[z] for z in struc.atomic_numbers]
         struc.add_site_property("born_ns", ns)
 
+    def _get_potential_field_inputs(
+        self,
+        potential_field: SubstratePotentialField,
+        shifts: np.ndarray,
+    ) -> tp.Dict[str, tp.Union[np.ndarray, bool]]:
+        inputs = {
+            "shifts": np.asarray(shifts).reshape(-1, 3),
+            "potential_field": potential_field,
+            "is_interface": True,
+        }
+
+        return inputs
+
+    def _get_pair_parameters(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+    ) -> tp.Dict[str, np.ndarray]:
+        ionic_potential = IonicShiftedForcePotential(
+            cutoff=self._cutoff,
+            n_threads=self._n_threads,
+        )
+
+        return ionic_potential.get_pair_parameters(inputs=inputs)
+
     def _get_constant_interface_terms(self):
         ionic_potential = IonicShiftedForcePotential(
             cutoff=self._cutoff,
+            n_threads=self._n_threads,
         )
 
         const_iface_inputs = create_batch(
@@ -0,0 +1,145 @@
+from pymatgen.core.structure import Structure
+import numpy as np
+
+from OgreInterface.surface_matching.ionic_surface_matcher.input_generator import (
+    generate_input_dict,
+)
+from OgreInterface.surface_matching.ionic_surface_matcher.neighbor_search import (
+    get_neighbor_list,
+)
+
+
+class RigidShiftNeighborList:
+    """Verlet style neighbor list for an interface with a rigidly shifted film
+
+    The neighbor list is built with a cutoff of cutoff + skin around a
+    reference shift of the film. Since the film only moves rigidly, the
+    distance between a film atom and a substrate atom can only change by the
+    displacement of the film relative to the reference shift, so the list
+    contains every pair within the cutoff as long as that displacement is
+    smaller than the skin. Once a batch of shifts exceeds the skin the list is
+    rebuilt around the center of the batch. The in-plane components of the
+    shifts are wrapped to the periodic image closest to the reference shift
+    before the displacement is checked.
+
+    The offsets of the pairs are always stored relative to the unshifted
+    positions (R) so the inputs can be used with the original shifts.
+
+    Examples:
+        >>> nl = RigidShiftNeighborList(structure=iface, cutoff=18.0, skin=2.0)
+        >>> shifts = nl.wrap_shifts(shifts)
+        >>> if nl.update(shifts):
+        ...     inputs = nl.inputs # The pairs were rebuilt
+
+    Args:
+        structure: Interface structure with an is_film site property
+        cutoff: Cutoff of the potential
+        skin: Minimum distance added to the cutoff when building the list
+
+    Attributes:
+        structure (Structure): Interface structure with an is_film site property
+        cutoff (float): Cutoff of the potential
+        skin (float): Minimum distance added to the cutoff when building the list
+        inputs (tp.Dict[str, np.ndarray]): Input dictionary of all pairs
+            within cutoff + max_displacement of the reference shift
+        reference_shift (np.ndarray): Film shift that the list was built at
+        max_displacement (float): Maximum displacement from the reference
+            shift before the list has to be rebuilt
+        n_builds (int): Number of times the list was built
+    """
+
+    def __init__(
+        self,
+        structure: Structure,
+        cutoff: float,
+        skin: float = 2.0,
+    ) -> None:
+        self.structure = structure
+        self.cutoff = cutoff
+        self.skin = skin
+        self.reference_shift = np.zeros(3)
+        self.max_displacement = skin
+        self.n_builds = 1
+
+        self.inputs = generate_input_dict(
+            structure=structure,
+            cutoff=cutoff + skin,
+        )
+        self._is_film = self.inputs["is_film"]
+
+        # Inverse of the in-plane lattice vectors used to wrap the shifts
+        self._inv_xy_matrix = np.linalg.inv(structure.lattice.matrix[:2, :2])
+
+    def wrap_shifts(self, shifts: np.ndarray) -> np.ndarray:
+        """
+        Wraps the in-plane components of the shifts to the periodic image
+        that is closest to the reference shift
+
+        Args:
+            shifts: (N, 3) array of cartesian film shifts
+
+        Returns:
+            (N, 3) array of equivalent cartesian film shifts
+        """
+        shifts = np.array(shifts, dtype=float).reshape(-1, 3)
+        xy_matrix = self.structure.lattice.matrix[:2, :2]
+
+        diff = shifts[:, :2] - self.reference_shift[:2]
+        frac_diff = diff.dot(self._inv_xy_matrix)
+        frac_diff -= np.round(frac_diff)
+        shifts[:, :2] = self.reference_shift[:2] + frac_diff.dot(xy_matrix)
+
+        return shifts
+
+    def update(self, shifts: np.ndarray) -> bool:
+        """
+        Rebuilds the neighbor list if any of the shifts are further than
+        max_displacement away from the reference shift.
+
+        Args:
+            shifts: (N, 3) array of cartesian film shifts
+
+        Returns:
+            True if the neighbor list was rebuilt
+        """
+        shifts = np.asarray(shifts).reshape(-1, 3)
+        displacements = np.linalg.norm(shifts - self.reference_shift, axis=1)
+
+        if displacements.max() <= self.max_displacement:
+            return False
+
+        # Center the new list on the batch and make sure the skin covers
+        # every shift in the batch
+        center = (shifts.min(axis=0) + shifts.max(axis=0)) / 2
+        batch_displacement = np.linalg.norm(shifts - center, axis=1).max()
+
+        self._build(
+            reference_shift=center,
+            skin=max(self.skin, batch_displacement),
+        )
+
+        return True
+
+    def _build(self, reference_shift: np.ndarray, skin: float) -> None:
+        R = self.inputs["R"]
+        shifted_R = R + (self._is_film[:, None] * reference_shift[None, :])
+        cell = self.structure.lattice.matrix
+
+        idx_i, idx_j, images = get_neighbor_list(
+            lattice_matrix=cell,
+            cart_coords=shifted_R,
+            pbc=self.structure.lattice.pbc,
+            cutoff=self.cutoff + skin,
+        )
+
+        # The image offsets do not depend on the shift so they are also
+        # valid for the unshifted positions
+        inputs = dict(self.inputs)
+        inputs["idx_i"] = idx_i
+        inputs["idx_j"] = idx_j
+        inputs["offsets"] = images.astype(float).dot(cell)
+
+        self.inputs = inputs
+        self.reference_shift = np.array(reference_shift, dtype=float)
+        self.max_displacement = skin
+        self.n_builds += 1
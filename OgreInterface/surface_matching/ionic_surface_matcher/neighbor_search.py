@@ -0,0 +1,212 @@
+import typing as tp
+import itertools
+
+import numpy as np
+
+
+def _get_plane_spacings(lattice_matrix: np.ndarray) -> np.ndarray:
+    # Distance between the lattice planes spanned by the other two lattice
+    # vectors, so skewed cells are also covered
+    volume = np.abs(np.linalg.det(lattice_matrix))
+    plane_spacings = np.zeros(3)
+    for k in range(3):
+        l, m = [i for i in range(3) if i != k]
+        plane_area = np.linalg.norm(
+            np.cross(lattice_matrix[l], lattice_matrix[m])
+        )
+        plane_spacings[k] = volume / plane_area
+
+    return plane_spacings
+
+
+def _get_ghost_atoms(
+    frac_coords: np.ndarray,
+    plane_spacings: np.ndarray,
+    pbc: np.ndarray,
+    cutoff: float,
+) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # The atoms within the cutoff of each periodic face are replicated one
+    # lattice direction at a time. The ghosts of the earlier directions are
+    # also replicated, so the edge and corner images are included.
+    n_atoms = len(frac_coords)
+    coords = frac_coords
+    atom_inds = np.arange(n_atoms, dtype=np.int32)
+    images = np.zeros((n_atoms, 3), dtype=np.int32)
+
+    for k in np.where(pbc)[0]:
+        width = cutoff / plane_spacings[k]
+        all_coords = [coords]
+        all_atom_inds = [atom_inds]
+        all_images = [images]
+
+        for t in range(1, int(np.ceil(width)) + 1):
+            for sign in [1, -1]:
+                if sign > 0:
+                    mask = coords[:, k] < 1.0 + width - t
+                else:
+                    mask = coords[:, k] >= t - width
+
+                ghost_coords = coords[mask]
+                ghost_coords[:, k] += sign * t
+                ghost_images = images[mask]
+                ghost_images[:, k] += sign * t
+
+                all_coords.append(ghost_coords)
+                all_atom_inds.append(atom_inds[mask])
+                all_images.append(ghost_images)
+
+        coords = np.vstack(all_coords)
+        atom_inds = np.concatenate(all_atom_inds)
+        images = np.vstack(all_images)
+
+    return coords, atom_inds, images
+
+
+def get_neighbor_list(
+    lattice_matrix: np.ndarray,
+    cart_coords: np.ndarray,
+    pbc: tp.Iterable[bool],
+    cutoff: float,
+    bins_per_cutoff: int = 3,
+) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Linked-cell neighbor search that works directly on the lattice matrix
+    and cartesian coordinates. Periodicity is set per lattice direction, so
+    slabs with pbc = (True, True, False) never search for images along the
+    surface normal.
+
+    The atoms are wrapped into the unit cell and only the atoms within the
+    cutoff of the periodic faces of the cell are replicated as ghost atoms.
+    The atoms and ghosts are binned into cubic cells with an edge length of
+    cutoff / bins_per_cutoff, and the distances are only calculated between
+    each atom and the points of the bins that can be within the cutoff. The
+    bins are processed one neighboring bin offset at a time, so the memory
+    of the search is set by the number of pairs it returns.
+
+    Args:
+        lattice_matrix: (3, 3) lattice matrix (lattice vectors as rows)
+        cart_coords: (N, 3) array of cartesian coordinates
+        pbc: Periodic boundary conditions along each lattice vector
+        cutoff: Cutoff radius of the neighbor search
+        bins_per_cutoff: Number of bins per cutoff length. Smaller bins
+            calculate fewer distances outside of the cutoff but have to
+            loop over more neighboring bins.
+
+    Returns:
+        idx_i, idx_j, and the (n_pairs, 3) integer lattice images of atom j
+        in the same format as the "ijS" output of matscipy's neighbour_list
+        (r_ij = R[j] - R[i] + images.dot(lattice_matrix)). The pairs are not
+        sorted.
+    """
+    lattice_matrix = np.asarray(lattice_matrix, dtype=float)
+    cart_coords = np.asarray(cart_coords, dtype=float).reshape(-1, 3)
+    pbc = np.asarray(pbc, dtype=bool)
+    n_atoms = len(cart_coords)
+
+    if n_atoms == 0:
+        empty = np.zeros(0, dtype=np.int32)
+        return empty, empty, np.zeros((0, 3), dtype=np.int32)
+
+    # Wrap the periodic directions and keep track of the wrapped image
+    frac_coords = cart_coords.dot(np.linalg.inv(lattice_matrix))
+    wrap_images = np.zeros((n_atoms, 3), dtype=np.int32)
+    wrap_images[:, pbc] = np.floor(frac_coords[:, pbc])
+    frac_coords = frac_coords - wrap_images
+
+    point_frac_coords, point_atom_inds, point_images = _get_ghost_atoms(
+        frac_coords=frac_coords,
+        plane_spacings=_get_plane_spacings(lattice_matrix),
+        pbc=pbc,
+        cutoff=cutoff,
+    )
+
+    # The first n_atoms points are the atoms in the unit cell
+    point_coords = point_frac_coords.dot(lattice_matrix)
+    point_coords -= point_coords.min(axis=0)
+    atom_coords = point_coords[:n_atoms]
+
+    # Bin all points. Only the occupied bins are stored (sorted bin ids), so
+    # the bins of the vacuum region of a slab do not take any memory.
+    bin_length = cutoff / bins_per_cutoff
+    point_bins = np.floor(point_coords / bin_length).astype(np.int64)
+    n_bins = point_bins.max(axis=0) + 1
+    point_bin_ids = (
+        point_bins[:, 0] * n_bins[1] + point_bins[:, 1]
+    ) * n_bins[2] + point_bins[:, 2]
+
+    sort_inds = np.argsort(point_bin_ids, kind="stable")
+    sorted_bin_ids = point_bin_ids[sort_inds]
+    sorted_coords = [
+        np.ascontiguousarray(point_coords[sort_inds, k]) for k in range(3)
+    ]
+    atom_bins = point_bins[:n_atoms]
+
+    cutoff2 = cutoff**2
+    pair_inds = [np.zeros(0, dtype=np.int32)]
+    pair_points = [np.zeros(0, dtype=np.int32)]
+
+    for offset in itertools.product(
+        range(-bins_per_cutoff, bins_per_cutoff + 1), repeat=3
+    ):
+        # Closest possible distance between the points of the two bins
+        gap = np.maximum(np.abs(offset) - 1, 0) * bin_length
+        if gap.dot(gap) >= cutoff2:
+            continue
+
+        neighbor_bins = atom_bins + offset
+        in_range = np.all(
+            (neighbor_bins >= 0) & (neighbor_bins < n_bins),
+            axis=1,
+        )
+        center_inds = np.where(in_range)[0]
+        neighbor_bins = neighbor_bins[in_range]
+        neighbor_bin_ids = (
+            neighbor_bins[:, 0] * n_bins[1] + neighbor_bins[:, 1]
+        ) * n_bins[2] + neighbor_bins[:, 2]
+
+        bin_starts = np.searchsorted(sorted_bin_ids, neighbor_bin_ids, "left")
+        bin_counts = (
+            np.searchsorted(sorted_bin_ids, neighbor_bin_ids, "right")
+            - bin_starts
+        )
+        n_candidates = bin_counts.sum()
+
+        if n_candidates == 0:
+            continue
+
+        # Sorted point index of every (atom, point in the neighboring bin)
+        candidate_starts = np.cumsum(bin_counts) - bin_counts
+        candidate_points = np.arange(n_candidates) + np.repeat(
+            bin_starts - candidate_starts, bin_counts
+        )
+
+        d2 = np.zeros(n_candidates)
+        for k in range(3):
+            dk = sorted_coords[k].take(candidate_points) - np.repeat(
+                atom_coords[center_inds, k], bin_counts
+            )
+            d2 += dk * dk
+
+        # Same convention as matscipy (d < cutoff). The only pairs at zero
+        # distance are the atoms with themselves
+        mask = (d2 < cutoff2) & (d2 > 0.0)
+        pair_inds.append(
+            np.repeat(center_inds.astype(np.int32), bin_counts)[mask]
+        )
+        pair_points.append(sort_inds[candidate_points[mask]].astype(np.int32))
+
+    # The pairs of each bin offset are released as soon as they are joined,
+    # so the peak memory stays close to the size of the output
+    idx_i = np.concatenate(pair_inds)
+    del pair_inds
+    points = np.concatenate(pair_points)
+    del pair_points
+    idx_j = point_atom_inds[points]
+    images = point_images[points]
+    del points
+
+    # Images relative to the unwrapped coordinates
+    if wrap_images.any():
+        images += wrap_images[idx_i] - wrap_images[idx_j]
+
+    return idx_i, idx_j, images
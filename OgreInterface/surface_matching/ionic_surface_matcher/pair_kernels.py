@@ -0,0 +1,227 @@
+import typing as tp
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _jit(func: tp.Callable) -> tp.Callable:
+    # Compile the kernels if numba is installed, otherwise they are left as
+    # plain python functions (IonicShiftedForcePotential then uses NumPy)
+    if HAS_NUMBA:
+        return njit(cache=True, nogil=True)(func)
+
+    return func
+
+
+@_jit
+def _dsf_constants(cutoff: float) -> tp.Tuple[float, float, float]:
+    alpha = 0.2
+    energy_shift = math.erfc(alpha * cutoff) / cutoff
+    force_shift = (math.erfc(alpha * cutoff) / cutoff**2) + (
+        (2 * alpha / math.sqrt(math.pi))
+        * (math.exp(-(alpha**2) * (cutoff**2)) / cutoff)
+    )
+
+    return alpha, energy_shift, force_shift
+
+
+@_jit
+def _shared_pair_energies(
+    r_ij: np.ndarray,
+    d_ij_sq: np.ndarray,
+    shift_sign: np.ndarray,
+    q_ij: np.ndarray,
+    n_ij: np.ndarray,
+    B_ij: np.ndarray,
+    shifts: np.ndarray,
+    cutoff: float,
+    y_dsf: np.ndarray,
+    y_born: np.ndarray,
+) -> None:
+    alpha, energy_shift, force_shift = _dsf_constants(cutoff)
+    cutoff_sq = cutoff**2
+
+    for m in range(shifts.shape[0]):
+        s_x = shifts[m, 0]
+        s_y = shifts[m, 1]
+        s_z = shifts[m, 2]
+        shift_sq = (s_x * s_x) + (s_y * s_y) + (s_z * s_z)
+
+        dsf = 0.0
+        born = 0.0
+
+        for p in range(r_ij.shape[0]):
+            s = shift_sign[p]
+            d_sq = d_ij_sq[p]
+
+            if s != 0.0:
+                r_dot_shift = (
+                    (r_ij[p, 0] * s_x)
+                    + (r_ij[p, 1] * s_y)
+                    + (r_ij[p, 2] * s_z)
+                )
+                d_sq += (2 * s * r_dot_shift) + (abs(s) * shift_sq)
+
+            if d_sq > cutoff_sq:
+                continue
+
+            d = math.sqrt(d_sq)
+
+            dsf += q_ij[p] * (
+                (math.erfc(alpha * d) / d)
+                - energy_shift
+                + (force_shift * (d - cutoff))
+            )
+            born += B_ij[p] * (d ** (-n_ij[p]) - cutoff ** (-n_ij[p]))
+
+        y_dsf[m] += dsf
+        y_born[m] += born
+
+
+@_jit
+def _pair_energies(
+    R: np.ndarray,
+    offsets: np.ndarray,
+    idx_i: np.ndarray,
+    idx_j: np.ndarray,
+    idx_m: np.ndarray,
+    q: np.ndarray,
+    ns: np.ndarray,
+    r0s: np.ndarray,
+    e_negs: np.ndarray,
+    cutoff: float,
+    y_dsf: np.ndarray,
+    y_born: np.ndarray,
+) -> None:
+    alpha, energy_shift, force_shift = _dsf_constants(cutoff)
+    cutoff_sq = cutoff**2
+
+    for p in range(idx_i.shape[0]):
+        i = idx_i[p]
+        j = idx_j[p]
+
+        r_x = R[j, 0] - R[i, 0] + offsets[p, 0]
+        r_y = R[j, 1] - R[i, 1] + offsets[p, 1]
+        r_z = R[j, 2] - R[i, 2] + offsets[p, 2]
+        d_sq = (r_x * r_x) + (r_y * r_y) + (r_z * r_z)
+
+        if d_sq > cutoff_sq:
+            continue
+
+        d = math.sqrt(d_sq)
+
+        # Same as IonicShiftedForcePotential._calc_pair_parameters
+        r0 = r0s[i] + r0s[j]
+        n = (ns[i] + ns[j]) / 2
+        q_ij = q[i] * q[j]
+
+        if q_ij == 0.0:
+            q_ij -= 0.5 + (abs(e_negs[i] - e_negs[j]) / (2 * 3.19))
+
+        B = -(
+            ((r0 ** (n + 1)) * abs(q_ij) / n)
+            * (
+                -(math.erfc(alpha * r0) / r0**2)
+                - (
+                    (2 * alpha / math.sqrt(math.pi))
+                    * (math.exp(-(alpha**2) * (r0**2)) / r0)
+                )
+                + force_shift
+            )
+        )
+
+        m = idx_m[i]
+        y_dsf[m] += q_ij * (
+            (math.erfc(alpha * d) / d)
+            - energy_shift
+            + (force_shift * (d - cutoff))
+        )
+        y_born[m] += B * (d ** (-n) - cutoff ** (-n))
+
+
+def fused_shared_pair_energies(
+    pair_parameters: tp.Dict[str, np.ndarray],
+    shifts: np.ndarray,
+    cutoff: float,
+    pair_slice: slice = slice(None),
+) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """
+    Sums the DSF (q_ij * DSF(r_ij)) and Born energies of a shared topology
+    batch (see IonicShiftedForcePotential.get_pair_parameters) in a single
+    pass over the pair list for each shift.
+
+    Args:
+        pair_parameters: Pair parameters from get_pair_parameters
+        shifts: (batch_size, 3) array of cartesian film shifts
+        cutoff: Cutoff of the potential
+        pair_slice: Slice of the pair list that is evaluated
+
+    Returns:
+        The summed DSF and Born pair energies of each shift
+    """
+    shifts = np.ascontiguousarray(shifts, dtype=np.float64).reshape(-1, 3)
+    y_dsf = np.zeros(len(shifts))
+    y_born = np.zeros(len(shifts))
+
+    pair_arrays = [
+        np.ascontiguousarray(pair_parameters[k][pair_slice], dtype=np.float64)
+        for k in ["r_ij", "d_ij_sq", "shift_sign", "q_ij", "n_ij", "B_ij"]
+    ]
+
+    _shared_pair_energies(
+        *pair_arrays,
+        shifts,
+        float(cutoff),
+        y_dsf,
+        y_born,
+    )
+
+    return y_dsf, y_born
+
+
+def fused_pair_energies(
+    inputs: tp.Dict[str, np.ndarray],
+    cutoff: float,
+    pair_slice: slice = slice(None),
+) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """
+    Sums the DSF (q_ij * DSF(r_ij)) and Born energies of each structure in a
+    batch (see create_batch) in a single pass over the pair list. The pair
+    parameters are calculated on the fly.
+
+    Args:
+        inputs: Batch input dictionary
+        cutoff: Cutoff of the potential
+        pair_slice: Slice of the pair list that is evaluated
+
+    Returns:
+        The summed DSF and Born pair energies of each structure
+    """
+    idx_m = inputs["idx_m"].astype(np.int64)
+    n_molecules = int(idx_m[-1]) + 1
+    y_dsf = np.zeros(n_molecules)
+    y_born = np.zeros(n_molecules)
+
+    _pair_energies(
+        np.ascontiguousarray(inputs["R"], dtype=np.float64),
+        np.ascontiguousarray(inputs["offsets"][pair_slice], dtype=np.float64),
+        np.ascontiguousarray(inputs["idx_i"][pair_slice], dtype=np.int64),
+        np.ascontiguousarray(inputs["idx_j"][pair_slice], dtype=np.int64),
+        idx_m,
+        inputs["partial_charges"].astype(np.float64),
+        inputs["born_ns"].astype(np.float64),
+        inputs["r0s"].astype(np.float64),
+        inputs["e_negs"].astype(np.float64),
+        float(cutoff),
+        y_dsf,
+        y_born,
+    )
+
+    return y_dsf, y_born
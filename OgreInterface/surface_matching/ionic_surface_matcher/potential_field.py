@@ -0,0 +1,364 @@
+import typing as tp
+
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.ndimage import map_coordinates, spline_filter1d
+
+
+class SubstratePotentialField:
+    """Tabulated potential of the substrate for rigid shifts of the film
+
+    Since the substrate is fixed and the film only translates rigidly, the
+    film-substrate part of the IonicShiftedForcePotential energy is a sum of
+    the potential field of the substrate evaluated at each film atom. The DSF
+    Coulomb and Born fields of the substrate are tabulated once on a 3D grid
+    for each unique type of film atom (unique charge, born n, r0 and
+    electronegativity) and interpolated with cubic B-splines. The grid is
+    periodic in-plane and covers the z-range of the film atoms for the given
+    range of z-shifts, so each shift only costs one interpolation per film
+    atom instead of a sum over all film-substrate pairs.
+
+    Examples:
+        >>> potential = IonicShiftedForcePotential(cutoff=18.0)
+        >>> field = SubstratePotentialField(
+        ...     inputs=inputs, # From generate_input_dict()
+        ...     potential=potential,
+        ...     z_shift_range=[-1.0, 2.0],
+        ...     grid_spacing=0.25,
+        ... )
+        >>> dsf_energies, born_energies = field.interpolate(shifts=shifts)
+
+    Args:
+        inputs: Input dictionary of the interface generated by
+            generate_input_dict (needs the is_film key)
+        potential: IonicShiftedForcePotential used to calculate the pair terms
+        z_shift_range: [min, max] shift of the film in the z-direction
+        grid_spacing: Spacing of the grid points in Angstroms
+
+    Attributes:
+        z_shift_range (np.ndarray): [min, max] shift of the film in the
+            z-direction that is covered by the grid
+        grid_spacing (float): Requested spacing of the grid points
+        grid_shape (tp.Tuple[int, int, int]): Number of grid points along the
+            a, b, and z directions
+        dsf_self (float): Total DSF self energy of the interface
+    """
+
+    # Number of extra grid points on each side of the z-range so the spline
+    # is never evaluated at the edges of the grid
+    _z_padding = 3
+
+    # Number of grid points per chunk when tabulating the field
+    _chunk_size = 2048
+
+    # The Born field is positive and close to a power law of the distance to
+    # the nearest substrate atom, so it is interpolated as log(field + floor)
+    _born_floor = 1e-8
+
+    def __init__(
+        self,
+        inputs: tp.Dict[str, np.ndarray],
+        potential,
+        z_shift_range: tp.Sequence[float],
+        grid_spacing: float = 0.25,
+    ) -> None:
+        self.z_shift_range = np.array(z_shift_range, dtype=float)
+        self.grid_spacing = grid_spacing
+        self._potential = potential
+        self._cutoff = float(potential.cutoff)
+
+        is_film = inputs["is_film"]
+        R = inputs["R"].astype(np.float64)
+        matrix = inputs["cell"].reshape(3, 3).astype(np.float64)
+
+        self._xy_matrix = matrix[:2, :2]
+        self._inv_xy_matrix = np.linalg.inv(self._xy_matrix)
+
+        # Group the film atoms by the parameters that enter the pair terms
+        film_params = np.c_[
+            inputs["partial_charges"],
+            inputs["born_ns"],
+            inputs["r0s"],
+            inputs["e_negs"],
+        ][is_film]
+        type_params, film_types = np.unique(
+            film_params,
+            axis=0,
+            return_inverse=True,
+        )
+        film_types = film_types.reshape(-1)
+
+        film_R = R[is_film]
+        sub_R = R[~is_film]
+
+        self._film_R_by_type = [
+            film_R[film_types == i] for i in range(len(type_params))
+        ]
+
+        # Setup the grid in fractional in-plane and cartesian z coordinates
+        a_norm = np.linalg.norm(matrix[0])
+        b_norm = np.linalg.norm(matrix[1])
+        n_a = max(int(np.ceil(a_norm / grid_spacing)), 4)
+        n_b = max(int(np.ceil(b_norm / grid_spacing)), 4)
+
+        # The field is zero further than the cutoff away from the substrate
+        self._z_max_field = sub_R[:, -1].max() + self._cutoff
+        z_min = film_R[:, -1].min() + self.z_shift_range[0]
+        z_max = film_R[:, -1].max() + self.z_shift_range[1]
+        z_max = max(min(z_max, self._z_max_field), z_min)
+
+        n_z = int(np.ceil((z_max - z_min) / grid_spacing)) + 1
+        n_z += 2 * self._z_padding
+        self._dz = grid_spacing
+        self._z0 = z_min - (self._z_padding * grid_spacing)
+
+        self.grid_shape = (n_a, n_b, n_z)
+
+        frac_a = np.arange(n_a) / n_a
+        frac_b = np.arange(n_b) / n_b
+        grid_z = self._z0 + (np.arange(n_z) * self._dz)
+
+        A, B, Z = np.meshgrid(frac_a, frac_b, grid_z, indexing="ij")
+        grid_xy = np.c_[A.ravel(), B.ravel()].dot(self._xy_matrix)
+        grid_points = np.c_[grid_xy, Z.ravel()]
+
+        sub_images = self._get_substrate_images(
+            sub_R=sub_R,
+            matrix=matrix,
+        )
+
+        # Pair parameters between each film type and substrate atom
+        n_types = len(type_params)
+        n_sub = len(sub_R)
+        param_inputs = {
+            "partial_charges": np.r_[
+                type_params[:, 0], inputs["partial_charges"][~is_film]
+            ],
+            "born_ns": np.r_[type_params[:, 1], inputs["born_ns"][~is_film]],
+            "r0s": np.r_[type_params[:, 2], inputs["r0s"][~is_film]],
+            "e_negs": np.r_[type_params[:, 3], inputs["e_negs"][~is_film]],
+        }
+        type_idx, sub_idx = np.meshgrid(
+            np.arange(n_types),
+            np.arange(n_sub),
+            indexing="ij",
+        )
+        n_ts, q_ts, B_ts = potential._calc_pair_parameters(
+            inputs=param_inputs,
+            idx_i=type_idx.ravel(),
+            idx_j=n_types + sub_idx.ravel(),
+        )
+        min_d_ts = 0.2 * (
+            param_inputs["r0s"][type_idx]
+            + param_inputs["r0s"][n_types + sub_idx]
+        )
+        n_ts = n_ts.reshape(n_types, n_sub)
+        q_ts = q_ts.reshape(n_types, n_sub)
+        B_ts = B_ts.reshape(n_types, n_sub)
+
+        dsf_fields, born_fields = self._tabulate(
+            grid_points=grid_points,
+            sub_images=sub_images,
+            n_sub=n_sub,
+            min_d_ts=min_d_ts,
+            n_ts=n_ts,
+            q_ts=q_ts,
+            B_ts=B_ts,
+        )
+
+        self._dsf_coeffs = [
+            self._get_spline_coefficients(f.reshape(self.grid_shape))
+            for f in dsf_fields
+        ]
+        self._born_coeffs = [
+            self._get_spline_coefficients(
+                np.log(np.maximum(f, 0.0) + self._born_floor).reshape(
+                    self.grid_shape
+                )
+            )
+            for f in born_fields
+        ]
+
+        _, dsf_self = potential._damped_shifted_force(
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+            inputs["partial_charges"],
+        )
+        self.dsf_self = dsf_self.sum()
+
+    def contains(self, shifts: np.ndarray) -> bool:
+        """
+        Determines if the z-shifts are inside the range covered by the grid
+        """
+        z_shifts = np.asarray(shifts).reshape(-1, 3)[:, -1]
+        tol = 1e-8
+
+        return bool(
+            (z_shifts.min() >= self.z_shift_range[0] - tol)
+            and (z_shifts.max() <= self.z_shift_range[1] + tol)
+        )
+
+    def interpolate(
+        self,
+        shifts: np.ndarray,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+        Interpolates the DSF and Born fields of the substrate at the shifted
+        film atoms.
+
+        Args:
+            shifts: (N, 3) array of cartesian film shifts
+
+        Returns:
+            Sum of the DSF energies (q_ij * DSF(r_ij)) and Born energies over
+            all film-substrate pairs (each pair counted once) for each shift
+        """
+        shifts = np.asarray(shifts, dtype=np.float64).reshape(-1, 3)
+        n_shifts = len(shifts)
+        n_a, n_b, _ = self.grid_shape
+
+        dsf_energies = np.zeros(n_shifts)
+        born_energies = np.zeros(n_shifts)
+
+        for film_R, dsf_coeffs, born_coeffs in zip(
+            self._film_R_by_type,
+            self._dsf_coeffs,
+            self._born_coeffs,
+        ):
+            positions = film_R[None, :, :] + shifts[:, None, :]
+            positions = positions.reshape(-1, 3)
+
+            frac_xy = positions[:, :2].dot(self._inv_xy_matrix)
+            frac_xy = np.mod(frac_xy, 1.0)
+
+            coords = np.vstack(
+                [
+                    frac_xy[:, 0] * n_a,
+                    frac_xy[:, 1] * n_b,
+                    (positions[:, -1] - self._z0) / self._dz,
+                ]
+            )
+
+            # Film atoms further than the cutoff away from the substrate
+            # do not contribute
+            in_range = positions[:, -1] <= self._z_max_field
+
+            dsf = map_coordinates(
+                dsf_coeffs,
+                coords,
+                order=3,
+                mode="grid-wrap",
+                prefilter=False,
+            )
+            log_born = map_coordinates(
+                born_coeffs,
+                coords,
+                order=3,
+                mode="grid-wrap",
+                prefilter=False,
+            )
+            born = np.exp(log_born) - self._born_floor
+
+            dsf = np.where(in_range, dsf, 0.0).reshape(n_shifts, -1)
+            born = np.where(in_range, born, 0.0).reshape(n_shifts, -1)
+
+            dsf_energies += dsf.sum(axis=1)
+            born_energies += born.sum(axis=1)
+
+        return dsf_energies, born_energies
+
+    def _get_substrate_images(
+        self,
+        sub_R: np.ndarray,
+        matrix: np.ndarray,
+    ) -> np.ndarray:
+        # In-plane periodic images of the substrate atoms that are within
+        # the cutoff of any grid point
+        area = np.linalg.norm(np.cross(matrix[0], matrix[1]))
+        height_a = area / np.linalg.norm(matrix[1])
+        height_b = area / np.linalg.norm(matrix[0])
+        n_img_a = int(np.ceil(self._cutoff / height_a)) + 1
+        n_img_b = int(np.ceil(self._cutoff / height_b)) + 1
+
+        image_a, image_b = np.meshgrid(
+            np.arange(-n_img_a, n_img_a + 1),
+            np.arange(-n_img_b, n_img_b + 1),
+            indexing="ij",
+        )
+        image_shifts = np.c_[image_a.ravel(), image_b.ravel()].dot(
+            matrix[:2]
+        )
+
+        # Ordered as (image, atom) so image_index % n_sub is the atom index
+        sub_images = image_shifts[:, None, :] + sub_R[None, :, :]
+
+        return sub_images.reshape(-1, 3)
+
+    def _tabulate(
+        self,
+        grid_points: np.ndarray,
+        sub_images: np.ndarray,
+        n_sub: int,
+        min_d_ts: np.ndarray,
+        n_ts: np.ndarray,
+        q_ts: np.ndarray,
+        B_ts: np.ndarray,
+    ) -> tp.Tuple[tp.List[np.ndarray], tp.List[np.ndarray]]:
+        n_types = len(n_ts)
+        n_grid = len(grid_points)
+        image_tree = cKDTree(sub_images)
+
+        dsf_fields = [np.zeros(n_grid) for _ in range(n_types)]
+        born_fields = [np.zeros(n_grid) for _ in range(n_types)]
+
+        for start in range(0, n_grid, self._chunk_size):
+            end = min(start + self._chunk_size, n_grid)
+            grid_tree = cKDTree(grid_points[start:end])
+            pairs = grid_tree.sparse_distance_matrix(
+                image_tree,
+                max_distance=self._cutoff,
+                output_type="ndarray",
+            )
+
+            grid_idx = pairs["i"]
+            sub_idx = pairs["j"] % n_sub
+            d_ij = pairs["v"]
+
+            for t in range(n_types):
+                # Distances shorter than a fifth of a bond length are never
+                # reached by a physical configuration, so they are clamped to
+                # keep the field (and the spline) finite around the substrate
+                # atoms
+                d_t = np.maximum(d_ij, min_d_ts[t, sub_idx])
+
+                dsf, _ = self._potential._damped_shifted_force(
+                    d_t,
+                    q_ts[t, sub_idx],
+                    np.zeros(0),
+                )
+                born = self._potential._born(
+                    d_t,
+                    n_ts[t, sub_idx],
+                    B_ts[t, sub_idx],
+                )
+
+                dsf_fields[t][start:end] += np.bincount(
+                    grid_idx,
+                    weights=dsf,
+                    minlength=end - start,
+                )
+                born_fields[t][start:end] += np.bincount(
+                    grid_idx,
+                    weights=born,
+                    minlength=end - start,
+                )
+
+        return dsf_fields, born_fields
+
+    def _get_spline_coefficients(self, field: np.ndarray) -> np.ndarray:
+        # Periodic in-plane and non-periodic along z
+        coeffs = spline_filter1d(field, order=3, axis=0, mode="grid-wrap")
+        coeffs = spline_filter1d(coeffs, order=3, axis=1, mode="grid-wrap")
+        coeffs = spline_filter1d(coeffs, order=3, axis=2, mode="mirror")
+
+        return coeffs
@@ -0,0 +1,319 @@
+"""
+Streaming export of the shifted interface structures of a PES scan to a
+single compressed multi-frame extxyz archive.
+
+Every frame is written as its own gzip member, so the archive is a normal
+gzip file that can be read with ase.io.read("PES.extxyz.gz", index=":"),
+and the byte offsets stored in the JSON index can be used to read a single
+frame without decompressing the frames before it.
+"""
+import typing as tp
+import os
+import gzip
+import json
+from io import StringIO
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from pymatgen.core.structure import Structure
+from pymatgen.io.ase import AseAtomsAdaptor
+from ase.io import read
+import numpy as np
+
+from OgreInterface.array_structure import ArrayStructure
+from OgreInterface import utils
+
+# Version of the index format
+ARCHIVE_FORMAT_VERSION = 1
+
+
+def get_archive_index_path(archive: str) -> str:
+    """
+    Path of the JSON index that belongs to an archive
+
+    Args:
+        archive: File path of the archive
+
+    Returns:
+        File path of the index
+    """
+    return archive + ".index.json"
+
+
+def _get_species_symbols(arrays: ArrayStructure) -> np.ndarray:
+    unique_symbols = {}
+    for s in arrays.species:
+        if s not in unique_symbols:
+            unique_symbols[s] = s.symbol
+
+    return np.array([unique_symbols[s] for s in arrays.species])
+
+
+def _get_site_labels(arrays: ArrayStructure) -> np.ndarray:
+    # Same labels as the coordinate lines of a pymatgen Poscar
+    # (i.e. H0.75+ for the pseudo hydrogens)
+    unique_labels = {}
+    for s in arrays.species:
+        if s not in unique_labels:
+            unique_labels[s] = str(s)
+
+    return np.array([unique_labels[s] for s in arrays.species])
+
+
+def _get_poscar_species_groups(
+    symbols: np.ndarray,
+) -> tp.Tuple[tp.List[str], tp.List[int]]:
+    # Same layout as a pymatgen Poscar (consecutive species are grouped)
+    group_starts = np.r_[0, np.where(symbols[1:] != symbols[:-1])[0] + 1]
+    group_counts = np.diff(np.r_[group_starts, len(symbols)])
+
+    return symbols[group_starts].tolist(), group_counts.tolist()
+
+
+def _format_extxyz_frame(
+    symbols: np.ndarray,
+    lattice_matrix: np.ndarray,
+    cart_coords: np.ndarray,
+    pbc: tp.Tuple[bool, bool, bool],
+    info: tp.Dict[str, tp.Any],
+) -> str:
+    lattice_str = " ".join(f"{x:.10f}" for x in lattice_matrix.ravel())
+    pbc_str = " ".join("T" if p else "F" for p in pbc)
+    info_str = " ".join(
+        f'{k}="{v}"' if isinstance(v, str) else f"{k}={v}"
+        for k, v in info.items()
+    )
+    header = (
+        f'Lattice="{lattice_str}" Properties=species:S:1:pos:R:3 '
+        f'pbc="{pbc_str}" {info_str}'
+    )
+    lines = [
+        f"{s} {x:.10f} {y:.10f} {z:.10f}"
+        for s, (x, y, z) in zip(symbols, cart_coords)
+    ]
+
+    return "\n".join([str(len(symbols)), header] + lines) + "\n"
+
+
+def _write_poscar(
+    output: str,
+    comment: str,
+    group_symbols: tp.List[str],
+    group_counts: tp.List[int],
+    site_labels: np.ndarray,
+    lattice_matrix: np.ndarray,
+    frac_coords: np.ndarray,
+) -> None:
+    lines = [comment, "1.0"]
+    lines.extend(
+        " ".join(f"{x:.16f}" for x in vector) for vector in lattice_matrix
+    )
+    lines.append(" ".join(group_symbols))
+    lines.append(" ".join(str(n) for n in group_counts))
+    lines.append("direct")
+    lines.extend(
+        f"{x:.16f} {y:.16f} {z:.16f} {s}"
+        for s, (x, y, z) in zip(site_labels, frac_coords)
+    )
+
+    with open(output, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_shifted_film_archive(
+    structure: tp.Union[Structure, ArrayStructure],
+    frac_shifts: np.ndarray,
+    archive: str,
+    comments: tp.Optional[tp.Sequence[str]] = None,
+    poscar_folder: tp.Optional[str] = None,
+    n_writers: int = 1,
+    compresslevel: int = 6,
+    passivated: bool = False,
+) -> tp.Dict[str, tp.Any]:
+    """
+    Writes the interface structure with the film shifted by each of the
+    fractional shifts as one frame of a gzip compressed extxyz archive.
+
+    The shifted coordinates of each frame are generated from the arrays of
+    the unshifted structure (only the film rows are changed), so no
+    intermediate Structures are built, and the frames are streamed to disk
+    one at a time. A JSON index with the byte offset, compressed length and
+    shift of each frame is written next to the archive (see
+    get_archive_index_path).
+
+    Examples:
+        >>> write_shifted_film_archive(
+        ...     structure=interface.get_interface(orthogonal=True),
+        ...     frac_shifts=[[0.0, 0.0, 0.0], [0.5, 0.0, 0.0]],
+        ...     archive="PES.extxyz.gz",
+        ... )
+
+    Args:
+        structure: Interface structure with an is_film site property
+        frac_shifts: (N, 3) array of fractional shifts of the film
+        archive: File path of the archive
+        comments: Comment of each frame, it is stored in the extxyz header
+            and used as the POSCAR comment
+        poscar_folder: If given, a POSCAR_XXXX file of each frame is also
+            written to this folder by a background pool of writers
+        n_writers: Number of background POSCAR writers
+        compresslevel: gzip compression level of the frames
+        passivated: Determines if the structure has pseudo hydrogens. Their
+            POSCAR groups and the |potcar= tag of the comments are then
+            the same as in Interface.write_file
+
+    Returns:
+        Index of the archive
+    """
+    if isinstance(structure, Structure):
+        base_arrays = ArrayStructure.from_structure(structure)
+    else:
+        base_arrays = structure
+
+    frac_shifts = np.asarray(frac_shifts, dtype=float).reshape(-1, 3)
+
+    if comments is not None and len(comments) != len(frac_shifts):
+        raise ValueError(
+            f"The number of comments ({len(comments)}) does not match the number of shifts ({len(frac_shifts)})"
+        )
+
+    is_film = base_arrays.get_mask("is_film")
+    film_frac_coords = base_arrays.frac_coords[is_film]
+    periodic = np.array(base_arrays.pbc)
+    lattice_matrix = base_arrays.lattice_matrix
+    symbols = _get_species_symbols(base_arrays)
+    site_labels = _get_site_labels(base_arrays)
+
+    if passivated:
+        (
+            potcar_symbols,
+            group_symbols,
+            group_counts,
+        ) = utils.get_passivated_poscar_species(base_arrays.species)
+        potcar_str = "|potcar=" + " ".join(potcar_symbols)
+    else:
+        group_symbols, group_counts = _get_poscar_species_groups(symbols)
+        potcar_str = ""
+
+    if poscar_folder is not None:
+        if not os.path.isdir(poscar_folder):
+            os.mkdir(poscar_folder)
+
+        executor = ThreadPoolExecutor(max_workers=max(n_writers, 1))
+    else:
+        executor = None
+
+    # The number of pending POSCAR writes is bounded so the coordinates of
+    # all frames are never held in memory at once
+    pending: tp.Deque[Future] = deque()
+    max_pending = 4 * max(n_writers, 1)
+
+    index = {
+        "version": ARCHIVE_FORMAT_VERSION,
+        "format": "extxyz",
+        "compression": "gzip",
+        "n_atoms": len(base_arrays),
+        "frames": [],
+    }
+
+    frac_coords = base_arrays.frac_coords.copy()
+
+    try:
+        with open(archive, "wb") as f:
+            for i, frac_shift in enumerate(frac_shifts):
+                shifted_film_coords = film_frac_coords + frac_shift
+                shifted_film_coords[:, periodic] = np.mod(
+                    shifted_film_coords[:, periodic], 1.0
+                )
+                frac_coords[is_film] = shifted_film_coords
+
+                comment = "" if comments is None else comments[i]
+                comment += potcar_str
+                info = {"frame": i}
+                info.update(
+                    {
+                        f"{k}_shift": float(s)
+                        for k, s in zip("abc", frac_shift)
+                    }
+                )
+                info["comment"] = comment
+
+                frame_bytes = gzip.compress(
+                    _format_extxyz_frame(
+                        symbols=symbols,
+                        lattice_matrix=lattice_matrix,
+                        cart_coords=frac_coords.dot(lattice_matrix),
+                        pbc=base_arrays.pbc,
+                        info=info,
+                    ).encode(),
+                    compresslevel=compresslevel,
+                )
+
+                index["frames"].append(
+                    {
+                        "offset": f.tell(),
+                        "length": len(frame_bytes),
+                        "frac_shift": frac_shift.tolist(),
+                    }
+                )
+                f.write(frame_bytes)
+
+                if executor is not None:
+                    if len(pending) >= max_pending:
+                        pending.popleft().result()
+
+                    pending.append(
+                        executor.submit(
+                            _write_poscar,
+                            output=os.path.join(
+                                poscar_folder, f"POSCAR_{i:04d}"
+                            ),
+                            comment=comment,
+                            group_symbols=group_symbols,
+                            group_counts=group_counts,
+                            site_labels=site_labels,
+                            lattice_matrix=lattice_matrix,
+                            frac_coords=frac_coords.copy(),
+                        )
+                    )
+
+        with open(get_archive_index_path(archive), "w") as f:
+            json.dump(index, f)
+
+        # Raise any errors of the POSCAR writers
+        while pending:
+            pending.popleft().result()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    return index
+
+
+def read_archive_frame(archive: str, frame: int) -> Structure:
+    """
+    Reads a single frame of an archive written by write_shifted_film_archive
+    using the byte offsets of its index
+
+    Args:
+        archive: File path of the archive
+        frame: Index of the frame
+
+    Returns:
+        Pymatgen Structure of the frame
+    """
+    with open(get_archive_index_path(archive), "r") as f:
+        index = json.load(f)
+
+    frame_index = index["frames"][frame]
+
+    with open(archive, "rb") as f:
+        f.seek(frame_index["offset"])
+        frame_bytes = f.read(frame_index["length"])
+
+    atoms = read(
+        StringIO(gzip.decompress(frame_bytes).decode()),
+        format="extxyz",
+    )
+
+    return AseAtomsAdaptor().get_structure(atoms)
@@ -1,4 +1,8 @@
-from OgreInterface.surfaces.oriented_bulk import OrientedBulk
+from OgreInterface.surfaces.oriented_bulk import (
+    OrientedBulk,
+    get_oriented_bulk,
+    set_oriented_bulk_cache,
+)
 from OgreInterface.surfaces.base_surface import BaseSurface
 from OgreInterface.surfaces.surface import Surface
 from OgreInterface.surfaces.molecular_surface import MolecularSurface
@@ -10,12 +10,16 @@ from pymatgen.core.structure import Structure
 from pymatgen.core.sites import PeriodicSite
 from pymatgen.core.operations import SymmOp
 import numpy as np
-import spglib
 
 from OgreInterface import utils
+from OgreInterface.disk_cache import DiskCache, get_hash, get_structure_hash
 
 SelfOrientedBulk = tp.TypeVar("SelfOrientedBulk", bound="OrientedBulk")
 
+# Process-wide on-disk cache of oriented bulk structures used by
+# get_oriented_bulk(). This is disabled until set_oriented_bulk_cache() is called
+_oriented_bulk_cache: tp.Optional[DiskCache] = None
+
 
 class OrientedBulk(Sequence):
     def __init__(
@@ -82,6 +86,76 @@ class OrientedBulk(Sequence):
     def __getitem__(self, i) -> PeriodicSite:
         return self._oriented_bulk_structure[i]
 
+    def as_dict(self) -> tp.Dict[str, tp.Any]:
+        """
+        Returns a monty json serializable dictionary of everything that is
+        calculated when the OrientedBulk is constructed. The input bulk
+        structure is not included and has to be passed to from_dict().
+        """
+        dataset = self._symmetry_dataset
+
+        return {
+            "is_hexagonal": bool(self._is_hexagonal),
+            "init_miller_index": np.array(self._init_miller_index),
+            "make_planar": bool(self._make_planar),
+            "prim_bulk": self._prim_bulk,
+            "symmetry_dataset": {
+                "wyckoffs": list(dataset["wyckoffs"]),
+                "equivalent_atoms": np.array(dataset["equivalent_atoms"]),
+                "mapping_to_primitive": np.array(
+                    dataset["mapping_to_primitive"]
+                ),
+            },
+            "surface_normal": self._surface_normal,
+            "unit_surface_normal": self._unit_surface_normal,
+            "bulk_is_init_bulk": self.bulk is self._init_bulk,
+            "bulk": None if self.bulk is self._init_bulk else self.bulk,
+            "miller_index": np.array(self.miller_index),
+            "transformation_matrix": self._transformation_matrix,
+            "oriented_bulk_structure": self._oriented_bulk_structure,
+            "crystallographic_basis": self._crystallographic_basis,
+        }
+
+    @classmethod
+    def from_dict(
+        cls,
+        d: tp.Dict[str, tp.Any],
+        bulk: Structure,
+    ) -> SelfOrientedBulk:
+        """
+        Rebuilds an OrientedBulk from the output of as_dict() without
+        rerunning the symmetry analysis and the in-plane vector search.
+
+        Args:
+            d: Dictionary created by as_dict()
+            bulk: Input bulk structure the OrientedBulk was created from
+        """
+        obs = cls.__new__(cls)
+        obs._is_hexagonal = d["is_hexagonal"]
+        obs._init_miller_index = np.array(d["init_miller_index"])
+        obs._make_planar = d["make_planar"]
+        obs._init_bulk = bulk
+        obs._prim_bulk = d["prim_bulk"]
+        obs._symmetry_dataset = d["symmetry_dataset"]
+
+        # The constructor adds the symmetry info to the input bulk structure
+        obs._add_symmetry_info(structure=obs._init_bulk, is_primitive=False)
+
+        obs._surface_normal = np.array(d["surface_normal"])
+        obs._unit_surface_normal = np.array(d["unit_surface_normal"])
+
+        if d["bulk_is_init_bulk"]:
+            obs.bulk = obs._init_bulk
+        else:
+            obs.bulk = d["bulk"]
+
+        obs.miller_index = np.array(d["miller_index"])
+        obs._transformation_matrix = np.array(d["transformation_matrix"])
+        obs._oriented_bulk_structure = d["oriented_bulk_structure"]
+        obs._crystallographic_basis = np.array(d["crystallographic_basis"])
+
+        return obs
+
     def __len__(self) -> int:
         return len(self._oriented_bulk_structure)
 
@@ -213,12 +287,7 @@ class OrientedBulk(Sequence):
     def _get_symmetry_dataset(
         self,
     ) -> tp.Dict[str, np.ndarray]:
-        lattice = self._init_bulk.lattice.matrix
-        positions = self._init_bulk.frac_coords
-        numbers = np.array(self._init_bulk.atomic_numbers)
-        cell = (lattice, positions, numbers)
-
-        dataset = spglib.get_symmetry_dataset(cell)
+        dataset = utils.get_symmetry_dataset(self._init_bulk)
 
         return dataset
 
@@ -547,6 +616,80 @@ class OrientedBulk(Sequence):
         return obs, crystallographic_basis
 
 
+def set_oriented_bulk_cache(
+    cache_dir: tp.Optional[str],
+    max_size: float = 1024.0,
+) -> None:
+    """
+    Enables a persistent on-disk cache for get_oriented_bulk(). This is used by
+    the MillerSearch, the surface generators and the interface searches so the
+    same bulk and miller index are only oriented once. Worker processes
+    created with the "spawn" start method have to call this again.
+
+    Args:
+        cache_dir: Directory of the cache. If None the cache is disabled.
+        max_size: Maximum size of the cache in MB. The least recently used
+            entries are removed when the cache gets larger than this.
+    """
+    global _oriented_bulk_cache
+
+    if cache_dir is None:
+        _oriented_bulk_cache = None
+    else:
+        _oriented_bulk_cache = DiskCache(
+            cache_dir=cache_dir,
+            max_size=max_size,
+        )
+
+
+def get_oriented_bulk(
+    bulk: Structure,
+    miller_index: tp.List[int],
+    make_planar: bool = True,
+) -> OrientedBulk:
+    """
+    Creates an OrientedBulk or loads it from the cache set by
+    set_oriented_bulk_cache(). Cache entries are keyed by a canonical hash of
+    the bulk structure, the miller index and make_planar.
+
+    Args:
+        bulk: Bulk structure (usually the refined structure from utils.load_bulk)
+        miller_index: Miller index of the surface
+        make_planar: Determines is the OBS should be oriented to the inplane
+            vectors are in the xy cartesian plane
+
+    Returns:
+        OrientedBulk
+    """
+    if _oriented_bulk_cache is None:
+        return OrientedBulk(
+            bulk=bulk,
+            miller_index=miller_index,
+            make_planar=make_planar,
+        )
+
+    key = get_hash(
+        "OrientedBulk",
+        get_structure_hash(bulk),
+        [int(i) for i in miller_index],
+        bool(make_planar),
+    )
+
+    cached_obs = _oriented_bulk_cache.get(key)
+
+    if cached_obs is not None:
+        return OrientedBulk.from_dict(cached_obs, bulk=bulk)
+
+    obs = OrientedBulk(
+        bulk=bulk,
+        miller_index=miller_index,
+        make_planar=make_planar,
+    )
+    _oriented_bulk_cache.set(key, obs.as_dict())
+
+    return obs
+
+
 if __name__ == "__main__":
     bulk = Structure.from_file(
         "../../../ogre-stuff/ita/workflow_tests/cifs/InAs.cif"
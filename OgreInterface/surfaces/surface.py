@@ -2,7 +2,6 @@
 This module will be used to construct the surfaces and interfaces used in this package.
 """
 from typing import Dict, Union, Iterable, List, Tuple, TypeVar
-import itertools
 import warnings
 
 from pymatgen.core.structure import Structure
@@ -189,40 +188,11 @@ class Surface(BaseSurface):
             else:
                 selective_dynamics = None
 
-            syms = [site.specie.symbol for site in slab]
-
-            syms = []
-            for site in slab:
-                if site.specie.symbol == "H":
-                    if hasattr(site.specie, "oxi_state"):
-                        oxi = site.specie.oxi_state
-
-                        if oxi < 1.0 and oxi != 0.5:
-                            H_str = "H" + f"{oxi:.2f}"[1:]
-                        elif oxi == 0.5:
-                            H_str = "H.5"
-                        elif oxi > 1.0 and oxi != 1.5:
-                            H_str = "H" + f"{oxi:.2f}"
-                        elif oxi == 1.5:
-                            H_str = "H1.5"
-                        else:
-                            H_str = "H"
-
-                        syms.append(H_str)
-                else:
-                    syms.append(site.specie.symbol)
-
-            comp_list = [
-                (a[0], len(list(a[1]))) for a in itertools.groupby(syms)
-            ]
-            atom_types, n_atoms = zip(*comp_list)
-
-            new_atom_types = []
-            for atom in atom_types:
-                if "H" == atom[0] and atom not in ["Hf", "Hs", "Hg", "He"]:
-                    new_atom_types.append("H")
-                else:
-                    new_atom_types.append(atom)
+            (
+                atom_types,
+                new_atom_types,
+                n_atoms,
+            ) = utils.get_passivated_poscar_species(slab.species)
 
             comment += "|potcar=" + " ".join(atom_types)
 
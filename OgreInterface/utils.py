@@ -16,13 +16,24 @@ from pymatgen.core.periodic_table import DummySpecies
 from pymatgen.analysis.graphs import StructureGraph
 from pymatgen.analysis.local_env import JmolNN
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
-from scipy.cluster.hierarchy import fcluster, linkage
-from scipy.spatial.distance import squareform
+from scipy.optimize import minimize_scalar
 from ase import Atoms
 import numpy as np
 import networkx as nx
 import spglib
 
+from OgreInterface.disk_cache import DiskCache, get_hash, get_structure_hash
+from OgreInterface.array_structure import ArrayStructure
+
+# Max number of spglib results kept in the in-process memo
+_SPGLIB_MEMO_SIZE = 512
+
+# In-process LRU memo of spglib results keyed by structure fingerprints
+_spglib_memo: collections.OrderedDict = collections.OrderedDict()
+
+# Optional on-disk layer of the spglib memo (see set_spglib_cache)
+_spglib_disk_cache: tp.Optional[DiskCache] = None
+
 
 def sort_slab(structure: Structure) -> None:
     "Inplane sort based first on electronegativity, then c, then a, and then b"
@@ -34,18 +45,15 @@ def shift_film(
     shift: tp.Iterable,
     fractional: bool,
 ) -> Structure:
-    shifted_interface_structure = interface.copy()
-    film_ind = np.where(
-        shifted_interface_structure.site_properties["is_film"]
-    )[0]
-    shifted_interface_structure.translate_sites(
-        indices=film_ind,
+    shifted_interface = ArrayStructure.from_structure(interface)
+    shifted_interface.translate_sites(
+        indices=shifted_interface.get_mask("is_film"),
         vector=shift,
         frac_coords=fractional,
         to_unit_cell=True,
     )
 
-    return shifted_interface_structure
+    return shifted_interface.structure
 
 
 def get_substrate_layer_indices(
@@ -117,11 +125,108 @@ def get_film_layer_indices(
     return np.where(np.logical_and(is_film, is_layer))[0]
 
 
+def set_spglib_cache(
+    cache_dir: tp.Optional[str],
+    max_size: float = 256.0,
+) -> None:
+    """
+    Adds an on-disk layer to the memo used by load_bulk, spglib_standardize
+    and get_symmetry_dataset so spglib results persist between runs.
+
+    Args:
+        cache_dir: Directory of the cache. If None only the in-process memo is used.
+        max_size: Maximum size of the cache in MB.
+    """
+    global _spglib_disk_cache
+
+    if cache_dir is None:
+        _spglib_disk_cache = None
+    else:
+        _spglib_disk_cache = DiskCache(cache_dir=cache_dir, max_size=max_size)
+
+
+def clear_spglib_memo() -> None:
+    """
+    Clears the in-process memo of spglib results
+    """
+    _spglib_memo.clear()
+
+
+def _get_spglib_memo(key: str) -> tp.Optional[tp.Any]:
+    if key in _spglib_memo:
+        _spglib_memo.move_to_end(key)
+        return _spglib_memo[key]
+
+    if _spglib_disk_cache is not None:
+        value = _spglib_disk_cache.get(key)
+
+        if value is not None:
+            _set_spglib_memo(key, value, write_to_disk=False)
+
+        return value
+
+    return None
+
+
+def _set_spglib_memo(
+    key: str,
+    value: tp.Any,
+    write_to_disk: bool = True,
+) -> None:
+    _spglib_memo[key] = value
+    _spglib_memo.move_to_end(key)
+
+    if len(_spglib_memo) > _SPGLIB_MEMO_SIZE:
+        _spglib_memo.popitem(last=False)
+
+    if write_to_disk and _spglib_disk_cache is not None:
+        _spglib_disk_cache.set(key, value)
+
+
+def get_symmetry_dataset(structure: Structure) -> tp.Dict[str, tp.Any]:
+    """
+    Memoized spglib symmetry dataset of a structure. Only the fields used by
+    OgreInterface are kept (wyckoffs, equivalent_atoms, mapping_to_primitive).
+
+    Args:
+        structure: Input pymatgen Structure
+
+    Returns:
+        Dictionary with the wyckoffs, equivalent_atoms and mapping_to_primitive
+    """
+    key = get_hash("get_symmetry_dataset", get_structure_hash(structure))
+    dataset = _get_spglib_memo(key)
+
+    if dataset is None:
+        cell = (
+            structure.lattice.matrix,
+            structure.frac_coords,
+            np.array(structure.atomic_numbers),
+        )
+        spglib_dataset = spglib.get_symmetry_dataset(cell)
+        dataset = {
+            "wyckoffs": list(spglib_dataset["wyckoffs"]),
+            "equivalent_atoms": np.array(spglib_dataset["equivalent_atoms"]),
+            "mapping_to_primitive": np.array(
+                spglib_dataset["mapping_to_primitive"]
+            ),
+        }
+        _set_spglib_memo(key, dataset)
+
+    return copy.deepcopy(dataset)
+
+
 def load_bulk(
     atoms_or_structure: Union[Atoms, Structure],
     refine_structure: bool = True,
     suppress_warnings: bool = False,
 ) -> Structure:
+    """
+    Loads a bulk structure and optionally refines it to its conventional
+    standard cell. The spglib results are memoized by a fingerprint of the
+    input structure (see set_spglib_cache) so identical structures are only
+    standardized once.
+    """
     if type(atoms_or_structure) is Atoms:
         init_structure = AseAtomsAdaptor.get_structure(atoms_or_structure)
     elif type(atoms_or_structure) is Structure:
@@ -201,6 +306,56 @@ def get_rounded_structure(structure: Structure, tol: int = 6):
     return rounded_structure
 
 
+def get_passivated_poscar_species(
+    species: tp.Sequence[tp.Any],
+) -> tp.Tuple[tp.List[str], tp.List[str], tp.List[int]]:
+    """
+    Species groups of the POSCAR of a passivated structure. The pseudo
+    hydrogens are labeled by their charge (i.e. H.75, H1.25) so each charge
+    gets its own group of consecutive sites and its own POTCAR.
+
+    Args:
+        species: Species of each site (pseudo hydrogens have an oxidation
+            state equal to their charge)
+
+    Returns:
+        Labels of the groups (used in the |potcar= comment), element symbols
+        of the groups (species line of the POSCAR), and number of sites in
+        each group
+    """
+    syms = []
+    for specie in species:
+        if specie.symbol == "H" and hasattr(specie, "oxi_state"):
+            oxi = specie.oxi_state
+
+            if oxi < 1.0 and oxi != 0.5:
+                H_str = "H" + f"{oxi:.2f}"[1:]
+            elif oxi == 0.5:
+                H_str = "H.5"
+            elif oxi > 1.0 and oxi != 1.5:
+                H_str = "H" + f"{oxi:.2f}"
+            elif oxi == 1.5:
+                H_str = "H1.5"
+            else:
+                H_str = "H"
+
+            syms.append(H_str)
+        else:
+            syms.append(specie.symbol)
+
+    comp_list = [(a[0], len(list(a[1]))) for a in itertools.groupby(syms)]
+    atom_types, n_atoms = zip(*comp_list)
+
+    poscar_atom_types = []
+    for atom in atom_types:
+        if "H" == atom[0] and atom not in ["Hf", "Hs", "Hg", "He"]:
+            poscar_atom_types.append("H")
+        else:
+            poscar_atom_types.append(atom)
+
+    return list(atom_types), poscar_atom_types, list(n_atoms)
+
+
 def _float_gcd(self, a, b, rtol=1e-05, atol=1e-08):
     t = min(abs(a), abs(b))
     while abs(b) > rtol * t + atol:
@@ -409,12 +564,7 @@ def get_miller_index_label(miller_index: List[int]):
 
 
 def add_symmetry_info(struc: Structure, return_primitive: bool = False):
-    init_lattice = struc.lattice.matrix
-    init_positions = struc.frac_coords
-    init_numbers = np.array(struc.atomic_numbers)
-    init_cell = (init_lattice, init_positions, init_numbers)
-
-    init_dataset = spglib.get_symmetry_dataset(init_cell)
+    init_dataset = get_symmetry_dataset(struc)
 
     struc.add_site_property(
         "bulk_wyckoff",
@@ -517,6 +667,17 @@ def spglib_standardize(
     Returns:
         The standardized structure in the form of a pymatgen Structure object
     """
+    key = get_hash(
+        "spglib_standardize",
+        get_structure_hash(structure),
+        bool(to_primitive),
+        bool(no_idealize),
+    )
+    memo_structure = _get_spglib_memo(key)
+
+    if memo_structure is not None:
+        return memo_structure.copy()
+
     init_lattice = structure.lattice.matrix
     init_positions = structure.frac_coords
     init_numbers = np.array(structure.atomic_numbers)
@@ -540,6 +701,8 @@ def spglib_standardize(
         coords_are_cartesian=False,
     )
 
+    _set_spglib_memo(key, standardized_structure.copy())
+
     return standardized_structure
 
 
@@ -720,40 +883,112 @@ def get_atoms(struc):
 def get_layer_supercell(
     structure: Structure, layers: int, vacuum_scale: int = 0
 ) -> Structure:
-    base_frac_coords = structure.frac_coords
+    base = ArrayStructure.from_structure(structure)
+
     sc_base_frac_coords = np.vstack(
-        [base_frac_coords + np.array([0, 0, i]) for i in range(layers)]
+        [base.frac_coords + np.array([0, 0, i]) for i in range(layers)]
     )
-    sc_cart_coords = sc_base_frac_coords.dot(structure.lattice.matrix)
-    sc_layer_inds = np.repeat(np.arange(layers), len(structure))
+    sc_cart_coords = sc_base_frac_coords.dot(base.lattice_matrix)
+    sc_layer_inds = np.repeat(np.arange(layers), len(base))
 
     new_site_properties = {
-        k: v * layers for k, v in structure.site_properties.items()
+        k: np.tile(v, layers) for k, v in base.site_properties.items()
     }
-    new_site_properties["layer_index"] = sc_layer_inds.tolist()
+    new_site_properties["layer_index"] = sc_layer_inds
 
     if "atomic_layer_index" in new_site_properties:
-        atomic_layers = np.array(new_site_properties["atomic_layer_index"])
+        atomic_layers = new_site_properties["atomic_layer_index"]
         offset = (atomic_layers.max() * sc_layer_inds) + sc_layer_inds
         new_atomic_layers = atomic_layers + offset
         new_site_properties["atomic_layer_index"] = new_atomic_layers.astype(
             int
-        ).tolist()
+        )
 
     layer_transform = np.eye(3)
     layer_transform[-1, -1] = layers + vacuum_scale
-    layer_matrix = layer_transform @ structure.lattice.matrix
+    layer_matrix = layer_transform @ base.lattice_matrix
 
-    layer_slab = Structure(
-        lattice=Lattice(matrix=layer_matrix),
-        species=structure.species * layers,
-        coords=sc_cart_coords,
-        coords_are_cartesian=True,
-        to_unit_cell=True,
+    layer_slab = ArrayStructure(
+        lattice_matrix=layer_matrix,
+        species=np.tile(base.species, layers),
+        frac_coords=sc_cart_coords.dot(np.linalg.inv(layer_matrix)),
         site_properties=new_site_properties,
+        to_unit_cell=True,
     )
 
-    return layer_slab
+    return layer_slab.structure
+
+
+def get_periodic_layer_clusters(
+    frac_coords: np.ndarray,
+    height: float,
+    tol: float,
+) -> np.ndarray:
+    """
+    Groups sites into layers based on their fractional coordinate along the
+    c-vector taking periodic boundary conditions into account. This gives
+    the same clusters as single-linkage clustering of the periodic distance
+    matrix cut at tol, but only needs a sort. On a periodic 1D axis two
+    sites are linked if and only if every gap between neighboring sites on
+    the shorter arc between them is <= tol, so the layers are the arcs
+    separated by gaps > tol.
+
+    Args:
+        frac_coords: (N,) fractional coordinates along the c-vector
+        height: Projection of the c-vector along the surface normal
+        tol: Grouping tolarence in angstroms
+
+    Returns:
+        (N,) integer cluster labels starting at 0 ordered along the c-vector
+    """
+    n = len(frac_coords)
+    wrapped_coords = np.mod(frac_coords, 1.0)
+    sort_inds = np.argsort(wrapped_coords, kind="stable")
+    sorted_coords = wrapped_coords[sort_inds]
+
+    # Gaps between neighboring sites including the gap across the
+    # periodic boundary (last site -> first site)
+    gaps = np.empty(n)
+    gaps[:-1] = np.diff(sorted_coords)
+    gaps[-1] = sorted_coords[0] + 1.0 - sorted_coords[-1]
+    is_break = (gaps * height) > tol
+
+    # A break after a site starts a new cluster with the next site
+    sorted_labels = np.zeros(n, dtype=int)
+    sorted_labels[1:] = np.cumsum(is_break[:-1])
+
+    # If the periodic gap is not a break then the last cluster wraps around
+    # and is the same as the first cluster
+    if not is_break[-1]:
+        sorted_labels[sorted_labels == sorted_labels[-1]] = 0
+
+    labels = np.empty(n, dtype=int)
+    labels[sort_inds] = sorted_labels
+
+    return labels
+
+
+def get_cluster_c_values(
+    frac_coords: np.ndarray,
+    clusters: np.ndarray,
+) -> tp.List[float]:
+    """
+    Returns one fractional c-coordinate per cluster (the coordinate of the
+    highest site index in the cluster) sorted and wrapped into the unit cell.
+
+    Args:
+        frac_coords: (N,) fractional coordinates along the c-vector
+        clusters: (N,) cluster labels
+
+    Returns:
+        List of c values for each cluster
+    """
+    _, cluster_inds = np.unique(clusters, return_inverse=True)
+    last_site_inds = np.zeros(cluster_inds.max() + 1, dtype=int)
+    np.maximum.at(last_site_inds, cluster_inds, np.arange(len(frac_coords)))
+    c_values = np.sort(frac_coords[last_site_inds])
+
+    return [c - math.floor(c) for c in c_values]
 
 
 def calculate_possible_shifts(
@@ -792,27 +1027,19 @@ def calculate_possible_shifts(
         shift = frac_coords[0] + 0.5
         return [shift - math.floor(shift)]
 
-    # We cluster the sites according to the c coordinates. But we need to
-    # take into account PBC. Let's compute a fractional c-coordinate
-    # distance matrix that accounts for PBC.
-    dist_matrix = np.zeros((n, n))
-
-    for i, j in itertools.combinations(list(range(n)), 2):
-        if i != j:
-            cdist = frac_coords[i] - frac_coords[j]
-            cdist = abs(cdist - round(cdist)) * h
-            dist_matrix[i, j] = cdist
-            dist_matrix[j, i] = cdist
-
-    condensed_m = squareform(dist_matrix)
-    z = linkage(condensed_m)
-    clusters = fcluster(z, tol, criterion="distance")
-
-    # Generate dict of cluster# to c val - doesn't matter what the c is.
-    c_loc = {c: frac_coords[i] for i, c in enumerate(clusters)}
+    # We cluster the sites according to the c coordinates taking PBC
+    # into account.
+    clusters = get_periodic_layer_clusters(
+        frac_coords=frac_coords,
+        height=h,
+        tol=tol,
+    )
 
-    # Put all c into the unit cell.
-    possible_c = [c - math.floor(c) for c in sorted(c_loc.values())]
+    # One c value per cluster - doesn't matter what the c is.
+    possible_c = get_cluster_c_values(
+        frac_coords=frac_coords,
+        clusters=clusters,
+    )
 
     # Calculate the shifts
     nshifts = len(possible_c)
@@ -976,3 +1203,83 @@ def reduce_vectors_zur_and_mcgill(
         mat = mat[[1, 0, 2]]
 
     return vecs[0], vecs[1], mat
+
+
+def bracketed_minimize_1d(
+    func: tp.Callable[[np.ndarray], np.ndarray],
+    bounds: tp.Tuple[float, float],
+    n_probes: int = 5,
+    tol: float = 1e-2,
+    max_iters: int = 50,
+    probe_x: tp.Optional[np.ndarray] = None,
+    probe_f: tp.Optional[np.ndarray] = None,
+) -> tp.Tuple[float, float, np.ndarray, np.ndarray]:
+    """
+    Minimizes a 1D function that is evaluated in batches (i.e. the energy as a
+    function of the interfacial distance). The minimum is bracketed with a
+    single batch of n_probes evenly spaced points and then refined inside the
+    bracket with Brent's method until the position of the minimum is known to
+    within tol.
+
+    Args:
+        func: Function that maps an (N,) array of x values to an (N,) array
+            of function values
+        bounds: (x_min, x_max) range that is searched
+        n_probes: Number of evenly spaced points used to bracket the minimum
+        tol: Absolute tolerance of the position of the minimum
+        max_iters: Max number of iterations of Brent's method
+        probe_x: Points that were already evaluated (i.e. a dense scan). If
+            given together with probe_f, they are used to bracket the minimum
+            instead of evaluating n_probes new points.
+        probe_f: Function values of probe_x
+
+    Returns:
+        The position of the minimum, the minimum value, and the sorted x
+        values and function values of every point that was evaluated
+    """
+    if probe_x is None or probe_f is None:
+        x_min, x_max = bounds
+        probe_x = np.linspace(x_min, x_max, max(n_probes, 3))
+        probe_f = np.asarray(func(probe_x), dtype=float).ravel()
+    else:
+        probe_x = np.asarray(probe_x, dtype=float).ravel()
+        probe_f = np.asarray(probe_f, dtype=float).ravel()
+        sort_inds = np.argsort(probe_x)
+        probe_x = probe_x[sort_inds]
+        probe_f = probe_f[sort_inds]
+
+    all_x = list(probe_x)
+    all_f = list(probe_f)
+
+    def _single_func(x: float) -> float:
+        f = float(np.asarray(func(np.array([x]))).ravel()[0])
+        all_x.append(x)
+        all_f.append(f)
+
+        return f
+
+    # The minimum is bracketed by the neighbors of the lowest probe
+    min_ind = int(np.argmin(probe_f))
+    bracket = (
+        probe_x[max(min_ind - 1, 0)],
+        probe_x[min(min_ind + 1, len(probe_x) - 1)],
+    )
+
+    minimize_scalar(
+        _single_func,
+        bounds=bracket,
+        method="bounded",
+        options={"xatol": tol, "maxiter": max_iters},
+    )
+
+    all_x = np.array(all_x)
+    all_f = np.array(all_f)
+    sort_inds = np.argsort(all_x)
+    all_x = all_x[sort_inds]
+    all_f = all_f[sort_inds]
+
+    # Brent's method can stop on a point that is no better than the probes
+    # if the function is flat within the tolerance
+    opt_ind = np.argmin(all_f)
+
+    return all_x[opt_ind], all_f[opt_ind], all_x, all_f
@@ -24,13 +24,27 @@ from OgreInterface.generate import InterfaceGenerator, BaseSurfaceGenerator
 from OgreInterface.surface_matching import (
     BaseSurfaceMatcher,
     BaseSurfaceEnergy,
+    get_cleavage_energy,
+    cache_cleavage_energy,
 )
 from OgreInterface.surfaces import BaseSurface
+from OgreInterface.disk_cache import DiskCache, get_hash, get_structure_hash
 from OgreInterface import utils
 
 matplotlib.use("agg")
 
 
+def _init_worker(
+    surface_matching_module: tp.Type[BaseSurfaceMatcher],
+    surface_energy_module: tp.Type[BaseSurfaceEnergy],
+    surface_matching_kwargs: tp.Dict[str, tp.Any],
+    surface_energy_kwargs: tp.Dict[str, tp.Any],
+) -> None:
+    # Load the shared resources (i.e. ML models) once per worker process
+    surface_matching_module.preload(**surface_matching_kwargs)
+    surface_energy_module.preload(**surface_energy_kwargs)
+
+
 class BaseInterfaceSearch(ABC):
     """Class to perform a miller index scan to find all domain matched interfaces of various surfaces.
 
@@ -54,6 +68,9 @@ class BaseInterfaceSearch(ABC):
             This is done using spglib.standardize_cell(cell, to_primitive=False, no_idealize=False). Mainly this is usefull if
             users want to input a primitive cell of a structure instead of generating a conventional cell because most DFT people
             work exclusively with the primitive structure so we always have it on hand.
+        adaptive_cleavage_energy: Determines if the cleavage energies of the surfaces are calculated
+            with the adaptive mode of BaseSurfaceEnergy.get_cleavage_energy instead of the dense
+            21 point scan (fewer energy evaluations for expensive energy modules)
     """
 
     def __init__(
@@ -78,6 +95,7 @@ class BaseInterfaceSearch(ABC):
         n_particles_PSO: int = 20,
         max_iterations_PSO: int = 150,
         z_bounds_PSO: tp.Optional[tp.List[float]] = None,
+        optimizer: str = "PSO",
         grid_density_PES: float = 2.5,
         use_most_stable_substrate: bool = True,
         cmap_PES: str = "coolwarm",
@@ -86,6 +104,7 @@ class BaseInterfaceSearch(ABC):
         dpi: int = 400,
         verbose: bool = True,
         fast_mode: bool = True,
+        adaptive_cleavage_energy: bool = False,
     ):
         if n_workers > 1:
             self._verbose = False
@@ -93,6 +112,7 @@ class BaseInterfaceSearch(ABC):
             self._verbose = verbose
 
         self._fast_mode = fast_mode
+        self._adaptive_cleavage_energy = adaptive_cleavage_energy
         self.surface_matching_module = surface_matching_module
         self.surface_energy_module = surface_energy_module
         self.surface_generator = surface_generator
@@ -132,6 +152,13 @@ class BaseInterfaceSearch(ABC):
         self._n_particles_PSO = n_particles_PSO
         self._max_iterations_PSO = max_iterations_PSO
         self._z_bounds_PSO = z_bounds_PSO
+
+        if optimizer not in ["PSO", "local"]:
+            raise ValueError(
+                f"optimizer must be 'PSO' or 'local', not '{optimizer}'"
+            )
+
+        self._optimizer = optimizer
         self._use_most_stable_substrate = use_most_stable_substrate
         self._grid_density_PES = grid_density_PES
         self._minimum_slab_thickness = minimum_slab_thickness
@@ -165,14 +192,112 @@ class BaseInterfaceSearch(ABC):
 
         return substrate_generator, film_generator
 
+    @property
+    def _worker_initargs(self) -> tp.Tuple:
+        return (
+            self.surface_matching_module,
+            self.surface_energy_module,
+            self.surface_matching_kwargs,
+            self.surface_energy_kwargs,
+        )
+
+    def _get_settings_hash(self) -> str:
+        # repr is used so non-json objects (i.e. model paths) can be part of
+        # the hash
+        surface_matching_kwargs = sorted(
+            (k, repr(v)) for k, v in self.surface_matching_kwargs.items()
+        )
+        surface_energy_kwargs = sorted(
+            (k, repr(v))
+            for k, v in self.surface_energy_kwargs.items()
+            if k not in self.surface_energy_module.cache_ignored_kwargs
+        )
+
+        return get_hash(
+            "interface_search",
+            get_structure_hash(self._substrate_bulk),
+            get_structure_hash(self._film_bulk),
+            [int(i) for i in self._substrate_miller_index],
+            [int(i) for i in self._film_miller_index],
+            f"{self.surface_matching_module.__module__}.{self.surface_matching_module.__qualname__}",
+            f"{self.surface_energy_module.__module__}.{self.surface_energy_module.__qualname__}",
+            f"{self.surface_generator.__module__}.{self.surface_generator.__qualname__}",
+            surface_matching_kwargs,
+            surface_energy_kwargs,
+            self._refine_structure,
+            self._minimum_slab_thickness,
+            self._vacuum,
+            self._max_strain,
+            self._max_area_mismatch,
+            self._max_area,
+            self._substrate_strain_fraction,
+            self._n_particles_PSO,
+            self._max_iterations_PSO,
+            self._z_bounds_PSO and [float(z) for z in self._z_bounds_PSO],
+            self._optimizer,
+            self._grid_density_PES,
+            self._use_most_stable_substrate,
+            self._cmap_PES,
+            self._dpi,
+            self._fast_mode,
+            self._adaptive_cleavage_energy,
+        )
+
+    def _get_checkpoint_key(
+        self,
+        film: BaseSurface,
+        substrate: BaseSurface,
+        settings_hash: str,
+    ) -> str:
+        return (
+            f"film{film.termination_index:02d}"
+            + f"_sub{substrate.termination_index:02d}"
+            + f"_{settings_hash[:16]}"
+        )
+
+    def _load_checkpoint(
+        self,
+        checkpoint: tp.Optional[DiskCache],
+        key: str,
+    ) -> tp.Optional[tp.Dict[str, tp.Any]]:
+        if checkpoint is None:
+            return None
+
+        data_str = checkpoint.get(key)
+
+        if data_str is None:
+            return None
+
+        return json.loads(data_str)
+
+    def _optimize_and_checkpoint(
+        self,
+        base_dir: str,
+        interface: BaseInterface,
+        checkpoint: tp.Optional[DiskCache],
+        key: str,
+    ) -> tp.Dict[str, tp.Any]:
+        data = self._optimize_single_interface(
+            base_dir=base_dir,
+            interface=interface,
+        )
+
+        # The data is stored as a json string so the structure dictionaries
+        # are not decoded back into Structures when the checkpoint is loaded
+        if checkpoint is not None:
+            checkpoint.set(key, json.dumps(data))
+
+        return data
+
     def _calc_surface_energy(self, surface):
-        surfE_calculator = self.surface_energy_module(
+        # Memoized so the surface matchers of the interfaces reuse the energy
+        return get_cleavage_energy(
             surface=surface,
-            **self.surface_energy_kwargs,
+            surface_energy_module=self.surface_energy_module,
+            surface_energy_kwargs=self.surface_energy_kwargs,
+            adaptive=self._adaptive_cleavage_energy,
         )
 
-        return surfE_calculator.get_cleavage_energy()
-
     def _get_most_stable_surface(
         self, surface_generator: BaseSurfaceGenerator
     ) -> tp.List[int]:
@@ -182,12 +307,29 @@ class BaseInterfaceSearch(ABC):
                 for surface in surface_generator
             ]
         else:
-            with Pool(self.n_workers) as p:
+            with Pool(
+                self.n_workers,
+                initializer=_init_worker,
+                initargs=self._worker_initargs,
+            ) as p:
                 surface_energies = p.map(
                     self._calc_surface_energy,
                     surface_generator,
                 )
 
+            # Add the energies from the worker processes to the memo of this
+            # process so they are inherited by the interface workers
+            for surface, surface_energy in zip(
+                surface_generator, surface_energies
+            ):
+                cache_cleavage_energy(
+                    surface=surface,
+                    surface_energy_module=self.surface_energy_module,
+                    cleavage_energy=surface_energy,
+                    surface_energy_kwargs=self.surface_energy_kwargs,
+                    adaptive=self._adaptive_cleavage_energy,
+                )
+
         surface_energies = np.round(np.array(surface_energies), 6)
         min_surface_energy = surface_energies.min()
 
@@ -270,6 +412,7 @@ class BaseInterfaceSearch(ABC):
             interface=interface,
             grid_density=self._grid_density_PES,
             verbose=self._verbose,
+            adaptive_cleavage_energy=self._adaptive_cleavage_energy,
             **self.surface_matching_kwargs,
         )
 
@@ -280,11 +423,14 @@ class BaseInterfaceSearch(ABC):
             min_z = self._z_bounds_PSO[0]
             max_z = self._z_bounds_PSO[1]
 
-        _ = surface_matcher.optimizePSO(
-            z_bounds=self._z_bounds_PSO,
-            max_iters=self._max_iterations_PSO,
-            n_particles=self._n_particles_PSO,
-        )
+        if self._optimizer == "local":
+            _ = surface_matcher.optimize_local(z_bounds=self._z_bounds_PSO)
+        else:
+            _ = surface_matcher.optimizePSO(
+                z_bounds=self._z_bounds_PSO,
+                max_iters=self._max_iterations_PSO,
+                n_particles=self._n_particles_PSO,
+            )
         surface_matcher.get_optimized_structure()
 
         opt_d_pso = interface.interfacial_distance
@@ -485,7 +631,29 @@ class BaseInterfaceSearch(ABC):
         self,
         filter_on_charge: bool = True,
         output_folder: str = None,
+        resume: bool = True,
     ):
+        """
+        Optimizes all the film/substrate termination combinations and writes
+        the results to the output folder.
+
+        The result of each interface is saved to the checkpoints folder of
+        the output folder as soon as it is finished. The checkpoints are keyed
+        by the film and substrate terminations and a hash of the search
+        settings, so running the search again with the same output_folder
+        and settings skips the interfaces that are already finished.
+
+        Args:
+            filter_on_charge: Determines if the terminations are filtered by
+                their surface charge
+            output_folder: Output folder, if None a new folder is created
+                from the compositions and miller indices
+            resume: Determines if the finished interfaces are loaded from
+                the checkpoints of a previous run
+
+        Returns:
+            The optimization data in app mode
+        """
         sub_comp = self._substrate_bulk.composition.reduced_formula
         film_comp = self._film_bulk.composition.reduced_formula
         sub_miller = "".join([str(i) for i in self._substrate_miller_index])
@@ -522,7 +690,21 @@ class BaseInterfaceSearch(ABC):
                 f"Preparing to Optimize {len(film_and_substrate_inds)} {film_comp}({film_miller})/{sub_comp}({sub_miller}) Interfaces..."
             )
 
+        # Checkpoints are not written in app mode (nothing is written to
+        # disk in app mode)
+        if self._app_mode:
+            checkpoint = None
+        else:
+            checkpoint = DiskCache(
+                cache_dir=join(base_dir, "checkpoints"),
+                max_size=np.inf,
+            )
+
+        settings_hash = self._get_settings_hash()
+
         interfaces = []
+        checkpoint_keys = []
+        finished_data_list = []
 
         for i, film_sub_ind in enumerate(film_and_substrate_inds):
             film_ind = film_sub_ind[0]
@@ -531,6 +713,27 @@ class BaseInterfaceSearch(ABC):
             film = film_generator[film_ind]
             sub = substrate_generator[sub_ind]
 
+            checkpoint_key = self._get_checkpoint_key(
+                film=film,
+                substrate=sub,
+                settings_hash=settings_hash,
+            )
+
+            if resume:
+                finished_data = self._load_checkpoint(
+                    checkpoint=checkpoint,
+                    key=checkpoint_key,
+                )
+            else:
+                finished_data = None
+
+            if finished_data is not None:
+                finished_data_list.append(finished_data)
+
+                # The first interface is still generated for the match figure
+                if i != 0:
+                    continue
+
             interface_generator = InterfaceGenerator(
                 substrate=sub,
                 film=film,
@@ -550,7 +753,9 @@ class BaseInterfaceSearch(ABC):
             )
             iface = ifaces[0]
 
-            interfaces.append(iface)
+            if finished_data is None:
+                interfaces.append(iface)
+                checkpoint_keys.append(checkpoint_key)
 
             if i == 0:
                 stream_view = io.BytesIO()
@@ -567,19 +772,36 @@ class BaseInterfaceSearch(ABC):
                     with open(join(base_dir, "interface_view.png"), "wb") as f:
                         f.write(stream_view_value)
 
-        if self.n_workers <= 1:
+        if self._verbose and len(finished_data_list) > 0:
+            print(
+                f"Loaded {len(finished_data_list)} finished interfaces from {join(base_dir, 'checkpoints')}"
+            )
+
+        if self.n_workers <= 1 or len(interfaces) == 0:
             data_list = []
-            for interface in interfaces:
-                data = self._optimize_single_interface(
+            for interface, checkpoint_key in zip(interfaces, checkpoint_keys):
+                data = self._optimize_and_checkpoint(
                     base_dir=base_dir,
                     interface=interface,
+                    checkpoint=checkpoint,
+                    key=checkpoint_key,
                 )
                 data_list.append(data)
         else:
-            with Pool(self.n_workers) as p:
-                inputs = zip(itertools.repeat(base_dir), interfaces)
-                data_list = p.starmap(self._optimize_single_interface, inputs)
+            with Pool(
+                self.n_workers,
+                initializer=_init_worker,
+                initargs=self._worker_initargs,
+            ) as p:
+                inputs = zip(
+                    itertools.repeat(base_dir),
+                    interfaces,
+                    itertools.repeat(checkpoint),
+                    checkpoint_keys,
+                )
+                data_list = p.starmap(self._optimize_and_checkpoint, inputs)
 
+        data_list = finished_data_list + data_list
         data_list.sort(key=lambda x: x["interfaceEnergy"])
 
         df = pd.DataFrame(data=data_list)
@@ -41,6 +41,9 @@ class IonicInterfaceSearch(BaseInterfaceSearch):
             This is done using spglib.standardize_cell(cell, to_primitive=False, no_idealize=False). Mainly this is usefull if
             users want to input a primitive cell of a structure instead of generating a conventional cell because most DFT people
             work exclusively with the primitive structure so we always have it on hand.
+        adaptive_cleavage_energy: Determines if the cleavage energies of the surfaces are calculated
+            with the adaptive mode of BaseSurfaceEnergy.get_cleavage_energy instead of the dense
+            21 point scan (fewer energy evaluations for expensive energy modules)
     """
 
     def __init__(
@@ -60,6 +63,7 @@ class IonicInterfaceSearch(BaseInterfaceSearch):
         n_particles_PSO: int = 20,
         max_iterations_PSO: int = 150,
         z_bounds_PSO: tp.Optional[tp.List[float]] = None,
+        optimizer: str = "PSO",
         grid_density_PES: float = 2.5,
         use_most_stable_substrate: bool = True,
         cmap_PES="coolwarm",
@@ -70,6 +74,7 @@ class IonicInterfaceSearch(BaseInterfaceSearch):
         dpi: int = 400,
         verbose: bool = True,
         fast_mode: bool = False,
+        adaptive_cleavage_energy: bool = False,
     ):
         surface_matching_kwargs = {
             "auto_determine_born_n": auto_determine_born_n,
@@ -96,6 +101,7 @@ class IonicInterfaceSearch(BaseInterfaceSearch):
             n_particles_PSO=n_particles_PSO,
             max_iterations_PSO=max_iterations_PSO,
             z_bounds_PSO=z_bounds_PSO,
+            optimizer=optimizer,
             grid_density_PES=grid_density_PES,
             use_most_stable_substrate=use_most_stable_substrate,
             cmap_PES=cmap_PES,
@@ -104,6 +110,7 @@ class IonicInterfaceSearch(BaseInterfaceSearch):
             dpi=dpi,
             verbose=verbose,
             fast_mode=fast_mode,
+            adaptive_cleavage_energy=adaptive_cleavage_energy,
         )
 
     def _get_film_and_substrate_inds(
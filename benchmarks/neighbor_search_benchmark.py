@@ -0,0 +1,133 @@
+"""
+Compares the linked-cell neighbor search of the ionic surface matcher
+(get_neighbor_list) with matscipy's neighbour_list on a rocksalt MgO slab
+with pbc = (True, True, False) in terms of run time and peak memory.
+
+Every run is done in a fresh process, so the peak memory (the increase of
+the maximum resident set size during the search) of one run does not
+include the memory of the previous runs.
+
+Usage (with OgreInterface installed or on the PYTHONPATH):
+    python benchmarks/neighbor_search_benchmark.py
+    python benchmarks/neighbor_search_benchmark.py --supercell 8 8 10 --cutoffs 18 20 23
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import typing as tp
+import warnings
+
+from pymatgen.core.structure import Structure
+from pymatgen.core.lattice import Lattice
+from pymatgen.io.ase import AseAtomsAdaptor
+from matscipy.neighbours import neighbour_list
+import numpy as np
+
+from OgreInterface.surface_matching.ionic_surface_matcher import (
+    get_neighbor_list,
+)
+
+PBC = (True, True, False)
+
+
+def build_slab(supercell: tp.List[int], vacuum: float = 30.0) -> Structure:
+    a = 4.21
+    bulk = Structure.from_spacegroup(
+        "Fm-3m",
+        Lattice.cubic(a),
+        ["Mg", "O"],
+        [[0, 0, 0], [0.5, 0.5, 0.5]],
+    )
+    bulk.make_supercell(supercell)
+
+    return Structure(
+        Lattice(
+            np.diag(
+                [
+                    a * supercell[0],
+                    a * supercell[1],
+                    a * supercell[2] + vacuum,
+                ]
+            ),
+            pbc=PBC,
+        ),
+        bulk.species,
+        bulk.cart_coords,
+        coords_are_cartesian=True,
+    )
+
+
+def _run_search(
+    inputs: tp.Tuple[str, tp.List[int], float]
+) -> tp.Tuple[int, float, float]:
+    method, supercell, cutoff = inputs
+    warnings.filterwarnings("ignore")
+
+    slab = build_slab(supercell)
+    atoms = AseAtomsAdaptor().get_atoms(slab)
+    atoms.set_pbc(PBC)
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t0 = time.time()
+    if method == "matscipy":
+        idx_i, _, _ = neighbour_list("ijS", atoms=atoms, cutoff=cutoff)
+    else:
+        idx_i, _, _ = get_neighbor_list(
+            lattice_matrix=slab.lattice.matrix,
+            cart_coords=slab.cart_coords,
+            pbc=PBC,
+            cutoff=cutoff,
+        )
+    run_time = time.time() - t0
+
+    # ru_maxrss is in kB on linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss
+
+    return len(idx_i), run_time, peak_rss / 1024
+
+
+def run_benchmark(supercell: tp.List[int], cutoffs: tp.List[float]) -> None:
+    context = multiprocessing.get_context("fork")
+    n_atoms = len(build_slab(supercell))
+
+    print(f"MgO slab {supercell} ({n_atoms} atoms), pbc = {PBC}")
+    print(
+        f"{'cutoff':>8}{'method':>12}{'n_pairs':>12}"
+        + f"{'time (s)':>10}{'peak (MB)':>11}{'speedup':>9}"
+    )
+
+    for cutoff in cutoffs:
+        results = {}
+        for method in ["matscipy", "linked-cell"]:
+            with context.Pool(1) as p:
+                results[method] = p.apply(
+                    _run_search,
+                    ((method, supercell, cutoff),),
+                )
+
+        for method, (n_pairs, run_time, peak_rss) in results.items():
+            speedup = results["matscipy"][1] / run_time
+            print(
+                f"{cutoff:>8.1f}{method:>12}{n_pairs:>12d}"
+                + f"{run_time:>10.2f}{peak_rss:>11.0f}{speedup:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--supercell",
+        type=int,
+        nargs=3,
+        default=[8, 8, 10],
+    )
+    parser.add_argument(
+        "--cutoffs",
+        type=float,
+        nargs="+",
+        default=[18.0, 20.0, 23.0],
+    )
+    args = parser.parse_args()
+
+    run_benchmark(supercell=args.supercell, cutoffs=args.cutoffs)
@@ -0,0 +1,170 @@
+"""
+Compares the PSO optimizer (BaseSurfaceMatcher.optimizePSO) with the grid
+seeded multi-start local optimizer (BaseSurfaceMatcher.optimize_local) on the
+same interface in terms of the best energy found per energy evaluation.
+
+Every optimizer setting is run on the same IonicSurfaceMatcher and the best
+negated adhesion energy is reported against n_energy_evaluations. The PSO runs
+are repeated for several random seeds because PSO is stochastic.
+
+Usage (with OgreInterface installed or on the PYTHONPATH):
+    python benchmarks/optimizer_benchmark.py
+    python benchmarks/optimizer_benchmark.py --interface zincblende111 --seeds 5
+"""
+import argparse
+import time
+import warnings
+
+from pymatgen.core.structure import Structure
+from pymatgen.core.lattice import Lattice
+import numpy as np
+
+from OgreInterface.generate import InterfaceGenerator, SurfaceGenerator
+from OgreInterface.surface_matching import IonicSurfaceMatcher
+
+
+def _rocksalt(a: float, cation: str, anion: str) -> Structure:
+    return Structure.from_spacegroup(
+        "Fm-3m",
+        Lattice.cubic(a),
+        [cation, anion],
+        [[0, 0, 0], [0.5, 0.5, 0.5]],
+    )
+
+
+def _zincblende(a: float, cation: str, anion: str) -> Structure:
+    return Structure.from_spacegroup(
+        "F-43m",
+        Lattice.cubic(a),
+        [cation, anion],
+        [[0, 0, 0], [0.25, 0.25, 0.25]],
+    )
+
+
+INTERFACES = {
+    "rocksalt100": (
+        _rocksalt(4.21, "Mg", "O"),
+        _rocksalt(4.20, "Ni", "O"),
+        [1, 0, 0],
+    ),
+    "rocksalt110": (
+        _rocksalt(4.21, "Mg", "O"),
+        _rocksalt(4.20, "Ni", "O"),
+        [1, 1, 0],
+    ),
+    "zincblende111": (
+        _zincblende(5.45, "Zn", "S"),
+        _zincblende(5.43, "Ga", "P"),
+        [1, 1, 1],
+    ),
+}
+
+PSO_SETTINGS = [
+    {"n_particles": 15, "max_iters": 50},
+    {"n_particles": 15, "max_iters": 200},
+    {"n_particles": 20, "max_iters": 150},
+]
+
+LOCAL_SETTINGS = [
+    {"grid_size": (6, 6, 6), "n_starts": 2},
+    {"grid_size": (8, 8, 8), "n_starts": 4},
+    {"grid_size": (8, 8, 8), "n_starts": 4, "use_gradients": False},
+]
+
+
+def build_surface_matcher(name: str) -> IonicSurfaceMatcher:
+    substrate_bulk, film_bulk, miller_index = INTERFACES[name]
+
+    substrate = SurfaceGenerator(
+        substrate_bulk,
+        miller_index=miller_index,
+        layers=5,
+        vacuum=10,
+        refine_structure=True,
+    )[0]
+    film = SurfaceGenerator(
+        film_bulk,
+        miller_index=miller_index,
+        layers=5,
+        vacuum=10,
+        refine_structure=True,
+    )[0]
+
+    interface = InterfaceGenerator(
+        substrate=substrate,
+        film=film,
+        max_strain=0.03,
+        max_area=60,
+        interfacial_distance=2.0,
+        vacuum=20,
+        verbose=False,
+    ).generate_interfaces()[0]
+
+    return IonicSurfaceMatcher(
+        interface=interface,
+        grid_density=2.5,
+        verbose=False,
+    )
+
+
+def run_benchmark(name: str, seeds: int) -> None:
+    surface_matcher = build_surface_matcher(name)
+    results = []
+
+    for settings in PSO_SETTINGS:
+        for seed in range(seeds):
+            np.random.seed(seed)
+            t0 = time.time()
+            energy = surface_matcher.optimizePSO(**settings)
+            results.append(
+                (
+                    "PSO",
+                    f"{settings} seed={seed}",
+                    surface_matcher.n_energy_evaluations,
+                    float(energy),
+                    time.time() - t0,
+                )
+            )
+
+    for settings in LOCAL_SETTINGS:
+        t0 = time.time()
+        energy = surface_matcher.optimize_local(**settings)
+        results.append(
+            (
+                "local",
+                f"{settings}",
+                surface_matcher.n_energy_evaluations,
+                float(energy),
+                time.time() - t0,
+            )
+        )
+
+    best_energy = min(r[3] for r in results)
+
+    print(f"Interface: {name} ({len(surface_matcher.iface)} atoms)")
+    print(f"Best energy of all runs: {best_energy:.8f} eV/A^2")
+    print(
+        f"{'optimizer':<10}{'n_evals':>10}{'energy':>16}{'error':>12}"
+        + f"{'time (s)':>10}  settings"
+    )
+
+    for optimizer, settings, n_evals, energy, run_time in results:
+        print(
+            f"{optimizer:<10}{n_evals:>10d}{energy:>16.8f}"
+            + f"{energy - best_energy:>12.2e}{run_time:>10.2f}  {settings}"
+        )
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--interface",
+        choices=list(INTERFACES.keys()),
+        default="rocksalt100",
+    )
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+
+    run_benchmark(name=args.interface, seeds=args.seeds)